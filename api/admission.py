@@ -0,0 +1,151 @@
+"""
+Admission control for inference routes.
+
+At most a fixed number of requests run decoding and inference at once; a
+bounded number more wait for a slot. Requests beyond that are rejected right
+away with 429 and a Retry-After estimate instead of piling up threads and
+decoded images.
+"""
+import math
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+from flask import jsonify, make_response
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounds the number of running and waiting requests."""
+
+    def __init__(self, max_concurrent, max_queue, timeout, name='inference'):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Maximum number of requests running at once
+            max_queue: Maximum number of requests waiting for a slot
+            timeout: Maximum seconds a request waits for a slot
+            name: Name used in metrics
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.name = name
+
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+        # Exponentially weighted average of the time a request holds a slot
+        self.service_time = None
+
+        metrics.register_collector(self._collect_metrics)
+
+    def retry_after(self):
+        """Estimate the seconds until a slot frees up for a new request."""
+        service_time = self.service_time or 1.0
+        return max(1, math.ceil((self.waiting + 1) * service_time / self.max_concurrent))
+
+    def _reject(self, reason):
+        """Count a rejection and raise Overloaded. Called with the condition held."""
+        metrics.inc_counter('admission_rejected_total', help_text='Requests rejected by admission control',
+                            controller=self.name, reason=reason)
+        raise Overloaded(f"Server is overloaded ({reason}), retry later", self.retry_after())
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold a slot for the duration of the block.
+
+        Yields:
+            Seconds the request waited for its slot
+
+        Raises:
+            Overloaded: If the queue is full or no slot freed up in time
+        """
+        start = time.perf_counter()
+
+        with self.condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self._reject('queue_full')
+
+                self.waiting += 1
+                try:
+                    deadline = start + self.timeout
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject('timeout')
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.active += 1
+
+        admitted = time.perf_counter()
+        queue_wait = admitted - start
+        metrics.observe('admission_wait', queue_wait, camera='api')
+
+        try:
+            yield queue_wait
+        finally:
+            duration = time.perf_counter() - admitted
+
+            with self.condition:
+                self.active -= 1
+                self.service_time = duration if self.service_time is None \
+                    else 0.8 * self.service_time + 0.2 * duration
+                self.condition.notify()
+
+    def _collect_metrics(self):
+        """Export the number of running and waiting requests before a metrics scrape."""
+        metrics.set_gauge('admission_active_requests', self.active,
+                          help_text='Requests holding an inference slot', controller=self.name)
+        metrics.set_gauge('admission_waiting_requests', self.waiting,
+                          help_text='Requests waiting for an inference slot', controller=self.name)
+
+def admitted(controller):
+    """
+    Run a view only once the controller admits the request.
+
+    Overloaded requests get 429 with Retry-After. Admitted responses report
+    the queue wait in a Server-Timing header.
+
+    Args:
+        controller: AdmissionController
+
+    Returns:
+        View decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with controller.admit() as queue_wait:
+                    response = make_response(view(*args, **kwargs))
+            except Overloaded as e:
+                response = jsonify({
+                    'status': 'error',
+                    'message': str(e)
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+
+            response.headers.add('Server-Timing', f"queue;dur={queue_wait * 1000:.1f}")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,126 @@
+"""
+Micro-batching of concurrent inference requests.
+
+Request threads submit single images to an ``InferenceDispatcher``. A worker
+thread collects the requests that arrive within a short window (up to a
+maximum batch size), runs them through the model as one batch and hands each
+result back to the waiting request.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+class InferenceDispatcher:
+    """Collects concurrent requests into batches for a batch inference function."""
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=5.0, name='inference'):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            infer_batch: Function taking a list of inputs and returning a list of results
+            max_batch_size: Maximum number of requests per batch
+            max_wait_ms: Maximum time the first request of a batch waits for more
+            name: Name used for the worker thread and in metrics
+        """
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+
+        metrics.register_collector(self._collect_metrics)
+
+    def _ensure_started(self):
+        """Start the worker thread (again after a fork, which does not copy threads)."""
+        if self.thread is not None and self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+
+            self.queue = queue.Queue()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name=f"{self.name}-dispatcher", daemon=True)
+            self.thread.start()
+
+    def submit(self, item):
+        """
+        Submit an input for inference.
+
+        Args:
+            item: Model input (e.g. a decoded image)
+
+        Returns:
+            Future resolving to the result of the input
+        """
+        self._ensure_started()
+
+        future = Future()
+        self.queue.put((item, future, time.perf_counter()))
+        return future
+
+    def queue_depth(self):
+        """Get the number of requests waiting for a batch."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def _collect(self, first):
+        """Collect a batch starting with the given request."""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Worker loop."""
+        work_queue = self.queue
+
+        while True:
+            batch = self._collect(work_queue.get())
+            started = time.perf_counter()
+
+            for _, _, enqueued in batch:
+                metrics.observe('queue_wait', started - enqueued, camera='api')
+
+            metrics.inc_counter('inference_batches_total', help_text='Number of micro-batches run',
+                                dispatcher=self.name)
+            metrics.inc_counter('inference_batched_requests_total', len(batch),
+                                help_text='Number of requests run in micro-batches', dispatcher=self.name)
+
+            try:
+                results = self.infer_batch([item for item, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Error running inference batch of {len(batch)}: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _collect_metrics(self):
+        """Export the queue depth before a metrics scrape."""
+        metrics.set_gauge('inference_queue_depth', self.queue_depth(),
+                          help_text='Requests waiting for a micro-batch', dispatcher=self.name)
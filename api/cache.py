@@ -0,0 +1,102 @@
+"""
+Bounded in-memory caches for API responses.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+class ByteLRUCache:
+    """Least-recently-used cache of byte strings, bounded by their total size."""
+
+    def __init__(self, max_bytes, name='cache', ttl=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached values in bytes
+            name: Name used in metrics
+            ttl: Seconds after which entries expire, or None to keep them until evicted
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+        metrics.register_collector(self._collect_metrics)
+
+    def get(self, key):
+        """
+        Get a cached entry and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (value, tag), or None if the key is not cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[2] is not None and entry[2] <= time.monotonic():
+                    del self.entries[key]
+                    self.size -= len(entry[0])
+                    entry = None
+                else:
+                    self.entries.move_to_end(key)
+
+        if entry is None:
+            metrics.inc_counter('cache_misses_total', help_text='Number of cache misses', cache=self.name)
+            return None
+
+        metrics.inc_counter('cache_hits_total', help_text='Number of cache hits', cache=self.name)
+        return entry[0], entry[1]
+
+    def put(self, key, value, tag=None):
+        """
+        Cache a value, evicting the least recently used entries to stay under the size cap.
+
+        Values larger than the whole cache are not cached.
+
+        Args:
+            key: Cache key
+            value: Bytes to cache
+            tag: Optional small value stored alongside (e.g. an ETag)
+        """
+        if len(value) > self.max_bytes:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+
+            self.entries[key] = (value, tag, expires)
+            self.size += len(value)
+
+            while self.size > self.max_bytes:
+                _, (evicted, _, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _collect_metrics(self):
+        """Export the cache size before a metrics scrape."""
+        metrics.set_gauge('cache_bytes', self.size, help_text='Total size of cached values', cache=self.name)
+        metrics.set_gauge('cache_entries', len(self.entries), help_text='Number of cached values', cache=self.name)
@@ -1,59 +1,332 @@
 """
 API routes for the face and object detection system.
 """
+import io
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 import cv2
 import numpy as np
 import base64
+import json
 import uuid
-from datetime import datetime
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from database.db import get_database
+from database.blobs import get_blob_store
 from database.operations import (
-    add_face, get_face, get_all_faces, 
-    add_object, update_object, get_object, get_person_objects
+    add_face, get_face, get_face_image_ref, get_face_encodings, get_faces_page,
+    add_object, update_object, get_object, get_person_objects, find_objects, find_sightings
 )
 from detection.face_detector import FaceDetector
 from detection.object_detector import ObjectDetector
 from encryption.encrypt import encrypt_face_data
-from encryption.decrypt import decrypt_face_data
-from api.serializers import serialize_face, serialize_object
-from app.config import DATABASE
+from encryption.decrypt import decrypt_face_bytes, decrypt_face_token
+from api.serializers import (
+    serialize_face, serialize_object, serialize_sighting,
+    encode_cursor, decode_cursor, parse_limit, parse_timestamp
+)
+from api.batching import InferenceDispatcher
+from api.admission import AdmissionController, admitted
+from api.cache import ByteLRUCache
+from app import metrics
+from app.stream import FrameReader
+from app import events
+from app.jobs import JobManager, JobQueueFull
+from app.config import API, DETECTION, JOBS, EVENTS
 
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 api = Blueprint('api', __name__)
 
+# Thread pool for decoding batch uploads
+decode_pool = ThreadPoolExecutor(max_workers=API['decode_threads'], thread_name_prefix='decode')
+
 # Initialize detectors
 face_detector = None
 object_detector = None
 
-def init_detectors(model_path, confidence_threshold=0.5):
-    """Initialize detectors."""
+# Guards detector creation
+detectors_lock = threading.Lock()
+
+# YOLO models are not thread-safe, so inference is serialized
+inference_lock = threading.Lock()
+
+# Set once the detectors have been warmed up
+detectors_ready = threading.Event()
+
+# Video-processing jobs
+job_manager = JobManager()
+
+# Bounds the requests decoding images and running inference
+admission = AdmissionController(
+    API['max_concurrent_inference'],
+    API['max_inference_queue'],
+    API['admission_timeout']
+)
+
+# Routes whose request bodies are limited to API['max_request_bytes']
+INFERENCE_ENDPOINTS = ('api.add_face_route', 'api.search_faces', 'api.detect', 'api.detect_batch')
+
+# Guards loading the face gallery from the database
+gallery_lock = threading.Lock()
+gallery_synced_at = None  # time.monotonic() of the last load
+gallery_watermark = None  # enrollment time of the newest face loaded, less the sync overlap
+
+# Decrypted face images; faces are never modified, so entries do not go stale
+face_image_cache = ByteLRUCache(API['face_image_cache_bytes'], name='face_images')
+
+# Serialized /detect responses keyed by request content
+detect_cache = ByteLRUCache(API['detect_cache_bytes'], name='detect_results', ttl=API['detect_cache_ttl'])
+
+def init_detectors(model_path=None, confidence_threshold=None):
+    """
+    Initialize detectors once.
+    
+    Args:
+        model_path: Path to YOLO model (defaults to config)
+        confidence_threshold: Minimum confidence for detections (defaults to config)
+    """
     global face_detector, object_detector
     
-    if face_detector is None:
-        face_detector = FaceDetector(model_path, confidence_threshold)
+    model_path = model_path or DETECTION['yolo_model_path']
+    if confidence_threshold is None:
+        confidence_threshold = DETECTION['confidence_threshold']
     
-    if object_detector is None:
-        object_detector = ObjectDetector(model_path, confidence_threshold)
+    # Fast path once the detectors exist
+    if face_detector is not None and object_detector is not None:
+        return
+    
+    with detectors_lock:
+        if face_detector is None:
+            face_detector = FaceDetector(
+                model_path,
+                confidence_threshold,
+                DETECTION['face_recognition_tolerance']
+            )
+        
+        if object_detector is None:
+            object_detector = ObjectDetector(model_path, confidence_threshold)
+
+def warm_up_detectors():
+    """Run dummy inference so the first request does not pay for lazy setup."""
+    init_detectors()
+    
+    try:
+        dummy = np.zeros((API['warmup_image_size'], API['warmup_image_size'], 3), dtype=np.uint8)
+        
+        with inference_lock:
+            for _ in range(API['warmup_iterations']):
+                face_detector.model(dummy)
+                object_detector.model(dummy)
+        
+        logger.info("Detectors warmed up")
+    except Exception as e:
+        logger.error(f"Error warming up detectors: {e}")
+    finally:
+        detectors_ready.set()
+
+def read_capped(stream, limit):
+    """
+    Read a stream to its end, or until it exceeds a size.
+    
+    Args:
+        stream: Input stream
+        limit: Maximum number of bytes
+        
+    Returns:
+        Bytes read, None if the stream holds more than limit bytes
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(min(64 * 1024, limit + 1 - size))
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return None
+
+@api.before_request
+def limit_request_size():
+    """Reject oversized inference requests before their body is read."""
+    if request.endpoint not in INFERENCE_ENDPOINTS:
+        return None
+    
+    limit = API['max_request_bytes']
+    too_large = request.content_length is not None and request.content_length > limit
+    
+    # Chunked uploads have no Content-Length; read them here, stopping one
+    # byte past the limit, and hand the buffered body on to the route
+    if request.content_length is None and 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+        body = read_capped(request.environ['wsgi.input'], limit)
+        too_large = body is None
+        if not too_large:
+            request.environ['wsgi.input'] = io.BytesIO(body)
+            request.environ['wsgi.input_terminated'] = True
+    
+    if too_large:
+        metrics.inc_counter('admission_rejected_total', help_text='Requests rejected by admission control',
+                            controller=admission.name, reason='too_large')
+        return jsonify({
+            'status': 'error',
+            'message': f"Request body exceeds {limit} bytes"
+        }), 413
+    
+    return None
+
+def sync_gallery():
+    """
+    Load faces enrolled since the last sync into the face detector's gallery.
+    
+    Faces enrolled through this process are added right away; this picks up
+    faces enrolled by other workers or pipelines, at most once per refresh
+    interval.
+    """
+    global gallery_synced_at, gallery_watermark
+    
+    init_detectors()
+    
+    if gallery_synced_at is not None and time.monotonic() - gallery_synced_at < API['gallery_refresh_interval']:
+        return
+    
+    with gallery_lock:
+        if gallery_synced_at is not None and time.monotonic() - gallery_synced_at < API['gallery_refresh_interval']:
+            return
+        
+        db = get_database()
+        faces = get_face_encodings(db, since=gallery_watermark)
+        face_detector.gallery.add_many(faces)
+        
+        # Timestamps are set by the enrolling client before its insert
+        # commits, so a face may become visible after a later-stamped one.
+        # Reloading an overlap is harmless: the gallery keys faces by ID.
+        if faces:
+            gallery_watermark = faces[-1]['timestamp'] - timedelta(seconds=API['gallery_sync_overlap'])
+        gallery_synced_at = time.monotonic()
+
+def decode_image(image_data):
+    """
+    Decode encoded image bytes.
+    
+    Args:
+        image_data: Encoded image bytes (e.g. JPEG)
+        
+    Returns:
+        BGR image, or None if the data is not a valid image
+    """
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def parse_results(face_result, object_result):
+    """
+    Convert the YOLO results of one image to face and object dictionaries.
+    
+    Args:
+        face_result: Result of the face detector's model
+        object_result: Result of the object detector's model
+        
+    Returns:
+        Tuple of (faces, objects)
+    """
+    faces = []
+    # Parse face detections
+    if face_result.boxes is not None:
+        for box in face_result.boxes:
+            x1, y1, x2, y2 = [float(coord) for coord in box.xyxy[0].tolist()]
+            confidence = float(box.conf[0])
+            face = {
+                'bbox': [x1, y1, x2, y2],
+                'confidence': confidence
+            }
+            faces.append(face)
+    
+    objects = []
+    # Parse object detections
+    if object_result.boxes is not None:
+        for box in object_result.boxes:
+            x1, y1, x2, y2 = [float(coord) for coord in box.xyxy[0].tolist()]
+            confidence = float(box.conf[0])
+            class_id = int(box.cls[0])
+            class_name = object_result.names[class_id]
+            obj = {
+                'class_name': class_name,
+                'bbox': [x1, y1, x2, y2],
+                'confidence': confidence
+            }
+            objects.append(obj)
+    
+    return faces, objects
+
+def infer_detections(images):
+    """
+    Detect faces and objects in a batch of images.
+    
+    Args:
+        images: List of BGR images
+        
+    Returns:
+        List of (faces, objects) tuples in input order
+    """
+    # Initialize detectors if needed
+    init_detectors()
+    
+    with inference_lock, metrics.timer('yolo_inference', camera='api'):
+        face_results = face_detector.model(images)
+        object_results = object_detector.model(images)
+    
+    return [
+        parse_results(face_result, object_result)
+        for face_result, object_result in zip(face_results, object_results)
+    ]
+
+# Micro-batches concurrent /detect requests
+detect_dispatcher = InferenceDispatcher(
+    infer_detections,
+    max_batch_size=API['batch_max_size'],
+    max_wait_ms=API['batch_max_wait_ms'],
+    name='detect'
+)
 
 @api.route('/faces', methods=['GET'])
 def get_faces():
-    """Get all faces."""
+    """Get a page of faces ordered by timestamp."""
     try:
+        try:
+            limit = parse_limit(request.args.get('limit'), API['page_default_limit'], API['page_max_limit'])
+            after = request.args.get('after')
+            after = decode_cursor(after, (datetime, str)) if after else None
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
         db = get_database()
-        faces = get_all_faces(db)
+        
+        # Fetch one extra face to know whether there is a next page
+        faces = get_faces_page(db, limit + 1, after)
+        has_more = len(faces) > limit
+        faces = faces[:limit]
         
         # Serialize faces
         serialized_faces = [serialize_face(face) for face in faces]
         
+        next_cursor = None
+        if has_more:
+            last = faces[-1]
+            next_cursor = encode_cursor(last['timestamp'], last['_id'])
+        
         return jsonify({
             'status': 'success',
             'count': len(serialized_faces),
-            'faces': serialized_faces
+            'faces': serialized_faces,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         logger.error(f"Error getting faces: {e}")
@@ -89,25 +362,57 @@ def get_face_by_id(face_id):
             'message': str(e)
         }), 500
 
+def load_face_image(face_id):
+    """
+    Get the decrypted JPEG of a face, using the face image cache.
+    
+    Args:
+        face_id: Face ID
+        
+    Returns:
+        Tuple of (JPEG bytes, ETag), or None if the face does not exist
+    """
+    cached = face_image_cache.get(face_id)
+    if cached is not None:
+        return cached
+    
+    db = get_database()
+    image_ref = get_face_image_ref(db, face_id)
+    
+    if image_ref is None:
+        return None
+    
+    if image_ref['image_hash']:
+        try:
+            image_bytes = decrypt_face_token(get_blob_store().read(image_ref['image_hash']))
+        except FileNotFoundError:
+            logger.error(f"Image {image_ref['image_hash']} of face {face_id} is missing from the blob store")
+            return None
+    elif image_ref['encrypted_image']:
+        # Not yet migrated to the blob store
+        image_bytes = decrypt_face_bytes(image_ref['encrypted_image'])
+    else:
+        return None
+    
+    etag = hashlib.sha1(image_bytes).hexdigest()
+    face_image_cache.put(face_id, image_bytes, etag)
+    
+    return image_bytes, etag
+
 @api.route('/faces/<face_id>/image', methods=['GET'])
 def get_face_image(face_id):
     """Get a face image by ID."""
     try:
-        db = get_database()
-        face = get_face(db, face_id)
+        image = load_face_image(face_id)
         
-        if face is None:
+        if image is None:
             return jsonify({
                 'status': 'error',
                 'message': f"Face with ID {face_id} not found"
             }), 404
         
-        # Decrypt face image
-        face_image = decrypt_face_data(face['encrypted_image'])
-        
-        # Convert to base64
-        _, buffer = cv2.imencode('.jpg', face_image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
+        # The stored bytes are already a JPEG
+        image_base64 = base64.b64encode(image[0]).decode('utf-8')
         
         return jsonify({
             'status': 'success',
@@ -121,7 +426,36 @@ def get_face_image(face_id):
             'message': str(e)
         }), 500
 
+@api.route('/faces/<face_id>/image.jpg', methods=['GET'])
+def get_face_image_jpeg(face_id):
+    """Get a face image by ID as JPEG bytes."""
+    try:
+        image = load_face_image(face_id)
+        
+        if image is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Face with ID {face_id} not found"
+            }), 404
+        
+        image_bytes, etag = image
+        
+        response = Response(image_bytes, mimetype='image/jpeg')
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.max_age = API['face_image_max_age']
+        
+        # Answers If-None-Match with 304 Not Modified
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Error getting face image {face_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @api.route('/faces', methods=['POST'])
+@admitted(admission)
 def add_face_route():
     """Add a face."""
     try:
@@ -146,10 +480,11 @@ def add_face_route():
             }), 400
         
         # Initialize detectors if needed
-        init_detectors('models/yolov8n.pt')
+        init_detectors()
         
         # Detect faces
-        face_detections = face_detector.detect(image)
+        with inference_lock:
+            face_detections = face_detector.detect(image)
         
         if not face_detections or 'face_encoding' not in face_detections[0]:
             return jsonify({
@@ -164,6 +499,9 @@ def add_face_route():
         db = get_database()
         face_id = add_face(db, face_data)
         
+        # Make the face searchable without waiting for a gallery sync
+        face_detector.gallery.add(face_id, face_data['encoding'])
+        
         return jsonify({
             'status': 'success',
             'face_id': face_id,
@@ -176,21 +514,114 @@ def add_face_route():
             'message': str(e)
         }), 500
 
+@api.route('/faces/search', methods=['POST'])
+@admitted(admission)
+def search_faces():
+    """Find the known faces nearest to the face in an image."""
+    try:
+        # Get request data
+        data = request.json
+        
+        if 'image' not in data:
+            return jsonify({
+                'status': 'error',
+                'message': "Image is required"
+            }), 400
+        
+        try:
+            k = parse_limit(data.get('k'), API['search_default_k'], API['search_max_k'])
+            max_distance = data.get('max_distance')
+            max_distance = float(max_distance) if max_distance is not None else None
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        # Decode image
+        image = decode_image(base64.b64decode(data['image']))
+        
+        if image is None:
+            return jsonify({
+                'status': 'error',
+                'message': "Invalid image data"
+            }), 400
+        
+        sync_gallery()
+        
+        # Detect and encode the face
+        with inference_lock:
+            face_detections = face_detector.detect(image)
+        
+        face_detections = [detection for detection in face_detections if 'face_encoding' in detection]
+        if not face_detections:
+            return jsonify({
+                'status': 'error',
+                'message': "No face detected in the image"
+            }), 400
+        
+        with metrics.timer('gallery_match', camera='api'):
+            matches = face_detector.gallery.search(face_detections[0]['face_encoding'], k, max_distance)
+        
+        return jsonify({
+            'status': 'success',
+            'count': len(matches),
+            'matches': [
+                {'face_id': face_id, 'distance': distance}
+                for face_id, distance in matches
+            ]
+        })
+    except Exception as e:
+        logger.error(f"Error searching faces: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @api.route('/objects', methods=['GET'])
 def get_objects():
-    """Get all objects."""
+    """Get a page of objects, most recently seen first."""
     try:
+        try:
+            limit = parse_limit(request.args.get('limit'), API['page_default_limit'], API['page_max_limit'])
+            after = request.args.get('after')
+            after = decode_cursor(after, (datetime, str)) if after else None
+            since = parse_timestamp(request.args.get('since'))
+            until = parse_timestamp(request.args.get('until'))
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
         db = get_database()
-        objects = list(db[DATABASE['collections']['objects']].find())
-        # Convert MongoDB _id to id for each object
-        for obj in objects:
-            obj['id'] = str(obj.get('_id', obj.get('id')))
+        
+        # Fetch one extra object to know whether there is a next page
+        objects = find_objects(
+            db,
+            limit + 1,
+            class_name=request.args.get('class_name'),
+            owner_id=request.args.get('owner_id'),
+            seen_after=since,
+            seen_before=until,
+            after=after
+        )
+        has_more = len(objects) > limit
+        objects = objects[:limit]
+        
         # Serialize objects
         serialized_objects = [serialize_object(obj) for obj in objects]
+        
+        next_cursor = None
+        if has_more:
+            last = objects[-1]
+            next_cursor = encode_cursor(last['last_seen'], last['_id'])
+        
         return jsonify({
             'status': 'success',
             'count': len(serialized_objects),
-            'objects': serialized_objects
+            'objects': serialized_objects,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         logger.error(f"Error getting objects: {e}")
@@ -226,6 +657,44 @@ def get_object_by_id(tracking_id):
             'message': str(e)
         }), 500
 
+@api.route('/objects/<tracking_id>/sightings', methods=['GET'])
+def get_object_sightings(tracking_id):
+    """Get a page of an object's sightings, oldest first."""
+    try:
+        try:
+            limit = parse_limit(request.args.get('limit'), API['page_default_limit'], API['page_max_limit'])
+            after = request.args.get('after')
+            after = decode_cursor(after, (datetime, str)) if after else None
+            since = parse_timestamp(request.args.get('since'))
+            until = parse_timestamp(request.args.get('until'))
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        db = get_database()
+        
+        # Fetch one extra sighting to know whether there is a next page
+        sightings = find_sightings(db, tracking_id, limit + 1, since=since, until=until, after=after)
+        has_more = len(sightings) > limit
+        sightings = sightings[:limit]
+        
+        next_cursor = encode_cursor(sightings[-1]['timestamp'], sightings[-1]['_id']) if has_more else None
+        
+        return jsonify({
+            'status': 'success',
+            'count': len(sightings),
+            'sightings': [serialize_sighting(sighting) for sighting in sightings],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        logger.error(f"Error getting sightings of object {tracking_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @api.route('/persons/<person_id>/objects', methods=['GET'])
 def get_person_objects_route(person_id):
     """Get all objects belonging to a person."""
@@ -259,55 +728,429 @@ def detect():
                 'status': 'error',
                 'message': "Image is required"
             }), 400
-        # Decode image
-        image_data = base64.b64decode(data['image'])
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if image is None:
+        if not isinstance(data['image'], str):
             return jsonify({
                 'status': 'error',
                 'message': "Invalid image data"
             }), 400
-        # Initialize detectors if needed
-        init_detectors('models/yolov8n.pt')
-        # Detect faces and objects using new YOLOv8 API
-        face_results = face_detector.model(image)
-        object_results = object_detector.model(image)
-        faces = []
-        # Parse face detections
-        for result in face_results:
-            if result.boxes is not None:
-                for box in result.boxes:
-                    x1, y1, x2, y2 = [float(coord) for coord in box.xyxy[0].tolist()]
-                    confidence = float(box.conf[0])
-                    face = {
-                        'bbox': [x1, y1, x2, y2],
-                        'confidence': confidence
-                    }
-                    faces.append(face)
-        objects = []
-        # Parse object detections
-        for result in object_results:
-            if result.boxes is not None:
-                for box in result.boxes:
-                    x1, y1, x2, y2 = [float(coord) for coord in box.xyxy[0].tolist()]
-                    confidence = float(box.conf[0])
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id]
-                    obj = {
-                        'class_name': class_name,
-                        'bbox': [x1, y1, x2, y2],
-                        'confidence': confidence
-                    }
-                    objects.append(obj)
+        # Identical submissions are answered from the result cache
+        cache_key = None
+        if API['detect_cache_enabled']:
+            cache_key = detect_cache_key(data['image'])
+            cached = detect_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached[0], mimetype='application/json')
+        return detect_uncached(data['image'], cache_key)
+    except Exception as e:
+        logger.error(f"Error detecting faces and objects: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@admitted(admission)
+def detect_uncached(image_base64, cache_key=None):
+    """
+    Decode an image and run detection on it.
+    
+    Args:
+        image_base64: Base64 encoded image
+        cache_key: Result cache key to store the response under, or None
+        
+    Returns:
+        Flask response
+    """
+    # Decode image
+    with metrics.timer('decode', camera='api'):
+        try:
+            image = decode_image(base64.b64decode(image_base64))
+        except ValueError:
+            # Not base64, or non-ASCII characters
+            image = None
+    if image is None:
+        return jsonify({
+            'status': 'error',
+            'message': "Invalid image data"
+        }), 400
+    # Detect faces and objects, batched with concurrent requests if enabled
+    if API['batching_enabled']:
+        faces, objects = detect_dispatcher.submit(image).result()
+    else:
+        faces, objects = infer_detections([image])[0]
+    response = jsonify({
+        'status': 'success',
+        'faces': faces,
+        'objects': objects
+    })
+    if cache_key is not None:
+        detect_cache.put(cache_key, response.get_data())
+    return response
+
+def detect_cache_key(image_base64):
+    """
+    Build the result cache key of a /detect request.
+    
+    The key covers the submitted image exactly as sent, so a hit skips
+    base64 decoding as well as image decoding and inference, plus the
+    settings that change the result.
+    
+    Args:
+        image_base64: Base64 encoded image string from the request
+        
+    Returns:
+        Cache key
+    """
+    digest = hashlib.blake2b(image_base64.encode('utf-8'), digest_size=16).hexdigest()
+    return f"{DETECTION['yolo_model_path']}:{DETECTION['confidence_threshold']}:{digest}"
+
+def read_batch_images():
+    """
+    Read the encoded images of a batch request.
+    
+    Images are read from multipart 'images' files in order, or from a raw
+    body. A raw body holds several concatenated images when the
+    X-Image-Lengths header lists their byte lengths.
+    
+    Returns:
+        List of encoded image bytes
+        
+    Raises:
+        ValueError: If there are too many images or X-Image-Lengths is malformed
+    """
+    max_images = API['batch_max_images']
+    
+    if request.files:
+        files = request.files.getlist('images')
+        if len(files) > max_images:
+            raise ValueError(f"At most {max_images} images per batch are allowed")
+        return [f.read() for f in files]
+    
+    lengths = request.headers.get('X-Image-Lengths')
+    
+    if not lengths:
+        body = request.get_data(cache=False)
+        return [body] if body else []
+    
+    # Checked before the body is read, so bad lengths cannot produce
+    # overlapping or empty slices
+    try:
+        lengths = [int(length) for length in lengths.split(',')]
+    except ValueError:
+        raise ValueError("X-Image-Lengths must be a comma-separated list of byte lengths")
+    if len(lengths) > max_images:
+        raise ValueError(f"At most {max_images} images per batch are allowed")
+    if any(length <= 0 for length in lengths):
+        raise ValueError("X-Image-Lengths must only contain positive lengths")
+    
+    body = request.get_data(cache=False)
+    if sum(lengths) != len(body):
+        raise ValueError("X-Image-Lengths does not match the body size")
+    
+    # Slicing a memoryview avoids copying the body per image
+    view = memoryview(body)
+    blobs = []
+    offset = 0
+    for length in lengths:
+        blobs.append(view[offset:offset + length])
+        offset += length
+    
+    return blobs
+
+@api.route('/detect/batch', methods=['POST'])
+@admitted(admission)
+def detect_batch():
+    """Detect faces and objects in a batch of raw (non-base64) images."""
+    try:
+        try:
+            blobs = read_batch_images()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        if not blobs:
+            return jsonify({
+                'status': 'error',
+                'message': "At least one image is required"
+            }), 400
+        
+        if len(blobs) > API['batch_max_images']:
+            return jsonify({
+                'status': 'error',
+                'message': f"At most {API['batch_max_images']} images per batch are allowed"
+            }), 400
+        
+        # Decode images in parallel (OpenCV releases the GIL)
+        with metrics.timer('decode', camera='api'):
+            images = list(decode_pool.map(decode_image, blobs))
+        
+        valid = [i for i, image in enumerate(images) if image is not None]
+        results = [{
+            'index': i,
+            'status': 'error',
+            'message': "Invalid image data"
+        } for i in range(len(images))]
+        
+        if valid:
+            # Run the valid images through each model as one batch
+            detections = infer_detections([images[i] for i in valid])
+            
+            for i, (faces, objects) in zip(valid, detections):
+                results[i] = {
+                    'index': i,
+                    'status': 'success',
+                    'faces': faces,
+                    'objects': objects
+                }
+        
         return jsonify({
             'status': 'success',
-            'faces': faces,
-            'objects': objects
+            'count': len(results),
+            'results': results
         })
     except Exception as e:
-        logger.error(f"Error detecting faces and objects: {e}")
+        logger.error(f"Error detecting faces and objects in batch: {e}")
         return jsonify({
             'status': 'error',
             'message': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+def save_upload(path):
+    """
+    Stream an uploaded file to disk without holding it in memory.
+    
+    The upload is either a multipart 'video' file or the raw request body.
+    
+    Args:
+        path: Destination path
+        
+    Raises:
+        ValueError: If the upload is missing or too large
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'video' not in request.files:
+            raise ValueError("Video file is required")
+        request.files['video'].save(path)
+        return
+    
+    written = 0
+    with open(path, 'wb') as f:
+        while True:
+            chunk = request.stream.read(1024 * 1024)
+            if not chunk:
+                break
+            
+            written += len(chunk)
+            if written > JOBS['max_upload_bytes']:
+                raise ValueError(f"Upload exceeds {JOBS['max_upload_bytes']} bytes")
+            
+            f.write(chunk)
+    
+    if written == 0:
+        raise ValueError("Video is required")
+
+@api.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue an uploaded video for processing."""
+    try:
+        if request.content_length is not None and request.content_length > JOBS['max_upload_bytes']:
+            return jsonify({
+                'status': 'error',
+                'message': f"Upload exceeds {JOBS['max_upload_bytes']} bytes"
+            }), 413
+        
+        try:
+            job = job_manager.submit(save_upload)
+        except JobQueueFull as e:
+            response = jsonify({
+                'status': 'error',
+                'message': str(e)
+            })
+            response.headers['Retry-After'] = '30'
+            return response, 429
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        response = jsonify({
+            'status': 'success',
+            'job': job
+        })
+        response.headers['Location'] = f"/api/jobs/{job['id']}"
+        return response, 202
+    except Exception as e:
+        logger.error(f"Error creating job: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a video-processing job."""
+    try:
+        try:
+            job = job_manager.get(job_id)
+        except ValueError:
+            job = None
+        
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Job with ID {job_id} not found"
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'job': job
+        })
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/jobs/<job_id>/detections', methods=['GET'])
+def get_job_detections(job_id):
+    """Download the detections of a completed job as JSON lines."""
+    try:
+        try:
+            job = job_manager.get(job_id)
+        except ValueError:
+            job = None
+        
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Job with ID {job_id} not found"
+            }), 404
+        
+        if job['state'] != 'completed':
+            return jsonify({
+                'status': 'error',
+                'message': f"Job {job_id} is {job['state']}"
+            }), 409
+        
+        return send_file(job_manager.detections_path(job_id), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Error getting detections of job {job_id}: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Report whether the detectors are loaded and warmed up."""
+    if not detectors_ready.is_set():
+        return jsonify({
+            'status': 'warming_up'
+        }), 503
+    
+    return jsonify({
+        'status': 'ready'
+    })
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get pipeline metrics in Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/stream/<camera_id>', methods=['GET'])
+def stream_camera(camera_id):
+    """Stream the annotated frames of a running pipeline as MJPEG."""
+    try:
+        reader = FrameReader(camera_id)
+    except FileNotFoundError:
+        return jsonify({
+            'status': 'error',
+            'message': f"No live stream for camera {camera_id}"
+        }), 404
+    
+    def generate():
+        try:
+            for data in reader.frames():
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                       + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n')
+        finally:
+            reader.close()
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@api.route('/stream/<camera_id>/snapshot', methods=['GET'])
+def stream_snapshot(camera_id):
+    """Get the latest annotated frame of a running pipeline as JPEG."""
+    try:
+        reader = FrameReader(camera_id)
+    except FileNotFoundError:
+        return jsonify({
+            'status': 'error',
+            'message': f"No live stream for camera {camera_id}"
+        }), 404
+    
+    try:
+        data = reader.snapshot()
+    finally:
+        reader.close()
+    
+    if data is None:
+        return jsonify({
+            'status': 'error',
+            'message': f"No frame received from camera {camera_id}"
+        }), 503
+    
+    response = Response(data, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@api.route('/events', methods=['GET'])
+def stream_events():
+    """Stream pipeline events (detections, ownership changes) as server-sent events."""
+    if len(events.bus.subscribers) >= EVENTS['max_subscribers']:
+        return jsonify({
+            'status': 'error',
+            'message': "Too many event subscribers"
+        }), 503
+    
+    types = request.args.get('types')
+    types = [t for t in types.split(',') if t] if types else None
+    camera = request.args.get('camera')
+    
+    subscription = events.bus.subscribe(types)
+    
+    def generate():
+        try:
+            # Tell the client to reconnect quickly if the connection drops
+            yield 'retry: 1000\n\n'
+            
+            while True:
+                batch = subscription.get(timeout=EVENTS['keepalive_seconds'])
+                
+                if not batch:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                
+                chunks = []
+                for event in batch:
+                    if camera and event['data'].get('camera', camera) != camera:
+                        continue
+                    chunks.append(f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n")
+                
+                if chunks:
+                    yield ''.join(chunks)
+        finally:
+            subscription.close()
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,6 +1,9 @@
 """
 Data serializers for API responses.
 """
+import json
+import base64
+import binascii
 from datetime import datetime
 
 def serialize_face(face):
@@ -59,6 +62,29 @@ def serialize_object(obj):
         'metadata': obj.get('metadata', {})
     }
 
+def serialize_sighting(sighting):
+    """
+    Serialize a sighting for API response.
+    
+    Args:
+        sighting: Sighting data dictionary
+        
+    Returns:
+        Serialized sighting dictionary
+    """
+    timestamp = sighting.get('timestamp')
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    
+    return {
+        'id': sighting.get('_id'),
+        'tracking_id': sighting.get('tracking_id'),
+        'class_name': sighting.get('class_name'),
+        'owner_id': sighting.get('owner_id'),
+        'timestamp': timestamp,
+        'bbox': sighting.get('bbox')
+    }
+
 def serialize_detection(detection):
     """
     Serialize a detection for API response.
@@ -83,4 +109,107 @@ def serialize_detection(detection):
     if 'face_id' in detection:
         serialized['face_id'] = detection['face_id']
     
-    return serialized
\ No newline at end of file
+    return serialized
+
+def encode_cursor(*values):
+    """
+    Encode pagination keys as an opaque cursor.
+    
+    Args:
+        *values: Sort key values of the last item of a page
+        
+    Returns:
+        URL-safe cursor string
+    """
+    keys = [
+        {'t': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    data = json.dumps(keys, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, types=None):
+    """
+    Decode a cursor created by encode_cursor.
+    
+    Args:
+        cursor: Cursor string
+        types: Optional expected type of each sort key value
+        
+    Returns:
+        Tuple of sort key values
+        
+    Raises:
+        ValueError: If the cursor is malformed or its values do not match types
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        keys = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        
+        if not isinstance(keys, list):
+            raise ValueError("Invalid cursor")
+        
+        values = tuple(
+            datetime.fromisoformat(key['t']) if isinstance(key, dict) else key
+            for key in keys
+        )
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    
+    # Cursors are user input; keys of the wrong shape must not reach the database
+    if types is not None and (len(values) != len(types) or
+                              not all(isinstance(value, t) for value, t in zip(values, types))):
+        raise ValueError("Invalid cursor")
+    
+    return values
+
+def parse_limit(value, default, maximum):
+    """
+    Parse a page size query parameter.
+    
+    Args:
+        value: Raw query parameter value or None
+        default: Page size when the parameter is missing
+        maximum: Largest allowed page size
+        
+    Returns:
+        Page size
+        
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value is None:
+        return default
+    
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    
+    return min(limit, maximum)
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp query parameter.
+    
+    Args:
+        value: Raw query parameter value or None
+        
+    Returns:
+        Naive datetime in local time, or None if the parameter is missing
+        
+    Raises:
+        ValueError: If the value is not a valid timestamp
+    """
+    if not value:
+        return None
+    
+    try:
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise ValueError(f"Invalid timestamp: {value}") from e
+    
+    # Stored timestamps are naive local times (datetime.now())
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    
+    return timestamp
@@ -26,18 +26,64 @@ TRACKING = {
     'distance_threshold': int(os.environ.get('DISTANCE_THRESHOLD', '200'))
 }
 
+# Pre-fork server settings
+SERVER = {
+    'workers': int(os.environ.get('SERVER_WORKERS', '2')),
+    'threads_per_worker': int(os.environ.get('SERVER_THREADS_PER_WORKER', '0')),  # 0 for cores / workers
+    'backlog': int(os.environ.get('SERVER_BACKLOG', '1024'))
+}
+
+# Offline (chunk-parallel) video processing settings
+OFFLINE = {
+    'workers': int(os.environ.get('OFFLINE_WORKERS', '1')),
+    'chunk_frames': int(os.environ.get('OFFLINE_CHUNK_FRAMES', '1800')),
+    'overlap_frames': int(os.environ.get('OFFLINE_OVERLAP_FRAMES', '15')),
+    'stitch_iou_threshold': float(os.environ.get('OFFLINE_STITCH_IOU_THRESHOLD', '0.5'))
+}
+
+# Video-processing job settings
+JOBS = {
+    'dir': os.environ.get('JOBS_DIR', os.path.join(BASE_DIR, 'static', 'jobs')),
+    'workers': int(os.environ.get('JOBS_WORKERS', '1')),  # jobs processed at the same time per API process
+    'max_pending': int(os.environ.get('JOBS_MAX_PENDING', '4')),  # queued and running jobs per API process
+    'max_upload_bytes': int(os.environ.get('JOBS_MAX_UPLOAD_BYTES', str(2 * 1024 * 1024 * 1024))),
+    'status_interval': float(os.environ.get('JOBS_STATUS_INTERVAL', '0.5')),  # seconds between progress updates
+    'retention_seconds': int(os.environ.get('JOBS_RETENTION_SECONDS', '86400')),
+    'nice': int(os.environ.get('JOBS_NICE', '10'))  # priority decrease of job threads
+}
+
 # Database settings
 DATABASE = {
-    'type': os.environ.get('DB_TYPE', 'mongodb'),  # 'mongodb' or 'postgresql'
+    'type': os.environ.get('DB_TYPE', 'mongodb'),  # 'mongodb', 'postgresql' or 'sqlite'
     'connection_string': os.environ.get('DB_CONNECTION_STRING', 'mongodb://localhost:27017/'),
     'database_name': os.environ.get('DB_NAME', 'face_object_detection'),
+    'pool_min': int(os.environ.get('DB_POOL_MIN', '1')),
+    'pool_max': int(os.environ.get('DB_POOL_MAX', '10')),
+    'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '5')),  # seconds to wait for a free connection
+    'health_check_interval': float(os.environ.get('DB_HEALTH_CHECK_INTERVAL', '30')),  # idle seconds before a connection is pinged
+    'sqlite_path': os.environ.get('DB_SQLITE_PATH', os.path.join(BASE_DIR, 'static', 'face_object_detection.db')),
+    'sqlite_busy_timeout': float(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', '5')),  # seconds a writer waits for the write lock
+    'sqlite_synchronous': os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),  # 'NORMAL' or 'FULL'
+    'sqlite_cache_mb': int(os.environ.get('DB_SQLITE_CACHE_MB', '64')),  # page cache per connection
+    'sqlite_mmap_mb': int(os.environ.get('DB_SQLITE_MMAP_MB', '256')),
     'collections': {
         'faces': 'faces',
         'objects': 'objects',
-        'associations': 'associations'
+        'associations': 'associations',
+        'sightings': 'sightings'
     }
 }
 
+# Sightings log settings
+SIGHTINGS = {
+    'batch_size': int(os.environ.get('SIGHTINGS_BATCH_SIZE', '500')),  # sightings buffered before a write
+    'flush_interval': float(os.environ.get('SIGHTINGS_FLUSH_INTERVAL', '2')),  # max seconds a sighting stays buffered
+    'min_interval': float(os.environ.get('SIGHTINGS_MIN_INTERVAL', '1')),  # seconds between sightings of an object with the same owner
+    'rollup_interval': float(os.environ.get('SIGHTINGS_ROLLUP_INTERVAL', '10')),  # seconds between rollups into objects
+    'retention_days': int(os.environ.get('SIGHTINGS_RETENTION_DAYS', '30')),
+    'prune_interval': float(os.environ.get('SIGHTINGS_PRUNE_INTERVAL', '3600'))  # seconds between retention runs
+}
+
 # Encryption settings
 ENCRYPTION = {
     'key_file': os.path.join(BASE_DIR, 'static', 'encryption_key.key'),
@@ -49,11 +95,70 @@ API = {
     'host': os.environ.get('API_HOST', '0.0.0.0'),
     'port': int(os.environ.get('API_PORT', '8000')),
     'debug': os.environ.get('API_DEBUG', 'False').lower() == 'true',
-    'secret_key': os.environ.get('API_SECRET_KEY', 'your-secret-key-here')
+    'secret_key': os.environ.get('API_SECRET_KEY', 'your-secret-key-here'),
+    'batch_max_images': int(os.environ.get('API_BATCH_MAX_IMAGES', '64')),
+    'decode_threads': int(os.environ.get('API_DECODE_THREADS', '4')),
+    'batching_enabled': os.environ.get('API_BATCHING_ENABLED', 'True').lower() == 'true',
+    'batch_max_size': int(os.environ.get('API_BATCH_MAX_SIZE', '8')),
+    'batch_max_wait_ms': float(os.environ.get('API_BATCH_MAX_WAIT_MS', '5')),
+    'page_default_limit': int(os.environ.get('API_PAGE_DEFAULT_LIMIT', '100')),
+    'page_max_limit': int(os.environ.get('API_PAGE_MAX_LIMIT', '1000')),
+    'preload_models': os.environ.get('API_PRELOAD_MODELS', 'True').lower() == 'true',
+    'warmup_iterations': int(os.environ.get('API_WARMUP_ITERATIONS', '2')),
+    'warmup_image_size': int(os.environ.get('API_WARMUP_IMAGE_SIZE', '640')),
+    'face_image_cache_bytes': int(os.environ.get('API_FACE_IMAGE_CACHE_BYTES', str(64 * 1024 * 1024))),
+    'face_image_max_age': int(os.environ.get('API_FACE_IMAGE_MAX_AGE', '86400')),  # seconds clients may reuse a face image
+    'search_default_k': int(os.environ.get('API_SEARCH_DEFAULT_K', '5')),
+    'search_max_k': int(os.environ.get('API_SEARCH_MAX_K', '100')),
+    'gallery_refresh_interval': float(os.environ.get('API_GALLERY_REFRESH_INTERVAL', '5')),  # seconds between loading faces enrolled by other workers
+    'gallery_sync_overlap': float(os.environ.get('API_GALLERY_SYNC_OVERLAP', '60')),  # seconds each sync reloads, for faces committed after a later-stamped one
+    'detect_cache_enabled': os.environ.get('API_DETECT_CACHE_ENABLED', 'False').lower() == 'true',
+    'detect_cache_bytes': int(os.environ.get('API_DETECT_CACHE_BYTES', str(32 * 1024 * 1024))),
+    'detect_cache_ttl': float(os.environ.get('API_DETECT_CACHE_TTL', '300')),  # seconds a cached /detect response is reused
+    'max_concurrent_inference': int(os.environ.get('API_MAX_CONCURRENT_INFERENCE', '8')),  # at least batch_max_size so micro-batches can fill
+    'max_inference_queue': int(os.environ.get('API_MAX_INFERENCE_QUEUE', '32')),
+    'admission_timeout': float(os.environ.get('API_ADMISSION_TIMEOUT', '10')),  # seconds a request waits for an inference slot
+    'max_request_bytes': int(os.environ.get('API_MAX_REQUEST_BYTES', str(20 * 1024 * 1024)))  # inference request bodies
+}
+
+# Metrics settings
+METRICS = {
+    'enabled': os.environ.get('METRICS_ENABLED', 'True').lower() == 'true',
+    'window': int(os.environ.get('METRICS_WINDOW', '1024')),  # samples per camera and stage
+    'dir': os.environ.get('METRICS_DIR', os.path.join(BASE_DIR, 'static', 'metrics')),  # shared by all processes
+    'export_interval': float(os.environ.get('METRICS_EXPORT_INTERVAL', '5'))  # seconds
+}
+
+# Tracing settings
+TRACING = {
+    'sample_rate': float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))  # fraction of frames traced
+}
+
+# Live stream settings
+STREAM = {
+    'max_frame_bytes': int(os.environ.get('STREAM_MAX_FRAME_BYTES', str(4 * 1024 * 1024))),
+    'jpeg_quality': int(os.environ.get('STREAM_JPEG_QUALITY', '80')),
+    'poll_interval_ms': float(os.environ.get('STREAM_POLL_INTERVAL_MS', '5')),
+    'reader_timeout': float(os.environ.get('STREAM_READER_TIMEOUT', '2.0')),  # seconds without viewers before encoding stops
+    'idle_timeout': float(os.environ.get('STREAM_IDLE_TIMEOUT', '10.0'))  # seconds without new frames before a stream ends
+}
+
+# Event stream settings
+EVENTS = {
+    'buffer_size': int(os.environ.get('EVENTS_BUFFER_SIZE', '256')),  # events buffered per subscriber before the oldest are dropped
+    'keepalive_seconds': float(os.environ.get('EVENTS_KEEPALIVE_SECONDS', '15')),
+    'max_subscribers': int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', '100'))
 }
 
 # Static files
 STATIC = {
     'faces_dir': os.path.join(BASE_DIR, 'static', 'faces'),
     'objects_dir': os.path.join(BASE_DIR, 'static', 'objects')
-}
\ No newline at end of file
+}
+
+# Blob store for encrypted face images
+BLOBS = {
+    'backend': os.environ.get('BLOB_BACKEND', 'filesystem'),
+    'root': os.environ.get('BLOB_ROOT', STATIC['faces_dir']),
+    'shard_depth': int(os.environ.get('BLOB_SHARD_DEPTH', '2'))  # directory levels of two hex characters
+}
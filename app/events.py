@@ -0,0 +1,143 @@
+"""
+In-process publish/subscribe of pipeline events.
+
+Pipelines publish detection and ownership-change events; API clients
+subscribe to them (see ``GET /api/events``). Each subscriber has a bounded
+buffer. When a subscriber falls behind, its oldest events are dropped and it
+is told how many it missed, so a slow client never blocks the pipeline.
+
+Only pipelines running in the same process (e.g. API jobs) reach the
+subscribers of that process.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+from app.config import EVENTS
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """Buffered events of one subscriber."""
+
+    def __init__(self, bus, types=None, buffer_size=None):
+        """
+        Initialize the subscription.
+
+        Args:
+            bus: EventBus the subscription belongs to
+            types: Event types to receive, or None for all
+            buffer_size: Maximum number of buffered events
+        """
+        self.bus = bus
+        self.types = set(types) if types else None
+        self.buffer = deque(maxlen=buffer_size or EVENTS['buffer_size'])
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, event):
+        """Buffer an event without blocking, dropping the oldest one if the buffer is full."""
+        if self.types is not None and event['type'] not in self.types:
+            return
+
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(event)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for events and take all buffered ones.
+
+        If events were dropped since the last call, a 'dropped' event with
+        their count comes first.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            List of events, empty if none arrived in time
+        """
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+
+            events = list(self.buffer)
+            self.buffer.clear()
+
+            if self.dropped:
+                events.insert(0, {'type': 'dropped', 'time': time.time(), 'data': {'count': self.dropped}})
+                self.dropped = 0
+
+        return events
+
+    def close(self):
+        """Stop receiving events."""
+        self.bus.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class EventBus:
+    """Fans events out to subscribers."""
+
+    def __init__(self):
+        """Initialize the bus without subscribers."""
+        self.lock = threading.Lock()
+        self.subscribers = ()
+
+    def has_subscribers(self):
+        """Check whether anyone listens, so publishers can skip building events."""
+        return bool(self.subscribers)
+
+    def subscribe(self, types=None, buffer_size=None):
+        """
+        Subscribe to events.
+
+        Args:
+            types: Event types to receive, or None for all
+            buffer_size: Maximum number of buffered events
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(self, types, buffer_size)
+        with self.lock:
+            self.subscribers = self.subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription."""
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscription)
+
+    def publish(self, event_type, data):
+        """
+        Publish an event to all subscribers.
+
+        Args:
+            event_type: Event type
+            data: JSON-serializable event data
+        """
+        # Copy-on-write tuple, so publishing needs no lock
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+
+        event = {'type': event_type, 'time': time.time(), 'data': data}
+        for subscription in subscribers:
+            subscription.offer(event)
+
+# Events of this process
+bus = EventBus()
+
+def has_subscribers():
+    """Check whether anyone listens to events of this process."""
+    return bus.has_subscribers()
+
+def publish(event_type, data):
+    """Publish an event to the subscribers of this process."""
+    bus.publish(event_type, data)
@@ -0,0 +1,281 @@
+"""
+Asynchronous video-processing jobs.
+
+Uploaded videos are queued to a small, bounded thread pool that runs the
+``process_video`` pipeline. Each job has a directory holding the upload, the
+detections and a ``status.json`` that is rewritten atomically as the job
+progresses, so any API worker process can answer status polls for any job.
+
+Job threads run at a lower scheduling priority (on Linux) so a long batch
+job does not take CPU time away from live cameras and API requests.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import JOBS
+from app.main import process_video
+from database.db import release_database
+
+logger = logging.getLogger(__name__)
+
+# Job IDs are UUIDs; anything else must not reach the filesystem
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+FINISHED_STATES = ('completed', 'failed')
+
+class JobQueueFull(Exception):
+    """Raised when no more jobs can be queued."""
+
+def _write_json_atomic(path, data):
+    """Write JSON so that readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _process_alive(pid):
+    """Check whether a process exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobManager:
+    """Queues video-processing jobs and tracks their status on disk."""
+
+    def __init__(self, jobs_dir=None, workers=None, max_pending=None):
+        """
+        Initialize the job manager.
+
+        Args:
+            jobs_dir: Directory holding one subdirectory per job
+            workers: Number of jobs processed at the same time
+            max_pending: Maximum number of queued and running jobs of this process
+        """
+        self.jobs_dir = jobs_dir or JOBS['dir']
+        self.workers = workers or JOBS['workers']
+        self.max_pending = max_pending or JOBS['max_pending']
+
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+        self.pending = 0
+
+    def _ensure_started(self):
+        """Create the worker pool (again after a fork, which does not copy threads)."""
+        if self.executor is not None and self.pid == os.getpid():
+            return
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        self.pid = os.getpid()
+        self.pending = 0
+
+    def job_dir(self, job_id):
+        """Get the directory of a job."""
+        if not JOB_ID_PATTERN.match(job_id):
+            raise ValueError(f"Invalid job ID: {job_id}")
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _status_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), 'status.json')
+
+    def detections_path(self, job_id):
+        """Get the path of a job's detections file."""
+        return os.path.join(self.job_dir(job_id), 'detections.jsonl')
+
+    def submit(self, write_upload):
+        """
+        Create a job from an upload and queue it.
+
+        Args:
+            write_upload: Callable writing the uploaded video to the path it is given
+
+        Returns:
+            Status dictionary of the new job
+
+        Raises:
+            JobQueueFull: If the maximum number of pending jobs is reached
+        """
+        with self.lock:
+            self._ensure_started()
+            if self.pending >= self.max_pending:
+                raise JobQueueFull(f"{self.pending} jobs are already pending")
+            self.pending += 1
+
+        job_id = str(uuid.uuid4())
+        job_dir = self.job_dir(job_id)
+
+        try:
+            self._prune()
+            os.makedirs(job_dir)
+
+            video_path = os.path.join(job_dir, 'video')
+            write_upload(video_path)
+
+            status = {
+                'id': job_id,
+                'state': 'queued',
+                'pid': os.getpid(),
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'frames': 0,
+                'total_frames': None,
+                'progress': None,
+                'fps': None,
+                'result': None,
+                'error': None
+            }
+            _write_json_atomic(self._status_path(job_id), status)
+
+            # The job thread updates its own copy
+            self.executor.submit(self._run, job_id, video_path, dict(status))
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Queued job {job_id}")
+        return status
+
+    def get(self, job_id):
+        """
+        Get the status of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Status dictionary, or None if the job does not exist
+
+        Raises:
+            ValueError: If the job ID is not a valid job ID
+        """
+        path = self._status_path(job_id)
+
+        try:
+            with open(path) as f:
+                status = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # The process running the job died before finishing it
+        if status['state'] not in FINISHED_STATES and not _process_alive(status['pid']):
+            status['state'] = 'failed'
+            status['error'] = 'Job was interrupted'
+
+        return status
+
+    def _run(self, job_id, video_path, status):
+        """Process a job in a worker thread."""
+        self._lower_priority()
+
+        status.update(state='running', started_at=datetime.now().isoformat())
+        _write_json_atomic(self._status_path(job_id), status)
+
+        last_write = 0.0
+
+        def progress(frames, total_frames, elapsed):
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write < JOBS['status_interval']:
+                return
+            last_write = now
+
+            status.update(
+                frames=frames,
+                total_frames=total_frames or None,
+                progress=min(1.0, frames / total_frames) if total_frames else None,
+                fps=frames / elapsed if elapsed > 0 else None
+            )
+            _write_json_atomic(self._status_path(job_id), status)
+
+        try:
+            stats = process_video(
+                video_path,
+                camera_id=f"job-{job_id[:8]}",
+                detections_out=self.detections_path(job_id),
+                detections_format='jsonl',
+                progress=progress
+            )
+
+            if stats is None:
+                status.update(state='failed', error='Could not open the uploaded video')
+            elif stats['error']:
+                status.update(state='failed', error=stats['error'])
+            else:
+                status.update(
+                    state='completed',
+                    frames=stats['frames'],
+                    progress=1.0,
+                    fps=stats['fps'],
+                    result={
+                        'frames': stats['frames'],
+                        'seconds': stats['seconds'],
+                        'fps': stats['fps'],
+                        'detections': f"/api/jobs/{job_id}/detections"
+                    }
+                )
+        except Exception as e:
+            logger.error(f"Error running job {job_id}: {e}", exc_info=True)
+            status.update(state='failed', error=str(e))
+        finally:
+            release_database()
+
+            status['finished_at'] = datetime.now().isoformat()
+            _write_json_atomic(self._status_path(job_id), status)
+
+            # The upload is not needed once processed
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+
+            with self.lock:
+                self.pending -= 1
+
+        logger.info(f"Job {job_id} {status['state']}")
+
+    def _lower_priority(self):
+        """Lower the scheduling priority of the calling job thread."""
+        if not JOBS['nice'] or not hasattr(os, 'setpriority'):
+            return
+
+        try:
+            # On Linux the priority of a thread ID applies to that thread only
+            current = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), current + JOBS['nice'])
+        except OSError as e:
+            logger.warning(f"Could not lower the priority of the job thread: {e}")
+
+    def _prune(self):
+        """Remove finished jobs older than the retention period."""
+        if not os.path.isdir(self.jobs_dir):
+            return
+
+        cutoff = datetime.now().timestamp() - JOBS['retention_seconds']
+
+        for job_id in os.listdir(self.jobs_dir):
+            if not JOB_ID_PATTERN.match(job_id):
+                continue
+
+            status = self.get(job_id)
+            if status is None or status['state'] not in FINISHED_STATES:
+                continue
+
+            # Interrupted jobs never recorded when they finished
+            finished_at = status['finished_at'] or status['created_at']
+            if datetime.fromisoformat(finished_at).timestamp() < cutoff:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
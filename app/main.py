@@ -1,20 +1,27 @@
 """
 Main application entry point.
 """
+import os
 import cv2
 import time
 import argparse
 import logging
-import numpy as np
-from datetime import datetime
+import cProfile
+import pstats
+from datetime import datetime, timedelta
 
 from app import create_app
-from app.config import DETECTION, TRACKING, DATABASE
-from detection.face_detector import FaceDetector
-from detection.object_detector import ObjectDetector
+from app import metrics
+from app import tracing
+from app.config import DATABASE, OFFLINE, TRACING
+from app.pipeline import create_detectors, associate_objects, record_associations, publish_detections
+from app.offline import process_video_chunked, recording_start
+from app.sightings import SightingRecorder
+from app.sinks import open_sink
+from app.stream import FramePublisher
 from detection.utils import draw_boxes, filter_detections
 from database.db import get_database
-from database.operations import add_face, add_object, update_object, get_all_faces
+from database.operations import add_face, get_all_faces
 from encryption.encrypt import encrypt_face_data
 
 logger = logging.getLogger(__name__)
@@ -32,26 +39,85 @@ def parse_args():
     parser.add_argument('--display', action='store_true',
                         help='Display video')
     
+    parser.add_argument('--detections-out', type=str, default=None, metavar='PATH',
+                        help='Stream per-frame detections to a .jsonl file or a directory of NumPy chunks')
+    
+    parser.add_argument('--detections-format', type=str, choices=['jsonl', 'npz'], default=None,
+                        help='Detections output format (inferred from --detections-out when omitted)')
+    
+    parser.add_argument('--publish', action='store_true',
+                        help='Publish annotated frames for the live stream endpoint (/api/stream/<camera-id>)')
+    
+    parser.add_argument('--camera-id', type=str, default=None,
+                        help='Camera label used in metrics (defaults to the source)')
+    
+    parser.add_argument('--workers', type=int, default=OFFLINE['workers'],
+                        help='Number of worker processes for chunked offline processing of video files')
+    
+    parser.add_argument('--chunk-frames', type=int, default=OFFLINE['chunk_frames'],
+                        help='Number of frames per chunk in offline mode')
+    
+    parser.add_argument('--overlap', type=int, default=OFFLINE['overlap_frames'],
+                        help='Number of overlap frames used to stitch track IDs between chunks')
+    
+    parser.add_argument('--checkpoint-dir', type=str, default=None,
+                        help='Directory for chunk checkpoints (defaults to <source>.chunks)')
+    
+    parser.add_argument('--recorded-at', type=datetime.fromisoformat, default=None, metavar='TIME',
+                        help='ISO time at which a video file started recording, used to timestamp sightings '
+                             '(defaults to the file modification time less its duration)')
+    
+    parser.add_argument('--trace', type=str, default=None, metavar='FILE',
+                        help='Write per-frame, per-stage spans to FILE in Chrome trace-event format')
+    
+    parser.add_argument('--trace-sample-rate', type=float, default=TRACING['sample_rate'],
+                        help='Fraction of frames to trace')
+    
+    parser.add_argument('--profile', type=str, nargs='?', const='profile.txt', default=None, metavar='FILE',
+                        help='Run under cProfile and write cumulative-time sorted stats to FILE')
+    
     return parser.parse_args()
 
-def process_video(source, output=None, display=False):
-    """Process video from the given source."""
+def process_video(source, output=None, display=False, camera_id=None,
+                  detections_out=None, detections_format=None, publish=False, progress=None,
+                  recorded_at=None):
+    """
+    Process video from the given source.
+    
+    Frames are only annotated when they are written, displayed or watched by a
+    stream viewer, so a run with just a detections sink skips drawing and
+    video encoding entirely.
+    
+    Args:
+        source: Video source (camera index, path to video file, or RTSP URL)
+        output: Output video path
+        display: Whether to display the annotated video
+        camera_id: Camera label used in metrics (defaults to the source)
+        detections_out: Path of the structured detections output
+        detections_format: 'jsonl' or 'npz' (inferred from detections_out when None)
+        publish: Whether to publish annotated frames for live stream viewers
+        progress: Optional callback called after each frame with the number
+            of processed frames, the total number of frames (0 if unknown)
+            and the elapsed seconds
+        recorded_at: Wall-clock time of the first frame of a video file, used
+            to timestamp sightings (see app.offline.recording_start)
+        
+    Returns:
+        Dictionary with the number of frames, processing time, FPS and the
+        error that stopped processing (None if it ran to the end), or None
+        if the source could not be opened
+    """
+    camera_id = camera_id or source
+    
+    # Label metrics of this thread with the camera
+    metrics.set_camera(camera_id)
+    
     # Initialize detectors
-    face_detector = FaceDetector(
-        model_path=DETECTION['yolo_model_path'],
-        confidence_threshold=DETECTION['confidence_threshold'],
-        face_recognition_tolerance=DETECTION['face_recognition_tolerance']
-    )
-    
-    object_detector = ObjectDetector(
-        model_path=DETECTION['yolo_model_path'],
-        confidence_threshold=DETECTION['confidence_threshold'],
-        iou_threshold=TRACKING['iou_threshold'],
-        max_age=TRACKING['max_age']
-    )
+    face_detector, object_detector = create_detectors()
     
     # Initialize database
     db = get_database()
+    recorder = SightingRecorder(db)
     
     # Load known faces
     known_faces = get_all_faces(db)
@@ -63,7 +129,7 @@ def process_video(source, output=None, display=False):
     
     if not cap.isOpened():
         logger.error(f"Failed to open video source: {source}")
-        return
+        return None
     
     logger.info(f"Video source opened: {source}")
     
@@ -71,6 +137,7 @@ def process_video(source, output=None, display=False):
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
     
     # Create output video writer if specified
     if output:
@@ -80,14 +147,29 @@ def process_video(source, output=None, display=False):
     else:
         out = None
     
+    # Open detections sink if specified
+    sink = open_sink(detections_out, detections_format) if detections_out else None
+    
+    # Publish annotated frames for live stream viewers if specified
+    publisher = FramePublisher(camera_id) if publish else None
+    
+    # Live sources have no meaningful stream position, use wall clock instead
+    live_source = isinstance(source, int) or '://' in source
+    video_start = None if live_source else recording_start(source, total_frames / fps if fps > 0 else 0, recorded_at)
+    annotate = out is not None or display
+    
     # Process frames
     frame_count = 0
+    error = None
     start_time = time.time()
     
     try:
         while True:
+            tracing.begin_frame(frame_count)
+            
             # Read frame
-            ret, frame = cap.read()
+            with metrics.timer('decode'):
+                ret, frame = cap.read()
             
             if not ret:
                 logger.info("End of video stream")
@@ -100,76 +182,62 @@ def process_video(source, output=None, display=False):
             object_detections = object_detector.detect(frame)
             
             # Associate objects with faces
-            for obj in object_detections:
-                if 'tracking_id' not in obj:
-                    continue
-                
-                # Find closest face
-                closest_face = None
-                min_distance = TRACKING['distance_threshold']
-                
-                for face in face_detections:
-                    if 'face_id' not in face:
-                        continue
-                    
-                    # Calculate distance between face and object
-                    face_bbox = face['bbox']
-                    obj_bbox = obj['bbox']
-                    
-                    face_center = ((face_bbox[0] + face_bbox[2]) / 2, (face_bbox[1] + face_bbox[3]) / 2)
-                    obj_center = ((obj_bbox[0] + obj_bbox[2]) / 2, (obj_bbox[1] + obj_bbox[3]) / 2)
-                    
-                    distance = np.sqrt((face_center[0] - obj_center[0])**2 + (face_center[1] - obj_center[1])**2)
-                    
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_face = face
-                
-                # If a close face is found, associate object with face
-                if closest_face:
-                    # Check if object exists in database
-                    existing_obj = db.objects.find_one({"tracking_id": obj['tracking_id']})
-                    
-                    if existing_obj:
-                        # Update object if owner has changed
-                        if existing_obj.get('owner_id') != closest_face['face_id']:
-                            update_object(db, obj['tracking_id'], {
-                                'owner_id': closest_face['face_id'],
-                                'last_seen': datetime.now()
-                            })
-                    else:
-                        # Add new object
-                        add_object(db, {
-                            'tracking_id': obj['tracking_id'],
-                            'class_name': obj['class_name'],
-                            'owner_id': closest_face['face_id'],
-                            'first_seen': datetime.now(),
-                            'last_seen': datetime.now()
-                        })
+            with metrics.timer('association'):
+                associations = associate_objects(face_detections, object_detections)
+            
+            with metrics.timer('db_write'):
+                frame_time = None if live_source else video_start + timedelta(milliseconds=cap.get(cv2.CAP_PROP_POS_MSEC))
+                record_associations(recorder, associations, frame_time)
+            
+            # Push detections to event subscribers
+            publish_detections(camera_id, frame_count, face_detections, object_detections)
             
-            # Draw detections on frame
-            annotated_frame = draw_boxes(frame.copy(), face_detections, object_detections)
+            # Write structured detections
+            if sink:
+                timestamp = time.time() if live_source else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                with metrics.timer('sink_write'):
+                    sink.write(frame_count, timestamp, face_detections, object_detections)
             
-            # Write frame to output video
-            if out:
-                out.write(annotated_frame)
+            # Stream viewers come and go; nobody watching means no drawing or encoding
+            streaming = publisher is not None and publisher.has_viewers()
             
-            # Display frame
-            if display:
-                cv2.imshow("Face and Object Detection", annotated_frame)
+            if annotate or streaming:
+                # Draw detections on frame
+                with metrics.timer('draw'):
+                    annotated_frame = draw_boxes(frame, face_detections, object_detections)
                 
-                # Exit on 'q' key
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    logger.info("User requested exit")
-                    break
+                # Write frame to output video
+                if out:
+                    with metrics.timer('encode'):
+                        out.write(annotated_frame)
+                
+                # Publish frame to live stream viewers
+                if streaming:
+                    with metrics.timer('encode'):
+                        publisher.publish(annotated_frame)
+                
+                # Display frame
+                if display:
+                    cv2.imshow("Face and Object Detection", annotated_frame)
+                    
+                    # Exit on 'q' key
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        logger.info("User requested exit")
+                        break
             
             # Increment frame count
             frame_count += 1
+            
+            if progress:
+                progress(frame_count, total_frames, time.time() - start_time)
     except KeyboardInterrupt:
         logger.info("User interrupted")
     except Exception as e:
         logger.error(f"Error processing video: {e}", exc_info=True)
+        error = str(e)
     finally:
+        tracing.end_frame()
+        
         # Calculate processing time and FPS
         processing_time = time.time() - start_time
         processing_fps = frame_count / processing_time if processing_time > 0 else 0
@@ -179,13 +247,71 @@ def process_video(source, output=None, display=False):
         # Release resources
         cap.release()
         
+        with metrics.timer('db_write'):
+            recorder.close()
+        
         if out:
             out.release()
         
+        if sink:
+            sink.close()
+        
+        if publisher:
+            publisher.close()
+        
         if display:
             cv2.destroyAllWindows()
         
         logger.info("Processing completed")
+    
+    return {
+        'frames': frame_count,
+        'seconds': processing_time,
+        'fps': processing_fps,
+        'error': error
+    }
+
+def write_profile(profiler, path):
+    """
+    Write profiler stats sorted by cumulative time.
+    
+    Args:
+        profiler: cProfile.Profile instance
+        path: Output text file; raw stats are written next to it with a .prof suffix
+    """
+    profiler.dump_stats(f"{path}.prof")
+    
+    with open(path, 'w') as f:
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats('cumulative').print_stats()
+    
+    logger.info(f"Profile written to {path}")
+
+def run(args):
+    """Process video as requested by the command line arguments."""
+    if args.workers > 1 and not args.source.isdigit() and os.path.isfile(args.source):
+        if args.output or args.display:
+            logger.warning("--output and --display are ignored in chunked offline mode")
+        
+        process_video_chunked(
+            args.source,
+            workers=args.workers,
+            chunk_frames=args.chunk_frames,
+            overlap=args.overlap,
+            checkpoint_dir=args.checkpoint_dir,
+            recorded_at=args.recorded_at
+        )
+    else:
+        process_video(
+            args.source,
+            args.output,
+            args.display,
+            camera_id=args.camera_id,
+            detections_out=args.detections_out,
+            detections_format=args.detections_format,
+            publish=args.publish,
+            recorded_at=args.recorded_at
+        )
 
 def main():
     """Main function."""
@@ -195,8 +321,24 @@ def main():
     # Parse arguments
     args = parse_args()
     
-    # Process video
-    process_video(args.source, args.output, args.display)
+    # Make the pipeline's metrics part of the API server's /api/metrics
+    metrics.start_exporter()
+    
+    if args.trace:
+        tracing.start_tracing(args.trace, args.trace_sample_rate)
+    
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    
+    try:
+        run(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            write_profile(profiler, args.profile)
+        
+        tracing.stop_tracing()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,406 @@
+"""
+Per-stage latency metrics with Prometheus text exposition.
+
+Hot-path code wraps each stage in ``timer(stage)``. Samples are kept in
+rolling windows per camera and stage, and summarized as p50/p95/p99 when
+the metrics are scraped. When metrics are disabled and no trace is being
+recorded, ``timer`` returns a shared no-op context manager.
+
+Pipelines and API workers run in separate processes. Each of them exports a
+snapshot of its metrics to ``METRICS['dir']`` every
+``METRICS['export_interval']`` seconds (``start_exporter``), and a scrape of
+any process merges the snapshots of all live ones: sample windows are pooled
+for the quantiles, and counts, sums, counters and gauges are added up.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from app import tracing
+from app.config import METRICS
+
+# Pipeline stages that are timed
+STAGES = (
+    'decode', 'yolo_inference', 'face_location', 'face_encoding', 'gallery_match',
+    'tracking', 'association', 'db_write', 'sink_write', 'draw', 'encode', 'queue_wait',
+    'admission_wait'
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+DEFAULT_CAMERA = 'default'
+
+# Snapshots not refreshed for this many export intervals belong to exited processes
+STALE_INTERVALS = 3
+
+logger = logging.getLogger(__name__)
+
+_histograms = {}  # (camera, stage) -> RollingHistogram
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_help = {}  # name -> help text
+_collectors = []
+_registry_lock = threading.Lock()
+_local = threading.local()
+_exporter_pid = None
+
+class RollingHistogram:
+    """Rolling window of latency samples."""
+
+    def __init__(self, window):
+        """
+        Initialize the histogram.
+
+        Args:
+            window: Number of most recent samples kept for quantiles
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Record a sample."""
+        with self.lock:
+            self.samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def state(self):
+        """Get the window, total count and total sum."""
+        with self.lock:
+            return list(self.samples), self.count, self.total
+
+    def summary(self, quantiles=QUANTILES):
+        """
+        Summarize the window.
+
+        Args:
+            quantiles: Quantiles to compute
+
+        Returns:
+            Tuple of (quantile values, total count, total sum)
+        """
+        samples, count, total = self.state()
+        return _quantiles(samples, quantiles), count, total
+
+def _quantiles(samples, quantiles=QUANTILES):
+    """Compute quantiles of samples (0.0 without samples)."""
+    data = sorted(samples)
+    if not data:
+        return {q: 0.0 for q in quantiles}
+
+    values = {}
+    for q in quantiles:
+        index = min(len(data) - 1, max(0, int(round(q * len(data))) - 1))
+        values[q] = data[index]
+
+    return values
+
+class _StageTimer:
+    """Context manager that records the duration of a stage."""
+
+    __slots__ = ('stage', 'camera', 'start')
+
+    def __init__(self, stage, camera):
+        self.stage = stage
+        self.camera = camera
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        observe(self.stage, end - self.start, self.camera)
+        tracing.record_span(self.stage, self.start, end)
+        return False
+
+class _NullTimer:
+    """No-op context manager used when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def set_camera(camera_id):
+    """
+    Set the camera label used by timers on the current thread.
+
+    Args:
+        camera_id: Camera identifier
+    """
+    _local.camera = str(camera_id)
+
+def get_camera():
+    """Get the camera label of the current thread."""
+    return getattr(_local, 'camera', DEFAULT_CAMERA)
+
+def timer(stage, camera=None):
+    """
+    Time a pipeline stage.
+
+    The duration is also recorded as a trace span when a trace is active.
+
+    Args:
+        stage: Stage name
+        camera: Camera label (defaults to the current thread's camera)
+
+    Returns:
+        Context manager
+    """
+    if not METRICS['enabled'] and tracing.get_tracer() is None:
+        return _NULL_TIMER
+
+    return _StageTimer(stage, camera)
+
+def observe(stage, seconds, camera=None):
+    """
+    Record a stage duration.
+
+    Args:
+        stage: Stage name
+        seconds: Duration in seconds
+        camera: Camera label (defaults to the current thread's camera)
+    """
+    if not METRICS['enabled']:
+        return
+
+    key = (camera or get_camera(), stage)
+    histogram = _histograms.get(key)
+
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(key, RollingHistogram(METRICS['window']))
+
+    histogram.observe(seconds)
+
+def inc_counter(name, value=1, help_text=None, **labels):
+    """
+    Increment a counter.
+
+    Args:
+        name: Metric name
+        value: Increment
+        help_text: Metric description
+        **labels: Metric labels
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + value
+        if help_text:
+            _help[name] = help_text
+
+def set_gauge(name, value, help_text=None, **labels):
+    """
+    Set a gauge.
+
+    Args:
+        name: Metric name
+        value: Gauge value
+        help_text: Metric description
+        **labels: Metric labels
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _gauges[key] = value
+        if help_text:
+            _help[name] = help_text
+
+def register_collector(collector):
+    """
+    Register a callable that updates gauges right before each scrape.
+
+    Args:
+        collector: Callable without arguments
+    """
+    _collectors.append(collector)
+
+def snapshot():
+    """
+    Get the metrics of this process.
+
+    Collectors are run first.
+
+    Returns:
+        JSON-serializable dictionary with 'histograms', 'counters', 'gauges'
+        and 'help'
+    """
+    for collector in _collectors:
+        collector()
+
+    with _registry_lock:
+        histograms = list(_histograms.items())
+        counters = list(_counters.items())
+        gauges = list(_gauges.items())
+        help_texts = dict(_help)
+
+    return {
+        'histograms': [[camera, stage, *histogram.state()] for (camera, stage), histogram in histograms],
+        'counters': [[name, labels, value] for (name, labels), value in counters],
+        'gauges': [[name, labels, value] for (name, labels), value in gauges],
+        'help': help_texts
+    }
+
+def export():
+    """Write this process's snapshot to the metrics directory."""
+    path = os.path.join(METRICS['dir'], f"{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp_path, path)
+
+def _export_loop():
+    """Export snapshots until the process exits."""
+    while True:
+        try:
+            export()
+        except Exception as e:
+            logger.error(f"Error exporting metrics: {e}")
+        time.sleep(METRICS['export_interval'])
+
+def start_exporter():
+    """
+    Start exporting this process's metrics for scrapes of other processes.
+
+    Threads do not survive a fork, so forked workers start their own.
+    """
+    global _exporter_pid
+
+    if not METRICS['enabled'] or not METRICS['dir'] or _exporter_pid == os.getpid():
+        return
+
+    os.makedirs(METRICS['dir'], exist_ok=True)
+    _exporter_pid = os.getpid()
+    threading.Thread(target=_export_loop, name='metrics-export', daemon=True).start()
+
+def _exported_snapshots():
+    """
+    Read the snapshots of the other live processes.
+
+    Snapshots of exited processes are removed.
+
+    Returns:
+        List of snapshot dictionaries
+    """
+    directory = METRICS['dir']
+    if not directory or not os.path.isdir(directory):
+        return []
+
+    own = f"{os.getpid()}.json"
+    stale_before = time.time() - STALE_INTERVALS * METRICS['export_interval']
+
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or name == own:
+            continue
+
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < stale_before:
+                os.remove(path)
+                continue
+
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Replaced or removed meanwhile
+            continue
+
+    return snapshots
+
+def _merge(snapshots):
+    """
+    Merge snapshots of several processes.
+
+    Returns:
+        Tuple of (histograms, counters, gauges, help texts) dictionaries
+    """
+    histograms, counters, gauges, help_texts = {}, {}, {}, {}
+
+    for data in snapshots:
+        for camera, stage, samples, count, total in data['histograms']:
+            merged = histograms.setdefault((camera, stage), [[], 0, 0.0])
+            merged[0].extend(samples)
+            merged[1] += count
+            merged[2] += total
+
+        for kind, merged in (('counters', counters), ('gauges', gauges)):
+            for name, labels, value in data[kind]:
+                # JSON turns the label tuples into lists
+                key = (name, tuple(tuple(label) for label in labels))
+                merged[key] = merged.get(key, 0) + value
+
+        help_texts.update(data['help'])
+
+    return histograms, counters, gauges, help_texts
+
+def reset():
+    """Clear all recorded metrics."""
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+def _format_labels(labels):
+    """Format labels in Prometheus text format."""
+    if not labels:
+        return ''
+
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+
+    return '{' + ','.join(parts) + '}'
+
+def _render_simple(lines, metric_type, values, help_texts):
+    """Render counters or gauges."""
+    names = sorted({name for name, _ in values})
+    for name in names:
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (metric_name, labels), value in sorted(values.items()):
+            if metric_name == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+def render_prometheus():
+    """
+    Render the metrics of all processes in Prometheus text exposition format.
+
+    Returns:
+        Metrics text
+    """
+    histograms, counters, gauges, help_texts = _merge([snapshot()] + _exported_snapshots())
+
+    name = 'pipeline_stage_latency_seconds'
+    lines = [
+        f"# HELP {name} Latency of pipeline stages over a rolling window",
+        f"# TYPE {name} summary"
+    ]
+
+    for (camera, stage), (samples, count, total) in sorted(histograms.items()):
+        values = _quantiles(samples)
+        labels = (('camera', camera), ('stage', stage))
+
+        for q, value in values.items():
+            lines.append(f"{name}{_format_labels(labels + (('quantile', q),))} {value:.6f}")
+
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    _render_simple(lines, 'counter', counters, help_texts)
+    _render_simple(lines, 'gauge', gauges, help_texts)
+
+    return '\n'.join(lines) + '\n'
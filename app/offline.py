@@ -0,0 +1,407 @@
+"""
+Chunk-parallel offline processing of recorded video files.
+
+The video is split into frame ranges that are processed independently in a
+process pool. Each worker seeks to ``overlap`` frames before its range so that
+the tracks it sees at the start can be stitched to the track IDs of the
+previous chunk. Every finished chunk is checkpointed to disk, so an interrupted
+run resumes with the chunks that are still missing.
+"""
+import os
+import json
+import time
+import glob
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from app import metrics
+from app import tracing
+from app.config import OFFLINE
+from app.pipeline import create_detectors, associate_objects, record_associations
+from app.sightings import SightingRecorder
+from detection.utils import calculate_iou
+from database.db import get_database
+from database.operations import get_all_faces
+
+logger = logging.getLogger(__name__)
+
+# Bump when the checkpoint layout changes so stale checkpoints are discarded
+CHECKPOINT_VERSION = 1
+
+# Detectors of the current worker process (set by _init_worker)
+_worker_detectors = None
+
+def plan_chunks(total_frames, chunk_frames, overlap):
+    """
+    Split a video into frame ranges.
+
+    Args:
+        total_frames: Number of frames in the video
+        chunk_frames: Number of frames per chunk
+        overlap: Number of frames each chunk re-reads from the previous one
+
+    Returns:
+        List of chunk dictionaries with index, start, end and read_start
+    """
+    chunks = []
+    for index, start in enumerate(range(0, total_frames, chunk_frames)):
+        chunks.append({
+            'index': index,
+            'start': start,
+            'end': min(start + chunk_frames, total_frames),
+            'read_start': max(0, start - overlap)
+        })
+
+    return chunks
+
+def recording_start(source, duration, recorded_at=None):
+    """
+    Get the wall-clock time at which a video file started recording.
+
+    Args:
+        source: Path to the video file
+        duration: Length of the video in seconds
+        recorded_at: Known start time, returned as is
+
+    Returns:
+        recorded_at if given, otherwise the file's modification time less its
+        duration (files are written as they are recorded)
+    """
+    if recorded_at is not None:
+        return recorded_at
+
+    return datetime.fromtimestamp(os.path.getmtime(source)) - timedelta(seconds=duration)
+
+def _checkpoint_path(checkpoint_dir, index):
+    """Get the checkpoint file path of a chunk."""
+    return os.path.join(checkpoint_dir, f"chunk_{index:06d}.json")
+
+def _write_json_atomic(path, data):
+    """Write JSON so that readers never observe a partially written file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _prepare_checkpoint_dir(checkpoint_dir, manifest):
+    """
+    Create the checkpoint directory and discard checkpoints of a different run.
+
+    Args:
+        checkpoint_dir: Checkpoint directory
+        manifest: Parameters the checkpoints must have been produced with
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                existing = json.load(f)
+        except (OSError, ValueError):
+            existing = None
+
+        if existing == manifest:
+            return
+
+        logger.warning(f"Checkpoints in {checkpoint_dir} were made with different settings, discarding them")
+        for path in glob.glob(os.path.join(checkpoint_dir, 'chunk_*.json')):
+            os.remove(path)
+
+    _write_json_atomic(manifest_path, manifest)
+
+def _init_worker(trace_path=None, trace_sample_rate=None):
+    """
+    Create the detectors once per worker process.
+
+    Args:
+        trace_path: Trace file of the parent process, if it is tracing
+        trace_sample_rate: Fraction of frames to trace
+    """
+    global _worker_detectors
+
+    if trace_path:
+        tracing.start_worker_tracing(trace_path, trace_sample_rate)
+
+    face_detector, object_detector = create_detectors()
+
+    db = get_database()
+    face_detector.load_known_faces(get_all_faces(db))
+
+    _worker_detectors = (face_detector, object_detector)
+
+def _process_chunk(source, chunk, checkpoint_path):
+    """
+    Detect faces and objects in one chunk and write its checkpoint.
+
+    Args:
+        source: Path to the video file
+        chunk: Chunk dictionary from plan_chunks
+        checkpoint_path: Path of the checkpoint file to write
+
+    Returns:
+        Number of frames processed
+    """
+    face_detector, object_detector = _worker_detectors
+
+    # Track IDs must not leak from the previously processed chunk
+    object_detector.tracked_objects = {}
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video source: {source}")
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, chunk['read_start'])
+
+    frames = []
+    frame_index = chunk['read_start']
+
+    try:
+        while frame_index < chunk['end']:
+            tracing.begin_frame(frame_index)
+
+            with metrics.timer('decode'):
+                ret, frame = cap.read()
+
+            if not ret:
+                break
+
+            face_detections = face_detector.detect(frame)
+            object_detections = object_detector.detect(frame)
+
+            # Keep only what is needed to associate objects with faces later
+            frames.append({
+                'frame': frame_index,
+                'faces': [
+                    {'face_id': face['face_id'], 'bbox': [float(c) for c in face['bbox']]}
+                    for face in face_detections if face.get('face_id')
+                ],
+                'objects': [
+                    {
+                        'tracking_id': obj['tracking_id'],
+                        'class_name': obj['class_name'],
+                        'bbox': [float(c) for c in obj['bbox']]
+                    }
+                    for obj in object_detections if 'tracking_id' in obj
+                ]
+            })
+
+            frame_index += 1
+    finally:
+        tracing.end_frame()
+        cap.release()
+
+        # The pool may stop this worker without notice
+        tracing.flush_tracing()
+
+    _write_json_atomic(checkpoint_path, {
+        'version': CHECKPOINT_VERSION,
+        'chunk': chunk,
+        'frames': frames
+    })
+
+    return len(frames)
+
+def _match_tracks(previous_frames, overlap_frames, iou_threshold):
+    """
+    Map the track IDs of a chunk to those of the previous chunk.
+
+    Tracks are matched greedily by their mean IoU over the overlap frames.
+
+    Args:
+        previous_frames: Frame records of the previous chunk (already stitched)
+        overlap_frames: Frame records of the current chunk inside the overlap
+        iou_threshold: Minimum mean IoU for two tracks to be considered the same
+
+    Returns:
+        Dictionary mapping local tracking IDs to previous tracking IDs
+    """
+    previous_by_frame = {record['frame']: record['objects'] for record in previous_frames}
+
+    scores = {}  # (local_id, previous_id) -> summed IoU
+    counts = {}  # local_id -> number of overlap frames it appears in
+
+    for record in overlap_frames:
+        previous_objects = previous_by_frame.get(record['frame'])
+        if previous_objects is None:
+            continue
+
+        for obj in record['objects']:
+            local_id = obj['tracking_id']
+            counts[local_id] = counts.get(local_id, 0) + 1
+
+            for previous in previous_objects:
+                if previous['class_name'] != obj['class_name']:
+                    continue
+
+                iou = calculate_iou(previous['bbox'], obj['bbox'])
+                if iou > 0:
+                    key = (local_id, previous['tracking_id'])
+                    scores[key] = scores.get(key, 0.0) + iou
+
+    mapping = {}
+    used = set()
+    for (local_id, previous_id), total in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+        if local_id in mapping or previous_id in used:
+            continue
+
+        if total / counts[local_id] < iou_threshold:
+            continue
+
+        mapping[local_id] = previous_id
+        used.add(previous_id)
+
+    return mapping
+
+def stitch_chunks(checkpoint_paths, iou_threshold):
+    """
+    Yield the frame records of all chunks in order with stitched track IDs.
+
+    Checkpoints are loaded one at a time, so memory use is bounded by the
+    size of a single chunk.
+
+    Args:
+        checkpoint_paths: Checkpoint files ordered by chunk index
+        iou_threshold: Minimum mean IoU for stitching two tracks
+
+    Yields:
+        Frame record dictionaries
+    """
+    previous_frames = None
+
+    for path in checkpoint_paths:
+        with open(path) as f:
+            checkpoint = json.load(f)
+
+        start = checkpoint['chunk']['start']
+        frames = checkpoint['frames']
+        overlap_frames = [record for record in frames if record['frame'] < start]
+
+        mapping = {}
+        if previous_frames and overlap_frames:
+            mapping = _match_tracks(previous_frames, overlap_frames, iou_threshold)
+
+        for record in frames:
+            # Overlap frames were already emitted by the previous chunk
+            if record['frame'] < start:
+                continue
+
+            for obj in record['objects']:
+                obj['tracking_id'] = mapping.get(obj['tracking_id'], obj['tracking_id'])
+
+            yield record
+
+        previous_frames = [record for record in frames if record['frame'] >= start]
+
+def process_video_chunked(source, workers=None, chunk_frames=None, overlap=None, checkpoint_dir=None,
+                          recorded_at=None):
+    """
+    Process a video file in parallel chunks and record object ownership.
+
+    Args:
+        source: Path to the video file
+        workers: Number of worker processes
+        chunk_frames: Number of frames per chunk
+        overlap: Number of overlap frames used for stitching track IDs
+        checkpoint_dir: Directory for chunk checkpoints (defaults to <source>.chunks)
+        recorded_at: Wall-clock time of the first frame, used to timestamp
+            sightings (see recording_start)
+
+    Returns:
+        True if the whole video was processed, False otherwise
+    """
+    workers = workers or OFFLINE['workers']
+    chunk_frames = chunk_frames or OFFLINE['chunk_frames']
+    overlap = OFFLINE['overlap_frames'] if overlap is None else overlap
+    checkpoint_dir = checkpoint_dir or f"{source}.chunks"
+
+    # Get video properties
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        logger.error(f"Failed to open video source: {source}")
+        return False
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    if total_frames <= 0 or fps <= 0:
+        logger.error(f"Could not determine the frame count and rate of {source}")
+        return False
+
+    # Sightings are stamped with the time their frame was recorded
+    video_start = recording_start(source, total_frames / fps, recorded_at)
+
+    _prepare_checkpoint_dir(checkpoint_dir, {
+        'version': CHECKPOINT_VERSION,
+        'source': os.path.abspath(source),
+        'size': os.path.getsize(source),
+        'total_frames': total_frames,
+        'chunk_frames': chunk_frames,
+        'overlap': overlap
+    })
+
+    chunks = plan_chunks(total_frames, chunk_frames, overlap)
+    checkpoint_paths = [_checkpoint_path(checkpoint_dir, chunk['index']) for chunk in chunks]
+    pending = [chunk for chunk, path in zip(chunks, checkpoint_paths) if not os.path.exists(path)]
+
+    logger.info(f"Processing {source} in {len(chunks)} chunks with {workers} workers "
+                f"({len(chunks) - len(pending)} already checkpointed)")
+
+    start_time = time.time()
+    failed = 0
+
+    if pending:
+        tracer = tracing.get_tracer()
+        trace_args = (tracer.path, tracer.sample_rate) if tracer else ()
+
+        # Forked workers inherit the trace file; leave nothing buffered for them to write
+        tracing.flush_tracing()
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=trace_args) as executor:
+                futures = {
+                    executor.submit(_process_chunk, source, chunk, checkpoint_paths[chunk['index']]): chunk
+                    for chunk in pending
+                }
+
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        frames = future.result()
+                        logger.info(f"Chunk {chunk['index'] + 1}/{len(chunks)} done ({frames} frames)")
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Error processing chunk {chunk['index']}: {e}", exc_info=True)
+        except KeyboardInterrupt:
+            logger.info("User interrupted, rerun the same command to resume")
+            return False
+        finally:
+            # Workers traced into part files of the trace
+            tracing.merge_worker_traces('offline-worker')
+
+    if failed:
+        logger.error(f"{failed} chunks failed, rerun the same command to retry them")
+        return False
+
+    # Replay the stitched detections in order to record ownership
+    recorder = SightingRecorder(get_database())
+    frame_count = 0
+
+    try:
+        for record in stitch_chunks(checkpoint_paths, OFFLINE['stitch_iou_threshold']):
+            associations = associate_objects(record['faces'], record['objects'])
+            record_associations(recorder, associations, video_start + timedelta(seconds=record['frame'] / fps))
+            frame_count += 1
+    finally:
+        recorder.close()
+
+    processing_time = time.time() - start_time
+    processing_fps = frame_count / processing_time if processing_time > 0 else 0
+
+    logger.info(f"Processed {frame_count} frames in {processing_time:.2f} seconds ({processing_fps:.2f} FPS)")
+
+    return True
@@ -0,0 +1,154 @@
+"""
+Shared building blocks of the video processing pipeline.
+"""
+import logging
+import numpy as np
+
+from app import events
+from app import metrics
+from app.config import DETECTION, TRACKING
+from detection.face_detector import FaceDetector
+from detection.object_detector import ObjectDetector
+
+logger = logging.getLogger(__name__)
+
+def create_detectors():
+    """
+    Create the face and object detectors from configuration.
+    
+    Returns:
+        Tuple of (FaceDetector, ObjectDetector)
+    """
+    face_detector = FaceDetector(
+        model_path=DETECTION['yolo_model_path'],
+        confidence_threshold=DETECTION['confidence_threshold'],
+        face_recognition_tolerance=DETECTION['face_recognition_tolerance']
+    )
+    
+    object_detector = ObjectDetector(
+        model_path=DETECTION['yolo_model_path'],
+        confidence_threshold=DETECTION['confidence_threshold'],
+        iou_threshold=TRACKING['iou_threshold'],
+        max_age=TRACKING['max_age']
+    )
+    
+    return face_detector, object_detector
+
+def associate_objects(face_detections, object_detections, distance_threshold=None):
+    """
+    Associate tracked objects with the closest recognized face.
+    
+    Args:
+        face_detections: List of face detections
+        object_detections: List of object detections
+        distance_threshold: Maximum center distance in pixels (defaults to config)
+        
+    Returns:
+        List of (object_detection, face_detection, distance) tuples
+    """
+    if distance_threshold is None:
+        distance_threshold = TRACKING['distance_threshold']
+    
+    associations = []
+    for obj in object_detections:
+        if 'tracking_id' not in obj:
+            continue
+        
+        # Find closest face
+        closest_face = None
+        min_distance = distance_threshold
+        
+        obj_bbox = obj['bbox']
+        obj_center = ((obj_bbox[0] + obj_bbox[2]) / 2, (obj_bbox[1] + obj_bbox[3]) / 2)
+        
+        for face in face_detections:
+            if 'face_id' not in face:
+                continue
+            
+            # Calculate distance between face and object
+            face_bbox = face['bbox']
+            face_center = ((face_bbox[0] + face_bbox[2]) / 2, (face_bbox[1] + face_bbox[3]) / 2)
+            
+            distance = np.sqrt((face_center[0] - obj_center[0])**2 + (face_center[1] - obj_center[1])**2)
+            
+            if distance < min_distance:
+                min_distance = distance
+                closest_face = face
+        
+        if closest_face:
+            associations.append((obj, closest_face, min_distance))
+    
+    return associations
+
+def record_associations(recorder, associations, timestamp=None):
+    """
+    Record sightings of the given associations and publish ownership changes.
+    
+    Args:
+        recorder: SightingRecorder of the pipeline
+        associations: List of (object_detection, face_detection, distance) tuples
+        timestamp: Time the frame was captured, defaults to now
+    """
+    for obj, face, _ in associations:
+        previous_owner_id = recorder.record(obj, face['face_id'], timestamp)
+        
+        if previous_owner_id != face['face_id']:
+            publish_ownership_change(obj, face['face_id'], previous_owner_id)
+    
+    # Write and roll up sightings when due
+    recorder.maintain()
+
+def publish_ownership_change(obj, owner_id, previous_owner_id):
+    """
+    Publish an 'ownership' event.
+    
+    Args:
+        obj: Object detection
+        owner_id: New owner's face ID
+        previous_owner_id: Previous owner's face ID, or None for a new object
+    """
+    if not events.has_subscribers():
+        return
+    
+    events.publish('ownership', {
+        'camera': metrics.get_camera(),
+        'tracking_id': obj['tracking_id'],
+        'class_name': obj['class_name'],
+        'owner_id': owner_id,
+        'previous_owner_id': previous_owner_id
+    })
+
+def publish_detections(camera_id, frame_index, face_detections, object_detections):
+    """
+    Publish a 'detections' event for a frame.
+    
+    Args:
+        camera_id: Camera identifier
+        frame_index: Frame number
+        face_detections: List of face detections
+        object_detections: List of object detections
+    """
+    if not events.has_subscribers():
+        return
+    
+    events.publish('detections', {
+        'camera': camera_id,
+        'frame': frame_index,
+        'faces': [
+            {
+                'face_id': face.get('face_id'),
+                'bbox': [float(v) for v in face['bbox']],
+                'confidence': float(face['confidence'])
+            }
+            for face in face_detections
+        ],
+        'objects': [
+            {
+                'tracking_id': obj.get('tracking_id'),
+                'class_name': obj['class_name'],
+                'bbox': [float(v) for v in obj['bbox']],
+                'confidence': float(obj['confidence'])
+            }
+            for obj in object_detections
+        ]
+    })
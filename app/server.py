@@ -0,0 +1,194 @@
+"""
+Pre-fork multi-worker API server.
+
+The parent process loads and warms up the models once, binds the listening
+socket and then forks the workers, so model weights are shared copy-on-write
+instead of being loaded once per worker. Each worker pins its torch and
+OpenCV thread pools so that workers together do not oversubscribe the cores.
+
+Usage:
+    python -m app.server --workers 4
+"""
+import os
+import gc
+import sys
+import signal
+import socket
+import argparse
+import logging
+
+import cv2
+from werkzeug.serving import make_server
+
+from app import metrics
+from app.config import API, SERVER
+from run import create_flask_app
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+def configure_threads(threads):
+    """
+    Limit the thread pools used by inference and image processing.
+
+    Args:
+        threads: Number of threads
+    """
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads)
+
+    cv2.setNumThreads(threads)
+
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+def create_listening_socket(host, port, backlog):
+    """
+    Create the socket shared by all workers.
+
+    Args:
+        host: Host to bind
+        port: Port to bind
+        backlog: Listen backlog
+
+    Returns:
+        Listening socket
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock, host, port, threads):
+    """
+    Serve requests in a forked worker. Never returns.
+
+    Args:
+        app: Flask application
+        sock: Inherited listening socket
+        host: Bound host
+        port: Bound port
+        threads: Inference threads of this worker
+    """
+    # Let the parent handle Ctrl+C and shut the workers down with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+
+    configure_threads(threads)
+
+    # Report this worker's own metrics, without the samples inherited from warm-up
+    metrics.reset()
+    metrics.start_exporter()
+
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    logger.info(f"Worker {os.getpid()} serving with {threads} inference threads")
+
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+def serve(workers=None, host=None, port=None, threads_per_worker=None):
+    """
+    Load the models, fork the workers and supervise them.
+
+    Args:
+        workers: Number of worker processes
+        host: Host to bind
+        port: Port to bind
+        threads_per_worker: Inference threads per worker (defaults to cores / workers)
+    """
+    workers = workers or SERVER['workers']
+    host = host or API['host']
+    port = port or API['port']
+    threads_per_worker = threads_per_worker or SERVER['threads_per_worker'] \
+        or max(1, (os.cpu_count() or 1) // workers)
+
+    # A single thread while loading keeps OpenMP from starting a pool that
+    # would not survive the fork
+    configure_threads(1)
+
+    app = create_flask_app(preload_models=True, warm_up_in_background=False)
+    sock = create_listening_socket(host, port, SERVER['backlog'])
+
+    # Objects created so far are shared; keep the garbage collector from
+    # touching (and thereby copying) their pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            run_worker(app, sock, host, port, threads_per_worker)
+        children[pid] = True
+
+    for _ in range(workers):
+        spawn()
+
+    logger.info(f"Serving on {host}:{port} with {workers} workers x {threads_per_worker} threads")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        children.pop(pid, None)
+
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting it")
+            spawn()
+
+    sock.close()
+    logger.info("Server stopped")
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Pre-fork multi-worker API server')
+
+    parser.add_argument('--workers', type=int, default=SERVER['workers'],
+                        help='Number of worker processes')
+
+    parser.add_argument('--threads', type=int, default=SERVER['threads_per_worker'],
+                        help='Inference threads per worker (0 for cores / workers)')
+
+    parser.add_argument('--host', type=str, default=API['host'],
+                        help='Host to bind')
+
+    parser.add_argument('--port', type=int, default=API['port'],
+                        help='Port to bind')
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    serve(args.workers, args.host, args.port, args.threads)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,197 @@
+"""
+Append-only log of object sightings.
+
+Pipelines record where and with whom each tracked object was seen instead of
+rewriting its ``objects`` row every time. Sightings are buffered and written
+in batches; a periodic rollup folds the new ones into the ``objects``
+summary (first/last seen, current owner) and old ones are pruned by the
+retention policy.
+
+Maintenance can also be run on its own, e.g. from cron:
+    python -m app.sightings rollup --since 2024-01-01T00:00:00
+    python -m app.sightings prune
+"""
+import sys
+import time
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from app import create_app, metrics
+from app.config import SIGHTINGS
+from database.db import get_database, release_database
+from database.operations import get_object, add_sightings_bulk, rollup_sightings, prune_sightings
+
+logger = logging.getLogger(__name__)
+
+class SightingRecorder:
+    """Buffers sightings of a pipeline and maintains the objects summary."""
+
+    def __init__(self, db):
+        """
+        Initialize the recorder.
+
+        Args:
+            db: Database connection of the pipeline thread
+        """
+        self.db = db
+        self.buffer = []
+
+        # Latest owner and time of the last buffered sighting of objects seen recently
+        self.owners = {}
+        self.last_recorded = {}
+
+        now = time.monotonic()
+        self.last_flush = now
+        self.last_rollup = now
+        self.last_prune = None
+
+        # Time range of the sightings recorded since the last rollup
+        self.rollup_from = None
+        self.rollup_until = None
+
+    def record(self, obj, owner_id, timestamp=None):
+        """
+        Record that an object was seen with an owner.
+
+        An object keeping its owner is recorded at most once per
+        ``SIGHTINGS['min_interval']`` of sighting time.
+
+        Args:
+            obj: Object detection with 'tracking_id', 'class_name' and 'bbox'
+            owner_id: Owner's face ID
+            timestamp: Time the frame was captured, defaults to now
+
+        Returns:
+            Previous owner's face ID, or None if the object is new
+        """
+        tracking_id = obj['tracking_id']
+        timestamp = timestamp or datetime.now()
+
+        if tracking_id in self.owners:
+            previous_owner_id = self.owners[tracking_id]
+        else:
+            # First sighting by this recorder; the object may be known already
+            existing = get_object(self.db, tracking_id)
+            previous_owner_id = existing.get('owner_id') if existing else None
+
+        last = self.last_recorded.get(tracking_id)
+        if previous_owner_id != owner_id or last is None or \
+                (timestamp - last).total_seconds() >= SIGHTINGS['min_interval']:
+            self.buffer.append({
+                'tracking_id': tracking_id,
+                'class_name': obj['class_name'],
+                'owner_id': owner_id,
+                'timestamp': timestamp,
+                'bbox': [float(v) for v in obj['bbox']]
+            })
+            self.last_recorded[tracking_id] = timestamp
+
+            if self.rollup_from is None or timestamp < self.rollup_from:
+                self.rollup_from = timestamp
+            if self.rollup_until is None or timestamp > self.rollup_until:
+                self.rollup_until = timestamp
+
+        self.owners[tracking_id] = owner_id
+        return previous_owner_id
+
+    def maintain(self):
+        """Write, roll up and prune when due. Call once per frame."""
+        now = time.monotonic()
+
+        if len(self.buffer) >= SIGHTINGS['batch_size'] or \
+                (self.buffer and now - self.last_flush >= SIGHTINGS['flush_interval']):
+            self.flush()
+
+        if now - self.last_rollup >= SIGHTINGS['rollup_interval']:
+            self.rollup()
+
+        if self.last_prune is None or now - self.last_prune >= SIGHTINGS['prune_interval']:
+            self.prune()
+
+    def flush(self):
+        """Write buffered sightings."""
+        sightings, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+
+        if not sightings:
+            return
+
+        try:
+            add_sightings_bulk(self.db, sightings)
+        except Exception as e:
+            # Keep memory bounded when the database is down
+            logger.error(f"Dropping {len(sightings)} sightings: {e}")
+            metrics.inc_counter('sightings_dropped_total', len(sightings),
+                                help_text='Sightings that could not be written', camera=metrics.get_camera())
+
+    def rollup(self):
+        """Fold the sightings recorded since the last rollup into the objects summary."""
+        self.flush()
+        self.last_rollup = time.monotonic()
+
+        if self.rollup_from is None:
+            return
+
+        # Sightings carry frame times, which lie in the past for recorded video
+        latest = self.rollup_until
+        try:
+            rollup_sightings(self.db, self.rollup_from, latest + timedelta(microseconds=1))
+        except Exception as e:
+            # The next rollup covers this range too
+            logger.error(f"Error rolling up sightings: {e}")
+            return
+
+        self.rollup_from = self.rollup_until = None
+
+        # Objects not seen for a while are summarized in the database by
+        # now; forget them so long-running cameras do not grow the cache
+        stale = latest - timedelta(seconds=2 * SIGHTINGS['rollup_interval'])
+        for tracking_id in [t for t, last in self.last_recorded.items() if last < stale]:
+            del self.last_recorded[tracking_id]
+            self.owners.pop(tracking_id, None)
+
+    def prune(self):
+        """Remove sightings older than the retention period."""
+        self.last_prune = time.monotonic()
+
+        try:
+            prune_sightings(self.db, SIGHTINGS['retention_days'])
+        except Exception as e:
+            logger.error(f"Error pruning sightings: {e}")
+
+    def close(self):
+        """Write and roll up what is left."""
+        self.rollup()
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Maintain the sightings log')
+
+    parser.add_argument('task', choices=['rollup', 'prune'],
+                        help='Fold sightings into the objects summary, or remove expired sightings')
+
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        help='Start of the rollup range (defaults to the retention period)')
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function."""
+    create_app()
+    args = parse_args(argv)
+
+    db = get_database()
+    try:
+        if args.task == 'rollup':
+            since = args.since or datetime.now() - timedelta(days=SIGHTINGS['retention_days'])
+            count = rollup_sightings(db, since, datetime.now())
+            print(f"Rolled up sightings of {count} objects")
+        else:
+            count = prune_sightings(db, SIGHTINGS['retention_days'])
+            print(f"Pruned {count} expired sightings partitions or rows")
+    finally:
+        release_database()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
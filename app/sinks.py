@@ -0,0 +1,203 @@
+"""
+Structured detection output sinks.
+
+Sinks stream per-frame detection results for analytics consumers that do not
+need annotated video. ``JsonlSink`` writes one JSON object per frame.
+``NpzChunkSink`` writes compact columnar chunks (one row per detection) into
+preallocated NumPy arrays that are saved as ``.npz`` files when full.
+"""
+import os
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Detection kinds in the columnar format
+KIND_PERSON = 0
+KIND_OBJECT = 1
+
+class JsonlSink:
+    """Writes one JSON line per frame."""
+
+    def __init__(self, path, buffer_size=1024 * 1024):
+        """
+        Initialize the sink.
+
+        Args:
+            path: Output .jsonl file path
+            buffer_size: File buffer size in bytes
+        """
+        self.path = path
+        self.file = open(path, 'w', buffering=buffer_size)
+        self.encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def write(self, frame_index, timestamp, face_detections, object_detections):
+        """
+        Write the detections of a frame.
+
+        Args:
+            frame_index: Frame number
+            timestamp: Frame timestamp in seconds
+            face_detections: List of face detections
+            object_detections: List of object detections
+        """
+        record = {
+            'frame': frame_index,
+            'timestamp': timestamp,
+            'persons': [
+                {
+                    'bbox': [float(c) for c in face['bbox']],
+                    'confidence': face['confidence'],
+                    'face_id': face.get('face_id')
+                }
+                for face in face_detections
+            ],
+            'objects': [
+                {
+                    'bbox': [float(c) for c in obj['bbox']],
+                    'class_name': obj['class_name'],
+                    'confidence': obj['confidence'],
+                    'tracking_id': obj.get('tracking_id')
+                }
+                for obj in object_detections
+            ]
+        }
+
+        self.file.write(self.encoder.encode(record))
+        self.file.write('\n')
+
+    def close(self):
+        """Flush and close the output file."""
+        self.file.close()
+        logger.info(f"Detections written to {self.path}")
+
+class NpzChunkSink:
+    """Writes detections as chunked columnar NumPy archives."""
+
+    def __init__(self, directory, chunk_rows=65536):
+        """
+        Initialize the sink.
+
+        Args:
+            directory: Output directory for chunk_XXXXX.npz files
+            chunk_rows: Number of detections per chunk
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.chunk_index = 0
+        self.rows = 0
+
+        self.frame = np.empty(chunk_rows, dtype=np.int64)
+        self.timestamp = np.empty(chunk_rows, dtype=np.float64)
+        self.kind = np.empty(chunk_rows, dtype=np.uint8)
+        self.class_id = np.empty(chunk_rows, dtype=np.int16)
+        self.confidence = np.empty(chunk_rows, dtype=np.float32)
+        self.bbox = np.empty((chunk_rows, 4), dtype=np.float32)
+        self.track = np.empty(chunk_rows, dtype=np.int32)
+        self.face = np.empty(chunk_rows, dtype=np.int32)
+
+        # Per-chunk string tables; rows refer to them by index (-1 for none)
+        self.track_ids = {}
+        self.face_ids = {}
+        self.class_names = {}
+
+    def _intern(self, table, value):
+        """Get the index of a string in a table."""
+        if value is None:
+            return -1
+        index = table.get(value)
+        if index is None:
+            index = table[value] = len(table)
+        return index
+
+    def _append(self, frame_index, timestamp, kind, detection, track_id, face_id):
+        """Append one detection row."""
+        if self.rows == self.chunk_rows:
+            self._flush()
+
+        row = self.rows
+        self.frame[row] = frame_index
+        self.timestamp[row] = timestamp
+        self.kind[row] = kind
+        self.class_id[row] = self._intern(self.class_names, detection['class_name'])
+        self.confidence[row] = detection['confidence']
+        self.bbox[row] = detection['bbox']
+        self.track[row] = self._intern(self.track_ids, track_id)
+        self.face[row] = self._intern(self.face_ids, face_id)
+        self.rows += 1
+
+    def write(self, frame_index, timestamp, face_detections, object_detections):
+        """
+        Write the detections of a frame.
+
+        Args:
+            frame_index: Frame number
+            timestamp: Frame timestamp in seconds
+            face_detections: List of face detections
+            object_detections: List of object detections
+        """
+        for face in face_detections:
+            self._append(frame_index, timestamp, KIND_PERSON, face, None, face.get('face_id'))
+
+        for obj in object_detections:
+            self._append(frame_index, timestamp, KIND_OBJECT, obj, obj.get('tracking_id'), None)
+
+    def _flush(self):
+        """Save the filled part of the arrays as a chunk."""
+        if self.rows == 0:
+            return
+
+        rows = self.rows
+        path = os.path.join(self.directory, f"chunk_{self.chunk_index:05d}.npz")
+
+        # Slices are views, so the columns are written without copying
+        np.savez(
+            path,
+            frame=self.frame[:rows],
+            timestamp=self.timestamp[:rows],
+            kind=self.kind[:rows],
+            class_id=self.class_id[:rows],
+            confidence=self.confidence[:rows],
+            bbox=self.bbox[:rows],
+            track=self.track[:rows],
+            face=self.face[:rows],
+            class_names=np.array(list(self.class_names), dtype=str),
+            track_ids=np.array(list(self.track_ids), dtype=str),
+            face_ids=np.array(list(self.face_ids), dtype=str)
+        )
+
+        self.chunk_index += 1
+        self.rows = 0
+        self.track_ids = {}
+        self.face_ids = {}
+        self.class_names = {}
+
+    def close(self):
+        """Save the last chunk."""
+        self._flush()
+        logger.info(f"Detections written to {self.chunk_index} chunks in {self.directory}")
+
+def open_sink(path, fmt=None):
+    """
+    Open a detection sink.
+
+    Args:
+        path: Output path (.jsonl file or directory for NumPy chunks)
+        fmt: 'jsonl' or 'npz' (inferred from the path when None)
+
+    Returns:
+        Sink instance
+    """
+    if fmt is None:
+        fmt = 'jsonl' if path.endswith('.jsonl') else 'npz'
+
+    if fmt == 'jsonl':
+        return JsonlSink(path)
+    elif fmt == 'npz':
+        return NpzChunkSink(path)
+    else:
+        raise ValueError(f"Unsupported detections format: {fmt}")
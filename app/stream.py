@@ -0,0 +1,243 @@
+"""
+Shared-memory frame slots for live annotated streams.
+
+The running pipeline publishes each annotated frame as a JPEG into a named
+shared-memory slot per camera. Stream endpoints read the most recent frame
+from the slot, so JPEG encoding happens once per frame no matter how many
+viewers are connected, and viewers never queue behind old frames.
+
+Slot layout: a frame header with a sequence number and the JPEG length, the
+time a reader last looked at the slot, then the JPEG bytes. Only the
+publisher writes the frame header and only readers write the heartbeat. The
+sequence is odd while a frame is being written (seqlock), so readers retry
+instead of returning a torn frame.
+"""
+import re
+import time
+import struct
+import logging
+from multiprocessing import shared_memory, resource_tracker
+
+import cv2
+
+from app.config import STREAM
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct('<QQ')  # sequence, length
+HEARTBEAT = struct.Struct('<d')  # time a reader last looked at the slot
+HEARTBEAT_OFFSET = FRAME_HEADER.size
+HEADER_SIZE = HEARTBEAT_OFFSET + HEARTBEAT.size
+
+# Sequence of a slot whose publisher stopped
+CLOSED_SEQUENCE = 2 ** 64 - 2
+
+# Slots created by this process
+_published = set()
+
+def slot_name(camera_id):
+    """Get the shared-memory name of a camera's slot."""
+    return 'fod_frame_' + re.sub(r'[^A-Za-z0-9_-]', '_', str(camera_id))
+
+class FramePublisher:
+    """Publishes annotated frames of one camera."""
+
+    def __init__(self, camera_id, max_bytes=None, quality=None):
+        """
+        Initialize the publisher and create the shared-memory slot.
+
+        Args:
+            camera_id: Camera identifier
+            max_bytes: Maximum JPEG size in bytes
+            quality: JPEG quality
+        """
+        self.camera_id = camera_id
+        self.max_bytes = max_bytes or STREAM['max_frame_bytes']
+        self.quality = quality or STREAM['jpeg_quality']
+        self.sequence = 0
+
+        name = slot_name(camera_id)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + self.max_bytes)
+        except FileExistsError:
+            # Left behind by a previous run that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + self.max_bytes)
+
+        FRAME_HEADER.pack_into(self.shm.buf, 0, 0, 0)
+        HEARTBEAT.pack_into(self.shm.buf, HEARTBEAT_OFFSET, 0.0)
+        _published.add(name)
+        logger.info(f"Publishing frames of camera {camera_id} to shared memory {name}")
+
+    def has_viewers(self):
+        """Check whether a reader looked at the slot recently."""
+        heartbeat, = HEARTBEAT.unpack_from(self.shm.buf, HEARTBEAT_OFFSET)
+        return time.time() - heartbeat < STREAM['reader_timeout']
+
+    def publish(self, frame):
+        """
+        Encode a frame as JPEG and publish it.
+
+        Frames are not encoded while nobody is watching.
+
+        Args:
+            frame: Annotated BGR frame
+
+        Returns:
+            True if the frame was published
+        """
+        if not self.has_viewers():
+            return False
+
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return False
+
+        length = len(buffer)
+        if length > self.max_bytes:
+            logger.warning(f"Frame of {length} bytes exceeds the stream slot size, dropping it")
+            return False
+
+        buf = self.shm.buf
+
+        # Odd sequence marks the slot as being written
+        FRAME_HEADER.pack_into(buf, 0, self.sequence + 1, 0)
+        buf[HEADER_SIZE:HEADER_SIZE + length] = buffer.reshape(-1)
+        self.sequence += 2
+        FRAME_HEADER.pack_into(buf, 0, self.sequence, length)
+
+        return True
+
+    def close(self):
+        """Remove the shared-memory slot."""
+        # Readers still attached to the slot end their streams
+        FRAME_HEADER.pack_into(self.shm.buf, 0, CLOSED_SEQUENCE, 0)
+        _published.discard(self.shm.name)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class FrameReader:
+    """Reads the latest frame of one camera."""
+
+    def __init__(self, camera_id):
+        """
+        Attach to a camera's shared-memory slot.
+
+        Args:
+            camera_id: Camera identifier
+
+        Raises:
+            FileNotFoundError: If no pipeline publishes this camera
+        """
+        self.camera_id = camera_id
+        name = slot_name(camera_id)
+        self.shm = shared_memory.SharedMemory(name=name)
+
+        # Attaching must not make this process unlink another process's segment on exit
+        if name not in _published:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+    def _heartbeat(self):
+        """Tell the publisher that someone is watching."""
+        HEARTBEAT.pack_into(self.shm.buf, HEARTBEAT_OFFSET, time.time())
+
+    def publisher_closed(self):
+        """Check whether the publisher removed the slot."""
+        return FRAME_HEADER.unpack_from(self.shm.buf, 0)[0] == CLOSED_SEQUENCE
+
+    def latest(self, last_sequence=0):
+        """
+        Get the latest frame if it is newer than last_sequence.
+
+        Args:
+            last_sequence: Sequence number of the last frame returned
+
+        Returns:
+            Tuple of (sequence, JPEG bytes), or None if there is no newer frame
+        """
+        self._heartbeat()
+        buf = self.shm.buf
+
+        for _ in range(10):
+            sequence, length = FRAME_HEADER.unpack_from(buf, 0)
+            if sequence in (last_sequence, 0, CLOSED_SEQUENCE):
+                return None
+            if sequence % 2:
+                continue
+
+            data = bytes(buf[HEADER_SIZE:HEADER_SIZE + length])
+
+            if FRAME_HEADER.unpack_from(buf, 0)[0] == sequence:
+                return sequence, data
+
+        return None
+
+    def snapshot(self, timeout=1.0):
+        """
+        Get a current frame.
+
+        If nobody was watching, the publisher has stopped encoding, so this
+        waits for the next frame instead of returning a stale one.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            JPEG bytes, or None if no frame arrived in time
+        """
+        heartbeat, = HEARTBEAT.unpack_from(self.shm.buf, HEARTBEAT_OFFSET)
+        stale = time.time() - heartbeat >= STREAM['reader_timeout']
+
+        last_sequence = FRAME_HEADER.unpack_from(self.shm.buf, 0)[0] if stale else 0
+        last_sequence -= last_sequence % 2
+        deadline = time.time() + timeout
+
+        while True:
+            latest = self.latest(last_sequence)
+            if latest is not None:
+                return latest[1]
+            if time.time() >= deadline:
+                return None
+            time.sleep(STREAM['poll_interval_ms'] / 1000)
+
+    def frames(self, poll_interval=None):
+        """
+        Yield frames as they are published, skipping frames a viewer missed.
+
+        Ends when the publisher removes the slot or publishes nothing for
+        ``STREAM['idle_timeout']`` seconds (e.g. because it crashed), so the
+        response ends and the server thread is freed.
+
+        Args:
+            poll_interval: Seconds between polls
+
+        Yields:
+            JPEG bytes
+        """
+        poll_interval = poll_interval or STREAM['poll_interval_ms'] / 1000
+        last_sequence = 0
+        last_frame = time.monotonic()
+
+        while True:
+            latest = self.latest(last_sequence)
+            if latest is None:
+                if self.publisher_closed():
+                    return
+                if time.monotonic() - last_frame >= STREAM['idle_timeout']:
+                    logger.info(f"No frames from camera {self.camera_id} for {STREAM['idle_timeout']}s, ending stream")
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            last_sequence, data = latest
+            last_frame = time.monotonic()
+            yield data
+
+    def close(self):
+        """Detach from the slot."""
+        self.shm.close()
@@ -0,0 +1,258 @@
+"""
+Frame-level trace export in Chrome trace-event format.
+
+Spans are recorded for sampled frames only and streamed to disk in the JSON
+array format understood by chrome://tracing and Perfetto. The format does not
+require a closing bracket, so traces stay readable when a run is killed.
+
+Worker processes trace into part files next to the trace of the parent
+process, which merges them when the workers are done.
+"""
+import os
+import glob
+import json
+import time
+import threading
+import logging
+
+from app.config import TRACING
+
+logger = logging.getLogger(__name__)
+
+# Suffix of worker part files, followed by the worker's PID
+WORKER_SUFFIX = '.worker-'
+
+_tracer = None
+_local = threading.local()
+
+class Tracer:
+    """Streams per-frame, per-stage spans to a trace file."""
+
+    def __init__(self, path, sample_rate=1.0, flush_every=1000):
+        """
+        Initialize the tracer.
+
+        Args:
+            path: Output trace file path
+            sample_rate: Fraction of frames to trace (0 < rate <= 1)
+            flush_every: Number of buffered events written at once
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+
+        self.path = path
+        self.sample_rate = sample_rate
+        self.sample_every = max(1, int(round(1 / sample_rate)))
+        self.flush_every = flush_every
+        self.events = []
+        self.lock = threading.Lock()
+        self.file = open(path, 'w', buffering=1024 * 1024)
+        self.file.write('[\n')
+        self.closed = False
+
+    def is_sampled(self, frame_index):
+        """Check whether a frame is traced."""
+        return frame_index % self.sample_every == 0
+
+    def add_span(self, name, start, end, frame_index, category='stage'):
+        """
+        Record a completed span.
+
+        Args:
+            name: Span name
+            start: Start time from time.perf_counter()
+            end: End time from time.perf_counter()
+            frame_index: Frame the span belongs to
+            category: Trace event category
+        """
+        # Taken per span, the tracer may have been inherited by a forked process
+        self.add_event({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {'frame': frame_index}
+        })
+
+    def add_event(self, event):
+        """Record a trace event."""
+        with self.lock:
+            self.events.append(event)
+            if len(self.events) >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        """Write buffered events (caller holds the lock)."""
+        if self.events and not self.closed:
+            self.file.write(''.join(json.dumps(event) + ',\n' for event in self.events))
+        self.events = []
+
+    def flush(self):
+        """Write buffered events through to the trace file."""
+        with self.lock:
+            self._flush()
+            if not self.closed:
+                self.file.flush()
+
+    def close(self):
+        """Flush remaining events and close the trace file."""
+        with self.lock:
+            self._flush()
+            if not self.closed:
+                # Metadata event terminates the array without a trailing comma
+                self.file.write(json.dumps({
+                    'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                    'args': {'name': 'face-object-detection'}
+                }) + '\n]\n')
+                self.file.close()
+                self.closed = True
+
+        logger.info(f"Trace written to {self.path}")
+
+def start_tracing(path, sample_rate=None):
+    """
+    Start recording a trace.
+
+    Args:
+        path: Output trace file path
+        sample_rate: Fraction of frames to trace (defaults to config)
+
+    Returns:
+        Tracer
+    """
+    global _tracer
+
+    if sample_rate is None:
+        sample_rate = TRACING['sample_rate']
+
+    # Part files of an earlier run would be merged into this one
+    for part in glob.glob(f"{glob.escape(path)}{WORKER_SUFFIX}*"):
+        os.remove(part)
+
+    _tracer = Tracer(path, sample_rate)
+    logger.info(f"Tracing {sample_rate:.0%} of frames to {path}")
+    return _tracer
+
+def stop_tracing():
+    """Stop recording and write the trace file."""
+    global _tracer
+
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+def get_tracer():
+    """Get the active tracer, or None."""
+    return _tracer
+
+def flush_tracing():
+    """Write the active tracer's buffered events through to disk."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.flush()
+
+def start_worker_tracing(path, sample_rate):
+    """
+    Start recording a worker process's part of a trace.
+
+    Forked workers inherit the parent's tracer and trace file; they write to
+    their own part file instead, which the parent merges with
+    merge_worker_traces. Workers may be stopped without notice, so they should
+    call flush_tracing after each unit of work.
+
+    Args:
+        path: Trace file path of the parent process
+        sample_rate: Fraction of frames to trace
+
+    Returns:
+        Tracer
+    """
+    return start_tracing(f"{path}{WORKER_SUFFIX}{os.getpid()}", sample_rate)
+
+def merge_worker_traces(process_name='worker'):
+    """
+    Move the events of the workers' part files into the active trace.
+
+    Call once the workers have exited.
+
+    Args:
+        process_name: Name the workers' processes are shown with
+
+    Returns:
+        Number of merged events
+    """
+    tracer = _tracer
+    if tracer is None:
+        return 0
+
+    merged = 0
+    for part in sorted(glob.glob(f"{glob.escape(tracer.path)}{WORKER_SUFFIX}*")):
+        with open(part) as f:
+            for line in f:
+                line = line.strip().rstrip(',')
+                if line in ('', '[', ']'):
+                    continue
+
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Last line of a killed worker
+                    continue
+
+                tracer.add_event(event)
+                merged += 1
+
+        tracer.add_event({
+            'name': 'process_name', 'ph': 'M', 'pid': int(part.rsplit(WORKER_SUFFIX, 1)[1]),
+            'args': {'name': process_name}
+        })
+        os.remove(part)
+
+    return merged
+
+def begin_frame(frame_index):
+    """
+    Mark the start of a frame on the current thread.
+
+    Ends the previous frame's span, if any.
+
+    Args:
+        frame_index: Frame number
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+
+    end_frame()
+
+    if tracer.is_sampled(frame_index):
+        _local.frame = frame_index
+        _local.frame_start = time.perf_counter()
+
+def end_frame():
+    """Mark the end of the current thread's frame."""
+    frame_index = getattr(_local, 'frame', None)
+    tracer = _tracer
+
+    if frame_index is not None and tracer is not None:
+        tracer.add_span('frame', _local.frame_start, time.perf_counter(), frame_index, category='frame')
+
+    _local.frame = None
+
+def record_span(name, start, end):
+    """
+    Record a stage span if the current thread's frame is sampled.
+
+    Args:
+        name: Stage name
+        start: Start time from time.perf_counter()
+        end: End time from time.perf_counter()
+    """
+    tracer = _tracer
+    frame_index = getattr(_local, 'frame', None)
+
+    if tracer is not None and frame_index is not None:
+        tracer.add_span(name, start, end, frame_index)
@@ -0,0 +1,3 @@
+"""
+Benchmark suite with synthetic streams and stub model backends.
+"""
@@ -0,0 +1,73 @@
+"""
+Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import sys
+import json
+import argparse
+
+def flatten(results, prefix=''):
+    """Flatten nested benchmark results to name -> result dictionaries."""
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict) and 'items_per_second' in value:
+            flat[key] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f"{key}."))
+    return flat
+
+def compare(baseline, candidate, threshold=0.1):
+    """
+    Compare throughput of two benchmark reports.
+
+    Args:
+        baseline: Baseline report dictionary
+        candidate: Candidate report dictionary
+        threshold: Relative slowdown reported as a regression
+
+    Returns:
+        Tuple of (rows, regressions) where rows are (name, old, new, ratio)
+    """
+    old = flatten(baseline['results'])
+    new = flatten(candidate['results'])
+
+    rows = []
+    regressions = []
+    for name in sorted(set(old) & set(new)):
+        old_rate = old[name]['items_per_second']
+        new_rate = new[name]['items_per_second']
+        ratio = new_rate / old_rate if old_rate else float('inf')
+        rows.append((name, old_rate, new_rate, ratio))
+        if ratio < 1 - threshold:
+            regressions.append(name)
+
+    return rows, regressions
+
+def main(argv=None):
+    """Print a comparison table and exit non-zero on regressions."""
+    parser = argparse.ArgumentParser(description='Compare benchmark results')
+    parser.add_argument('baseline', help='Baseline results JSON')
+    parser.add_argument('candidate', help='Candidate results JSON')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+
+    print(f"{'benchmark':<32} {'baseline/s':>12} {'candidate/s':>12} {'ratio':>8}")
+    for name, old_rate, new_rate, ratio in rows:
+        marker = '  REGRESSION' if name in regressions else ''
+        print(f"{name:<32} {old_rate:>12.1f} {new_rate:>12.1f} {ratio:>8.2f}{marker}")
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
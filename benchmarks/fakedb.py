@@ -0,0 +1,197 @@
+"""
+In-memory stand-in for a MongoDB database.
+
+Implements the subset of the pymongo collection API used by
+``database.operations`` so database operations can be benchmarked without
+a server. Only equality and range filters are supported.
+
+``bulk_write`` takes the fake update requests of this module; ``fake_requests()``
+makes the MongoDB backend build those instead of pymongo's.
+"""
+import copy
+import operator
+from unittest import mock
+
+RANGE_OPERATORS = {
+    '$gt': operator.gt,
+    '$gte': operator.ge,
+    '$lt': operator.lt,
+    '$lte': operator.le
+}
+
+def _matches_value(value, condition):
+    if isinstance(condition, dict) and condition and all(key in RANGE_OPERATORS for key in condition):
+        return value is not None and all(RANGE_OPERATORS[key](value, bound) for key, bound in condition.items())
+    return value == condition
+
+class FakeUpdateOne:
+    """Update request of a bulk write, like pymongo's UpdateOne."""
+
+    def __init__(self, filter, update, upsert=False):
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+def fake_requests():
+    """Patch the MongoDB backend to build fake bulk write requests."""
+    return mock.patch('database.backends.mongodb.UpdateOne', FakeUpdateOne)
+
+class FakeInsertResult:
+    """Result of an insert."""
+
+    def __init__(self, inserted_id=None, inserted_ids=None):
+        self.inserted_id = inserted_id
+        self.inserted_ids = inserted_ids or []
+
+class FakeUpdateResult:
+    """Result of an update."""
+
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+class FakeCursor:
+    """Cursor over query results."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field)), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+class FakeCollection:
+    """Dictionary-backed collection keyed by _id."""
+
+    def __init__(self, name):
+        self.name = name
+        self.documents = {}
+        self._next_id = 0
+
+    def _matches(self, document, query):
+        return all(_matches_value(document.get(key), value) for key, value in (query or {}).items())
+
+    def _project(self, document, projection):
+        if not projection:
+            return copy.deepcopy(document)
+        fields = [key for key, value in projection.items() if value]
+        result = {key: copy.deepcopy(document[key]) for key in fields if key in document}
+        if projection.get('_id', 1):
+            result['_id'] = document['_id']
+        return result
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+    def insert_one(self, document):
+        if '_id' not in document:
+            self._next_id += 1
+            document['_id'] = self._next_id
+        self.documents[document['_id']] = copy.deepcopy(document)
+        return FakeInsertResult(inserted_id=document['_id'])
+
+    def insert_many(self, documents, ordered=True):
+        ids = [self.insert_one(document).inserted_id for document in documents]
+        return FakeInsertResult(inserted_ids=ids)
+
+    def find_one(self, query=None, projection=None):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                return self._project(document, projection)
+        return None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([
+            self._project(document, projection)
+            for document in self.documents.values() if self._matches(document, query)
+        ])
+
+    def update_one(self, query, update, upsert=False):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                changes = dict(update.get('$set', {}))
+                for key, value in update.get('$min', {}).items():
+                    if document.get(key) is None or value < document[key]:
+                        changes[key] = value
+                for key, value in update.get('$max', {}).items():
+                    if document.get(key) is None or value > document[key]:
+                        changes[key] = value
+                modified = any(document.get(key) != value for key, value in changes.items())
+                document.update(copy.deepcopy(changes))
+                return FakeUpdateResult(1, int(modified))
+
+        if upsert:
+            document = dict(query)
+            document.update(update.get('$setOnInsert', {}))
+            document.update(update.get('$min', {}))
+            document.update(update.get('$max', {}))
+            document.update(update.get('$set', {}))
+            inserted_id = self.insert_one(document).inserted_id
+            return FakeUpdateResult(0, 0, upserted_id=inserted_id)
+
+        return FakeUpdateResult(0, 0)
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            if isinstance(request, FakeUpdateOne):
+                self.update_one(request.filter, request.update, upsert=request.upsert)
+            else:
+                raise TypeError(f"Unsupported bulk write request: {request!r}")
+        return None
+
+    def aggregate(self, pipeline):
+        # Supports $match, $sort and $group with $first/$last accumulators
+        documents = [copy.deepcopy(document) for document in self.documents.values()]
+        for stage in pipeline:
+            if '$match' in stage:
+                documents = [document for document in documents if self._matches(document, stage['$match'])]
+            elif '$sort' in stage:
+                documents = FakeCursor(documents).sort(list(stage['$sort'].items())).documents
+            elif '$group' in stage:
+                spec = dict(stage['$group'])
+                key = spec.pop('_id').lstrip('$')
+                groups = {}
+                for document in documents:
+                    groups.setdefault(document.get(key), []).append(document)
+                documents = []
+                for group_key, members in groups.items():
+                    result = {'_id': group_key}
+                    for field, accumulator in spec.items():
+                        (name, source), = accumulator.items()
+                        member = members[0] if name == '$first' else members[-1]
+                        result[field] = member.get(source.lstrip('$'))
+                    documents.append(result)
+        return iter(documents)
+
+    def count_documents(self, query):
+        return sum(1 for document in self.documents.values() if self._matches(document, query))
+
+class FakeDatabase:
+    """Database whose collections are created on first access."""
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'collections':
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self):
+        return list(self.collections)
@@ -0,0 +1,165 @@
+"""
+Load test showing request throughput versus the number of server workers.
+
+For each worker count a pre-fork server (``app.server``) is started, warmed
+up, and hit with concurrent POST /api/detect requests for a fixed duration.
+With ``--stub`` the server uses the stub model backends from
+``benchmarks.stubs`` so the test does not need the real models.
+
+Usage:
+    python -m benchmarks.load --workers 1,2,4 --stub --output load.json
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import Scene, encode_jpeg
+
+def wait_until_ready(base_url, timeout):
+    """Wait for /api/ready to return 200."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/ready", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    return False
+
+def run_load(base_url, payloads, concurrency, duration):
+    """
+    Send concurrent requests for a fixed duration.
+
+    Args:
+        base_url: Server base URL
+        payloads: List of JSON request bodies (bytes)
+        concurrency: Number of concurrent clients
+        duration: Test duration in seconds
+
+    Returns:
+        Result dictionary
+    """
+    url = f"{base_url}/api/detect"
+    deadline = time.time() + duration
+
+    def client(index):
+        latencies = []
+        errors = 0
+        i = index
+        while time.time() < deadline:
+            request = urllib.request.Request(url, data=payloads[i % len(payloads)],
+                                             headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError):
+                errors += 1
+            i += concurrency
+        return latencies, errors
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(client, range(concurrency)))
+    elapsed = time.time() - start
+
+    latencies = np.array([latency for result, _ in outcomes for latency in result])
+    errors = sum(error for _, error in outcomes)
+
+    return {
+        'requests': int(len(latencies)),
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+        'p99_ms': float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0
+    }
+
+def serve_with_stubs(argv):
+    """Run app.server with the stub model backends (used as a subprocess)."""
+    from benchmarks.stubs import install_stubs
+    from app import server
+
+    cost_ms = float(os.environ.get('STUB_YOLO_COST_MS', '20'))
+    with install_stubs(yolo_cost_ms=cost_ms):
+        server.main(argv)
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='API load test across worker counts')
+
+    parser.add_argument('--workers', type=str, default='1,2,4',
+                        help='Comma-separated worker counts to test')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Inference threads per worker (0 for cores / workers)')
+    parser.add_argument('--port', type=int, default=8765, help='Server port')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per worker count')
+    parser.add_argument('--stub', action='store_true', help='Use stub model backends')
+    parser.add_argument('--stub-cost-ms', type=float, default=20.0, help='Stub YOLO cost per call')
+    parser.add_argument('--startup-timeout', type=float, default=120.0,
+                        help='Seconds to wait for the server to become ready')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Path of the JSON results file (defaults to stdout)')
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the load test for each worker count."""
+    args = parse_args(argv)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    scene = Scene()
+    payloads = [
+        json.dumps({'image': base64.b64encode(encode_jpeg(scene.render(i)[0])).decode('utf-8')}).encode('utf-8')
+        for i in range(20)
+    ]
+
+    results = []
+    for workers in [int(count) for count in args.workers.split(',')]:
+        command = [sys.executable, '-m']
+        command += ['benchmarks.load', '--serve-stub'] if args.stub else ['app.server']
+        command += ['--workers', str(workers), '--threads', str(args.threads),
+                    '--host', '127.0.0.1', '--port', str(args.port)]
+
+        env = dict(os.environ, STUB_YOLO_COST_MS=str(args.stub_cost_ms))
+        process = subprocess.Popen(command, env=env)
+
+        try:
+            if not wait_until_ready(base_url, args.startup_timeout):
+                raise RuntimeError(f"Server with {workers} workers did not become ready")
+
+            print(f"Testing {workers} workers...", file=sys.stderr)
+            result = run_load(base_url, payloads, args.concurrency, args.duration)
+            result['workers'] = workers
+            results.append(result)
+            print(f"  {result['requests_per_second']:.1f} req/s, p99 {result['p99_ms']:.1f} ms",
+                  file=sys.stderr)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    text = json.dumps({'parameters': vars(args), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve-stub':
+        serve_with_stubs(sys.argv[2:])
+    else:
+        main()
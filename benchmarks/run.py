@@ -0,0 +1,381 @@
+"""
+Reproducible throughput benchmarks.
+
+Runs the video pipeline, the object tracker, the face matcher, the
+``/api/detect`` route and the database operations against synthetic data,
+stub model backends and an in-memory database, and writes the results as
+JSON so they can be compared across commits with ``benchmarks.compare``.
+
+The in-memory database has no round trips or commits, so per-row versus
+bulk writes (``db_bulk``) are best measured with ``--real-db``.
+
+Usage:
+    python -m benchmarks.run --output results.json
+"""
+import os
+import sys
+import json
+import time
+import base64
+import uuid
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+from app.config import DATABASE
+from database.backends import MongoDBBackend, mongodb
+from benchmarks.fakedb import FakeDatabase, fake_requests
+from benchmarks.stubs import install_stubs
+from benchmarks.synthetic import Scene, write_clip, encode_jpeg
+
+# Configured database, before main() points the benchmarks at the in-memory one
+CONFIGURED_DATABASE = dict(DATABASE)
+PYMONGO_REQUESTS = {'UpdateOne': mongodb.UpdateOne}
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a benchmark function."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def summarize(durations, items=None):
+    """
+    Summarize a list of per-iteration durations.
+
+    Args:
+        durations: Durations in seconds
+        items: Number of processed items (defaults to the number of durations)
+
+    Returns:
+        Result dictionary
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    total = float(durations.sum())
+    items = len(durations) if items is None else items
+
+    return {
+        'iterations': len(durations),
+        'items': items,
+        'seconds': total,
+        'items_per_second': items / total if total > 0 else 0.0,
+        'p50_ms': float(np.percentile(durations, 50) * 1000) if len(durations) else 0.0,
+        'p95_ms': float(np.percentile(durations, 95) * 1000) if len(durations) else 0.0,
+        'p99_ms': float(np.percentile(durations, 99) * 1000) if len(durations) else 0.0
+    }
+
+def timed(func, iterations):
+    """Call func repeatedly and return the duration of each call."""
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+@benchmark('process_video')
+def bench_process_video(args):
+    """End-to-end pipeline over a synthetic clip."""
+    from app import main
+
+    scene = Scene(args.width, args.height, args.people, args.objects, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = write_clip(os.path.join(tmp, 'clip.mp4'), scene, args.frames)
+
+        with mock.patch.object(main, 'get_database', return_value=FakeDatabase()):
+            stats = main.process_video(clip)
+
+    return {
+        'iterations': 1,
+        'items': stats['frames'],
+        'seconds': stats['seconds'],
+        'items_per_second': stats['fps']
+    }
+
+@benchmark('tracker')
+def bench_tracker(args):
+    """Object tracking over the synthetic scene's ground truth."""
+    from detection.object_detector import ObjectDetector
+
+    scene = Scene(args.width, args.height, args.people, args.objects, args.seed)
+    detector = ObjectDetector('stub.pt')
+
+    frames = []
+    for frame_index in range(args.frames):
+        _, truth = scene.render(frame_index)
+        frames.append([
+            {'class_name': item['class_name'], 'class_id': 0, 'confidence': 0.9, 'bbox': item['bbox']}
+            for item in truth if item['class_name'] != 'person'
+        ])
+
+    durations = timed(lambda i: detector._track_objects([dict(d) for d in frames[i]]), args.frames)
+    return summarize(durations)
+
+@benchmark('matcher')
+def bench_matcher(args):
+    """Face matching against a gallery of known faces."""
+    from detection.face_detector import FaceDetector
+
+    rng = np.random.default_rng(args.seed)
+    detector = FaceDetector('stub.pt')
+    detector.load_known_faces([
+        {'_id': str(uuid.uuid4()), 'encoding': rng.normal(0, 0.1, 128).tolist()}
+        for _ in range(args.gallery)
+    ])
+
+    queries = rng.normal(0, 0.1, (args.queries, 128))
+    durations = timed(lambda i: detector._recognize_face(queries[i]), args.queries)
+    return summarize(durations)
+
+@benchmark('gallery_load')
+def bench_gallery_load(args):
+    """Loading stored encodings into the gallery, JSON lists versus packed float32."""
+    from database.encoding import pack_encoding, unpack_encoding
+    from detection.gallery import FaceGallery
+
+    rng = np.random.default_rng(args.seed)
+    encodings = rng.normal(0, 0.1, (args.gallery, 128))
+
+    stored = {
+        'json': [json.dumps(encoding.tolist()) for encoding in encodings],
+        'packed': [pack_encoding(encoding) for encoding in encodings]
+    }
+
+    results = {}
+    for name, values in stored.items():
+        start = time.perf_counter()
+
+        # JSON is parsed by the database driver before the gallery sees it
+        decoded = (json.loads(value) if name == 'json' else value for value in values)
+        FaceGallery().add_many({'_id': i, 'encoding': unpack_encoding(value)} for i, value in enumerate(decoded))
+
+        results[name] = summarize([time.perf_counter() - start], items=len(values))
+        results[name]['stored_bytes'] = sum(len(value) for value in values)
+
+    return results
+
+@benchmark('api_detect')
+def bench_api_detect(args):
+    """POST /api/detect through the Flask test client."""
+    from run import create_flask_app
+
+    scene = Scene(args.width, args.height, args.people, args.objects, args.seed)
+    payloads = [
+        {'image': base64.b64encode(encode_jpeg(scene.render(i)[0])).decode('utf-8')}
+        for i in range(min(args.requests, 50))
+    ]
+
+    client = create_flask_app().test_client()
+
+    def request(i):
+        response = client.post('/api/detect', json=payloads[i % len(payloads)])
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/detect returned {response.status_code}")
+
+    durations = timed(request, args.requests)
+    return summarize(durations)
+
+@benchmark('api_detect_batch')
+def bench_api_detect_batch(args):
+    """POST /api/detect/batch with raw concatenated JPEG bodies."""
+    from run import create_flask_app
+
+    scene = Scene(args.width, args.height, args.people, args.objects, args.seed)
+    images = [encode_jpeg(scene.render(i)[0]) for i in range(args.batch_size)]
+    body = b''.join(images)
+    headers = {'X-Image-Lengths': ','.join(str(len(image)) for image in images)}
+
+    client = create_flask_app().test_client()
+
+    def request(i):
+        response = client.post('/api/detect/batch', data=body, headers=headers,
+                               content_type='application/octet-stream')
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/detect/batch returned {response.status_code}")
+
+    iterations = max(1, args.requests // args.batch_size)
+    durations = timed(request, iterations)
+    return summarize(durations, items=iterations * args.batch_size)
+
+@benchmark('db_operations')
+def bench_db_operations(args):
+    """Object insert, lookup and update against the in-memory database."""
+    from database.operations import add_object, get_object, update_object
+
+    db = FakeDatabase()
+    tracking_ids = [str(uuid.uuid4()) for _ in range(args.rows)]
+
+    def write(i):
+        add_object(db, {'tracking_id': tracking_ids[i], 'class_name': 'backpack', 'owner_id': 'owner'})
+
+    def read_update(i):
+        if get_object(db, tracking_ids[i]):
+            update_object(db, tracking_ids[i], {'owner_id': f'owner-{i}', 'last_seen': datetime.now()})
+
+    inserts = timed(write, args.rows)
+    updates = timed(read_update, args.rows)
+
+    return {
+        'insert': summarize(inserts),
+        'get_and_update': summarize(updates)
+    }
+
+def delete_benchmark_objects(db, object_ids):
+    """Remove the objects a benchmark wrote to a real database."""
+    if DATABASE['type'] == 'mongodb':
+        db[DATABASE['collections']['objects']].delete_many({'_id': {'$in': object_ids}})
+    else:
+        placeholders = ', '.join(['%s'] * len(object_ids))
+        with db.cursor() as cur:
+            cur.execute(f"DELETE FROM objects WHERE id IN ({placeholders})", object_ids)
+        db.commit()
+
+@benchmark('db_bulk')
+def bench_db_bulk(args):
+    """Per-row object writes versus the bulk operations."""
+    from database.operations import (
+        add_object, add_objects_bulk, get_object, update_object, upsert_objects_bulk
+    )
+
+    if args.real_db:
+        from database.db import get_database, release_database
+        from database.backends import create_backend
+        context = mock.patch.dict(DATABASE, CONFIGURED_DATABASE)
+        backend = mock.patch('database.backends._backend', create_backend(CONFIGURED_DATABASE['type']))
+        mongo_requests = mock.patch.multiple('database.backends.mongodb', **PYMONGO_REQUESTS)
+    else:
+        context = mock.patch.dict(DATABASE, {})
+        backend = mongo_requests = contextlib.nullcontext()
+
+    def objects(prefix):
+        return [{'tracking_id': f"{prefix}-{i}", 'class_name': 'backpack', 'owner_id': None}
+                for i in range(args.rows)]
+
+    results = {}
+    with context, backend, mongo_requests:
+        db = get_database() if args.real_db else FakeDatabase()
+        run = uuid.uuid4().hex[:8]
+        written = []
+
+        try:
+            rows = objects(f"bench-{run}-a")
+            results['per_row_insert'] = summarize(timed(lambda i: written.append(add_object(db, rows[i])), args.rows))
+
+            rows = objects(f"bench-{run}-b")
+            start = time.perf_counter()
+            written.extend(add_objects_bulk(db, rows))
+            results['bulk_insert'] = summarize([time.perf_counter() - start], items=args.rows)
+
+            # Update the rows written one by one, the way the pipeline records ownership
+            def upsert_one(i):
+                tracking_id = f"bench-{run}-a-{i}"
+                if get_object(db, tracking_id):
+                    update_object(db, tracking_id, {'last_seen': datetime.now()})
+                else:
+                    add_object(db, {'tracking_id': tracking_id, 'class_name': 'backpack'})
+
+            results['per_row_upsert'] = summarize(timed(upsert_one, args.rows))
+
+            rows = objects(f"bench-{run}-b")
+            start = time.perf_counter()
+            upsert_objects_bulk(db, rows)
+            results['bulk_upsert'] = summarize([time.perf_counter() - start], items=args.rows)
+        finally:
+            if args.real_db:
+                delete_benchmark_objects(db, written)
+                release_database()
+
+    for operation in ('insert', 'upsert'):
+        per_row = results[f"per_row_{operation}"]['items_per_second']
+        bulk = results[f"bulk_{operation}"]['items_per_second']
+        results[f"{operation}_speedup"] = bulk / per_row if per_row > 0 else None
+
+    return results
+
+def git_revision():
+    """Get the current git commit, if available."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Face and Object Detection benchmarks')
+
+    parser.add_argument('--only', type=str, default=None,
+                        help=f"Comma-separated benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--output', type=str, default=None,
+                        help='Path of the JSON results file (defaults to stdout)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--width', type=int, default=640, help='Frame width')
+    parser.add_argument('--height', type=int, default=480, help='Frame height')
+    parser.add_argument('--people', type=int, default=4, help='People per frame')
+    parser.add_argument('--objects', type=int, default=3, help='Objects per frame')
+    parser.add_argument('--frames', type=int, default=300, help='Frames per clip')
+    parser.add_argument('--gallery', type=int, default=10000, help='Known faces for the matcher')
+    parser.add_argument('--queries', type=int, default=1000, help='Matcher queries')
+    parser.add_argument('--requests', type=int, default=200, help='API requests')
+    parser.add_argument('--batch-size', type=int, default=16, help='Images per batch request')
+    parser.add_argument('--rows', type=int, default=10000, help='Database rows')
+    parser.add_argument('--real-db', action='store_true',
+                        help='Run db_bulk against the configured database instead of the in-memory one')
+    parser.add_argument('--yolo-cost-ms', type=float, default=20.0, help='Stub YOLO cost per call')
+    parser.add_argument('--face-location-cost-ms', type=float, default=10.0,
+                        help='Stub face_locations cost per call')
+    parser.add_argument('--face-encoding-cost-ms', type=float, default=5.0,
+                        help='Stub face_encodings cost per call')
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the selected benchmarks and write the results."""
+    args = parse_args(argv)
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    results = {}
+    with mock.patch.dict(DATABASE, {'type': 'mongodb'}), \
+            mock.patch('database.backends._backend', MongoDBBackend()), fake_requests(), \
+            mock.patch('api.routes.get_database', FakeDatabase), \
+            install_stubs(args.yolo_cost_ms, args.face_location_cost_ms, args.face_encoding_cost_ms):
+        for name in names:
+            print(f"Running {name}...", file=sys.stderr)
+            np.random.seed(args.seed)
+            results[name] = BENCHMARKS[name](args)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'parameters': vars(args),
+        'results': results
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Stub YOLO and face_recognition backends with a fixed per-call cost.
+
+The stubs recover the people and objects drawn by ``benchmarks.synthetic``
+from their colors and then sleep for the configured cost, so benchmarks
+measure the pipeline around the models instead of the models themselves.
+"""
+import time
+import contextlib
+
+import cv2
+import numpy as np
+
+from detection import face_detector, object_detector
+from benchmarks.synthetic import (
+    OBJECT_COLORS, PERSON_GREEN, PERSON_RED_BASE, PERSON_RED_STEP
+)
+
+# COCO class IDs of the classes used by the detectors
+COCO_NAMES = {
+    0: 'person',
+    24: 'backpack',
+    25: 'umbrella',
+    26: 'handbag',
+    28: 'suitcase',
+    63: 'laptop'
+}
+CLASS_IDS = {name: class_id for class_id, name in COCO_NAMES.items()}
+
+COLOR_TOLERANCE = 40
+MIN_AREA = 100
+ENCODING_SIZE = 128
+
+class StubBox:
+    """Single detection with the attributes of an ultralytics box."""
+
+    def __init__(self, class_id, confidence, bbox):
+        self.cls = np.array([class_id], dtype=np.float32)
+        self.conf = np.array([confidence], dtype=np.float32)
+        self.xyxy = np.array([bbox], dtype=np.float32)
+
+class StubResult:
+    """Detections of one image with the attributes of an ultralytics result."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.names = COCO_NAMES
+
+    def __iter__(self):
+        return iter(self.boxes)
+
+    def __len__(self):
+        return len(self.boxes)
+
+def _find_boxes(frame, color, lower_only=None):
+    """Find solid rectangles of a color."""
+    color = np.array(color, dtype=np.int16)
+    lower = np.clip(color - COLOR_TOLERANCE, 0, 255).astype(np.uint8)
+    upper = np.clip(color + COLOR_TOLERANCE, 0, 255).astype(np.uint8)
+    if lower_only is not None:
+        lower[lower_only] = 0
+        upper[lower_only] = 255
+
+    mask = cv2.inRange(frame, lower, upper)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+
+    boxes = []
+    for x, y, w, h, area in stats[1:count]:
+        if area >= MIN_AREA:
+            boxes.append((float(x), float(y), float(x + w), float(y + h)))
+
+    return boxes
+
+def detect_synthetic(frame):
+    """
+    Recover the people and objects of a synthetic frame.
+
+    Args:
+        frame: BGR frame
+
+    Returns:
+        List of StubBox
+    """
+    boxes = []
+
+    # People: green with any red channel value
+    for bbox in _find_boxes(frame, (0, PERSON_GREEN, 0), lower_only=2):
+        boxes.append(StubBox(CLASS_IDS['person'], 0.9, bbox))
+
+    for class_name, color in OBJECT_COLORS.items():
+        for bbox in _find_boxes(frame, color):
+            boxes.append(StubBox(CLASS_IDS[class_name], 0.8, bbox))
+
+    return boxes
+
+class StubYOLO:
+    """Drop-in replacement for ultralytics.YOLO."""
+
+    # Per-call cost in seconds, set by install_stubs
+    cost = 0.0
+
+    def __init__(self, model_path=None, *args, **kwargs):
+        self.model_path = model_path
+        self.names = COCO_NAMES
+        self.calls = 0
+
+    def __call__(self, source, *args, **kwargs):
+        images = source if isinstance(source, (list, tuple)) else [source]
+
+        self.calls += 1
+        if self.cost:
+            time.sleep(self.cost)
+
+        return [StubResult(detect_synthetic(image)) for image in images]
+
+    def predict(self, source, *args, **kwargs):
+        return self(source, *args, **kwargs)
+
+class StubFaceRecognition:
+    """Drop-in replacement for the face_recognition module."""
+
+    def __init__(self, location_cost=0.0, encoding_cost=0.0):
+        self.location_cost = location_cost
+        self.encoding_cost = encoding_cost
+        self._encodings = {}
+
+    def _encoding(self, identity):
+        """Get the deterministic encoding of an identity."""
+        if identity not in self._encodings:
+            rng = np.random.default_rng(1000 + identity)
+            self._encodings[identity] = rng.normal(0, 0.1, ENCODING_SIZE)
+        return self._encodings[identity]
+
+    def face_locations(self, rgb_img, *args, **kwargs):
+        if self.location_cost:
+            time.sleep(self.location_cost)
+
+        h, w = rgb_img.shape[:2]
+        if h < 20 or w < 20:
+            return []
+
+        # Face in the upper part of the person box (top, right, bottom, left)
+        return [(0, w - 1, min(h - 1, w), 0)]
+
+    def face_encodings(self, rgb_img, known_face_locations=None, *args, **kwargs):
+        if self.encoding_cost:
+            time.sleep(self.encoding_cost)
+
+        # Identity is encoded in the red channel (channel 0 in RGB)
+        red = float(np.median(rgb_img[..., 0]))
+        identity = int(round((red - PERSON_RED_BASE) / PERSON_RED_STEP))
+        locations = known_face_locations or [None]
+
+        return [self._encoding(identity).copy() for _ in locations]
+
+    def face_distance(self, face_encodings, face_to_compare):
+        if len(face_encodings) == 0:
+            return np.empty(0)
+        return np.linalg.norm(np.asarray(face_encodings) - face_to_compare, axis=1)
+
+    def compare_faces(self, known_face_encodings, face_encoding_to_check, tolerance=0.6):
+        return list(self.face_distance(known_face_encodings, face_encoding_to_check) <= tolerance)
+
+@contextlib.contextmanager
+def install_stubs(yolo_cost_ms=0.0, face_location_cost_ms=0.0, face_encoding_cost_ms=0.0):
+    """
+    Replace the model backends of the detectors with stubs.
+
+    Args:
+        yolo_cost_ms: Cost of a YOLO call in milliseconds
+        face_location_cost_ms: Cost of a face_locations call in milliseconds
+        face_encoding_cost_ms: Cost of a face_encodings call in milliseconds
+
+    Yields:
+        The StubFaceRecognition instance
+    """
+    face_recognition = StubFaceRecognition(face_location_cost_ms / 1000, face_encoding_cost_ms / 1000)
+    originals = (face_detector.YOLO, object_detector.YOLO, face_detector.face_recognition)
+
+    StubYOLO.cost = yolo_cost_ms / 1000
+    face_detector.YOLO = StubYOLO
+    object_detector.YOLO = StubYOLO
+    face_detector.face_recognition = face_recognition
+
+    try:
+        yield face_recognition
+    finally:
+        face_detector.YOLO, object_detector.YOLO, face_detector.face_recognition = originals
+        StubYOLO.cost = 0.0
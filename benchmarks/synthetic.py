@@ -0,0 +1,144 @@
+"""
+Synthetic frames and clips for benchmarks.
+
+People and objects are drawn as solid rectangles whose colors identify their
+class (and, for people, their identity), so the stub backends in
+``benchmarks.stubs`` can recover them from the pixels, even after lossy
+video compression.
+"""
+import cv2
+import numpy as np
+
+# BGR colors of object classes
+OBJECT_COLORS = {
+    'backpack': (200, 0, 0),
+    'umbrella': (200, 200, 0),
+    'handbag': (200, 0, 200),
+    'suitcase': (110, 110, 110),
+    'laptop': (0, 0, 200)
+}
+
+# People are green with the red channel encoding their identity
+PERSON_GREEN = 200
+PERSON_RED_BASE = 40
+PERSON_RED_STEP = 20
+MAX_PEOPLE = 8
+
+BACKGROUND = (40, 40, 40)
+
+class Scene:
+    """Deterministic scene of people and objects moving across the frame."""
+
+    def __init__(self, width=640, height=480, people=4, objects=3, seed=0):
+        """
+        Initialize the scene.
+
+        Args:
+            width: Frame width
+            height: Frame height
+            people: Number of people (at most MAX_PEOPLE)
+            objects: Number of objects
+            seed: Random seed
+        """
+        if people > MAX_PEOPLE:
+            raise ValueError(f"At most {MAX_PEOPLE} people are supported")
+
+        self.width = width
+        self.height = height
+
+        rng = np.random.default_rng(seed)
+        classes = list(OBJECT_COLORS)
+
+        self.people = []
+        for identity in range(people):
+            self.people.append({
+                'identity': identity,
+                'size': (int(rng.integers(50, 80)), int(rng.integers(120, 180))),
+                'position': rng.uniform(0, 1, size=2),
+                'velocity': rng.uniform(-0.004, 0.004, size=2)
+            })
+
+        self.objects = []
+        for index in range(objects):
+            self.objects.append({
+                'class_name': classes[index % len(classes)],
+                'size': (int(rng.integers(25, 45)), int(rng.integers(25, 45))),
+                'position': rng.uniform(0, 1, size=2),
+                'velocity': rng.uniform(-0.003, 0.003, size=2)
+            })
+
+    def _bbox(self, item, frame_index):
+        """Get the bounding box of an item at a frame."""
+        w, h = item['size']
+        # Bounce between the frame borders
+        pos = (item['position'] + item['velocity'] * frame_index) % 2.0
+        pos = np.where(pos > 1.0, 2.0 - pos, pos)
+        x1 = int(pos[0] * (self.width - w))
+        y1 = int(pos[1] * (self.height - h))
+        return (x1, y1, x1 + w, y1 + h)
+
+    def render(self, frame_index):
+        """
+        Render a frame.
+
+        Args:
+            frame_index: Frame number
+
+        Returns:
+            Tuple of (BGR frame, list of ground truth dictionaries)
+        """
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[:] = BACKGROUND
+
+        truth = []
+        for person in self.people:
+            x1, y1, x2, y2 = self._bbox(person, frame_index)
+            color = (0, PERSON_GREEN, PERSON_RED_BASE + PERSON_RED_STEP * person['identity'])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+            truth.append({'class_name': 'person', 'identity': person['identity'], 'bbox': (x1, y1, x2, y2)})
+
+        for obj in self.objects:
+            x1, y1, x2, y2 = self._bbox(obj, frame_index)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), OBJECT_COLORS[obj['class_name']], -1)
+            truth.append({'class_name': obj['class_name'], 'bbox': (x1, y1, x2, y2)})
+
+        return frame, truth
+
+def write_clip(path, scene, frames, fps=25):
+    """
+    Write a synthetic clip to a video file.
+
+    Args:
+        path: Output video path
+        scene: Scene to render
+        frames: Number of frames
+        fps: Frames per second
+
+    Returns:
+        Path of the written clip
+    """
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(path, fourcc, fps, (scene.width, scene.height))
+
+    try:
+        for frame_index in range(frames):
+            frame, _ = scene.render(frame_index)
+            out.write(frame)
+    finally:
+        out.release()
+
+    return path
+
+def encode_jpeg(frame, quality=90):
+    """
+    Encode a frame as JPEG.
+
+    Args:
+        frame: BGR frame
+        quality: JPEG quality
+
+    Returns:
+        JPEG bytes
+    """
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
@@ -0,0 +1,53 @@
+"""
+Database backends.
+
+Each supported database implements the ``Backend`` interface once; the
+operations in ``database.operations`` call the backend of the configured
+database, which is chosen once per process instead of on every call.
+"""
+import threading
+
+from app.config import DATABASE
+from database.backends.base import Backend, UPDATABLE_OBJECT_FIELDS
+from database.backends.mongodb import MongoDBBackend
+from database.backends.postgresql import PostgreSQLBackend
+from database.backends.sqlite import SQLiteBackend
+
+BACKENDS = {
+    'mongodb': MongoDBBackend,
+    'postgresql': PostgreSQLBackend,
+    'sqlite': SQLiteBackend
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(db_type):
+    """
+    Create the backend of a database type.
+
+    Args:
+        db_type: 'mongodb', 'postgresql' or 'sqlite'
+
+    Returns:
+        Backend
+    """
+    if db_type not in BACKENDS:
+        raise ValueError(f"Unsupported database type: {db_type}")
+    return BACKENDS[db_type]()
+
+def get_backend():
+    """
+    Get the backend of the configured database.
+
+    Returns:
+        Backend
+    """
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(DATABASE['type'])
+
+    return _backend
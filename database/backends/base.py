@@ -0,0 +1,96 @@
+"""
+Interface of database backends.
+
+Backends take input that ``database.operations`` already validated and
+completed (IDs, timestamps, packed encodings) and return rows in the
+MongoDB-like format the rest of the application uses (``_id`` keys).
+"""
+
+# Fields of an object that may be changed by update_object
+UPDATABLE_OBJECT_FIELDS = ('class_name', 'owner_id', 'first_seen', 'last_seen', 'metadata')
+
+class Backend:
+    """Database work of the operations, implemented once per database."""
+
+    def rollback(self, db):
+        """Abandon the current transaction after an error, if the database has transactions."""
+
+    def add_face(self, db, face):
+        """Insert a face with a packed encoding and return its ID."""
+        raise NotImplementedError
+
+    def get_face(self, db, face_id):
+        """Get a face without its image, or None."""
+        raise NotImplementedError
+
+    def get_face_image_ref(self, db, face_id):
+        """Get the 'image_hash' and legacy 'encrypted_image' of a face, or None."""
+        raise NotImplementedError
+
+    def get_all_faces(self, db):
+        """Get all faces without their images."""
+        raise NotImplementedError
+
+    def get_face_encodings(self, db, since=None):
+        """Get '_id', 'encoding' and 'timestamp' of faces, oldest first."""
+        raise NotImplementedError
+
+    def get_faces_page(self, db, limit, after=None):
+        """Get a page of faces ordered by timestamp and ID."""
+        raise NotImplementedError
+
+    def add_object(self, db, object_data):
+        """Insert an object and return its ID."""
+        raise NotImplementedError
+
+    def update_object(self, db, tracking_id, update_data):
+        """Set whitelisted fields of an object and return whether it was modified."""
+        raise NotImplementedError
+
+    def get_object(self, db, tracking_id):
+        """Get an object by tracking ID, or None."""
+        raise NotImplementedError
+
+    def find_objects(self, db, limit, class_name=None, owner_id=None, seen_after=None, seen_before=None, after=None):
+        """Get a page of objects matching filters, most recently seen first."""
+        raise NotImplementedError
+
+    def get_person_objects(self, db, person_id):
+        """Get all objects owned by a person."""
+        raise NotImplementedError
+
+    def add_association(self, db, association_data):
+        """Insert or update an object-person association and return its ID."""
+        raise NotImplementedError
+
+    def add_faces_bulk(self, db, faces):
+        """Insert faces with packed encodings in one transaction."""
+        raise NotImplementedError
+
+    def add_objects_bulk(self, db, objects):
+        """Insert objects in one transaction."""
+        raise NotImplementedError
+
+    def upsert_objects_bulk(self, db, objects, now):
+        """Insert or update objects by tracking ID in one transaction."""
+        raise NotImplementedError
+
+    def add_associations_bulk(self, db, associations):
+        """Insert or update associations in one transaction."""
+        raise NotImplementedError
+
+    def add_sightings_bulk(self, db, sightings):
+        """Append sightings to the sightings log in one transaction."""
+        raise NotImplementedError
+
+    def find_sightings(self, db, tracking_id, limit, since=None, until=None, after=None):
+        """Get a page of an object's sightings, oldest first; ``after`` is a (timestamp, _id) cursor."""
+        raise NotImplementedError
+
+    def rollup_sightings(self, db, since, until):
+        """Fold sightings of a time range into the objects summary and return the number of objects."""
+        raise NotImplementedError
+
+    def prune_sightings(self, db, cutoff):
+        """Remove sightings older than the cutoff and return the number of partitions or rows removed."""
+        raise NotImplementedError
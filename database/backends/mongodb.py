@@ -0,0 +1,206 @@
+"""
+MongoDB backend.
+"""
+import uuid
+
+try:
+    from pymongo import UpdateOne
+except ImportError:
+    UpdateOne = None
+
+from app.config import DATABASE
+from database.backends.base import Backend
+
+class MongoDBBackend(Backend):
+    """Operations on MongoDB collections."""
+
+    def __init__(self):
+        self.collections = DATABASE['collections']
+
+    def add_face(self, db, face):
+        document = dict(face)
+        document.pop('encrypted_image', None)
+        db[self.collections['faces']].insert_one(document)
+        return face['_id']
+
+    def get_face(self, db, face_id):
+        return db[self.collections['faces']].find_one({"_id": face_id}, {"encrypted_image": 0})
+
+    def get_face_image_ref(self, db, face_id):
+        return db[self.collections['faces']].find_one({"_id": face_id}, {"image_hash": 1, "encrypted_image": 1})
+
+    def get_all_faces(self, db):
+        return list(db[self.collections['faces']].find({}, {"encrypted_image": 0}))
+
+    def get_face_encodings(self, db, since=None):
+        query = {'timestamp': {'$gte': since}} if since is not None else {}
+        cursor = db[self.collections['faces']].find(query, {'encoding': 1, 'timestamp': 1}).sort('timestamp', 1)
+        return list(cursor)
+
+    def get_faces_page(self, db, limit, after=None):
+        query = {}
+        if after is not None:
+            timestamp, face_id = after
+            query = {'$or': [
+                {'timestamp': {'$gt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$gt': face_id}}
+            ]}
+
+        cursor = db[self.collections['faces']].find(query, {'timestamp': 1, 'metadata': 1})
+        return list(cursor.sort([('timestamp', 1), ('_id', 1)]).limit(limit))
+
+    def add_object(self, db, object_data):
+        db[self.collections['objects']].insert_one(object_data)
+        return object_data['_id']
+
+    def update_object(self, db, tracking_id, update_data):
+        result = db[self.collections['objects']].update_one({"tracking_id": tracking_id}, {"$set": update_data})
+        return result.modified_count > 0
+
+    def get_object(self, db, tracking_id):
+        return db[self.collections['objects']].find_one({"tracking_id": tracking_id})
+
+    def find_objects(self, db, limit, class_name=None, owner_id=None, seen_after=None, seen_before=None, after=None):
+        query = {}
+        if class_name is not None:
+            query['class_name'] = class_name
+        if owner_id is not None:
+            query['owner_id'] = owner_id
+
+        last_seen = {}
+        if seen_after is not None:
+            last_seen['$gte'] = seen_after
+        if seen_before is not None:
+            last_seen['$lt'] = seen_before
+        if last_seen:
+            query['last_seen'] = last_seen
+
+        if after is not None:
+            query = {'$and': [query, {'$or': [
+                {'last_seen': {'$lt': after[0]}},
+                {'last_seen': after[0], '_id': {'$lt': after[1]}}
+            ]}]}
+
+        cursor = db[self.collections['objects']].find(query).sort([('last_seen', -1), ('_id', -1)]).limit(limit)
+        return list(cursor)
+
+    def get_person_objects(self, db, person_id):
+        return list(db[self.collections['objects']].find({"owner_id": person_id}))
+
+    def association_update(self, association_data):
+        """Filter and update of an association upsert, keyed like the SQL unique constraint."""
+        key = {'person_id': association_data['person_id'], 'object_id': association_data['object_id']}
+        update = {field: value for field, value in association_data.items()
+                  if field not in ('_id', 'person_id', 'object_id')}
+        return key, {'$set': update}
+
+    def add_association(self, db, association_data):
+        collection = db[self.collections['associations']]
+        key, update = self.association_update(association_data)
+        result = collection.update_one(key, update, upsert=True)
+        if result.upserted_id is not None:
+            return result.upserted_id
+        return collection.find_one(key, {'_id': 1})['_id']
+
+    def add_faces_bulk(self, db, faces):
+        documents = []
+        for face in faces:
+            document = dict(face)
+            document.pop('encrypted_image', None)
+            documents.append(document)
+        db[self.collections['faces']].insert_many(documents, ordered=False)
+
+    def add_objects_bulk(self, db, objects):
+        db[self.collections['objects']].insert_many(objects, ordered=False)
+
+    def upsert_objects_bulk(self, db, objects, now):
+        requests = []
+        for object_data in objects:
+            update = {key: value for key, value in object_data.items()
+                      if key not in ('_id', 'tracking_id', 'first_seen')}
+            update.setdefault('last_seen', now)
+            requests.append(UpdateOne(
+                {'tracking_id': object_data['tracking_id']},
+                {
+                    '$set': update,
+                    '$setOnInsert': {
+                        '_id': object_data.get('_id', str(uuid.uuid4())),
+                        'first_seen': object_data.get('first_seen', now)
+                    }
+                },
+                upsert=True
+            ))
+        db[self.collections['objects']].bulk_write(requests, ordered=True)
+
+    def add_associations_bulk(self, db, associations):
+        # Ordered, so a repeated pair in one batch updates the row its first
+        # occurrence inserted
+        db[self.collections['associations']].bulk_write(
+            [UpdateOne(*self.association_update(association_data), upsert=True)
+             for association_data in associations], ordered=True)
+
+    def add_sightings_bulk(self, db, sightings):
+        db[self.collections['sightings']].insert_many([dict(sighting) for sighting in sightings], ordered=False)
+
+    def find_sightings(self, db, tracking_id, limit, since=None, until=None, after=None):
+        timestamp = {}
+        if since is not None:
+            timestamp['$gte'] = since
+        if until is not None:
+            timestamp['$lt'] = until
+
+        query = {'tracking_id': tracking_id}
+        if timestamp:
+            query['timestamp'] = timestamp
+        if after is not None:
+            query['$or'] = [
+                {'timestamp': {'$gt': after[0]}},
+                {'timestamp': after[0], '_id': {'$gt': after[1]}}
+            ]
+
+        cursor = db[self.collections['sightings']].find(query).sort([('timestamp', 1), ('_id', 1)]).limit(limit)
+        return list(cursor)
+
+    def rollup_sightings(self, db, since, until):
+        summaries = list(db[self.collections['sightings']].aggregate([
+            {'$match': {'timestamp': {'$gte': since, '$lt': until}}},
+            {'$sort': {'timestamp': 1}},
+            {'$group': {
+                '_id': '$tracking_id',
+                'class_name': {'$last': '$class_name'},
+                'owner_id': {'$last': '$owner_id'},
+                'first_seen': {'$first': '$timestamp'},
+                'last_seen': {'$last': '$timestamp'}
+            }}
+        ]))
+
+        requests = []
+        for summary in summaries:
+            tracking_id = summary['_id']
+            requests.append(UpdateOne(
+                {'tracking_id': tracking_id},
+                {
+                    '$setOnInsert': {
+                        '_id': str(uuid.uuid4()),
+                        'class_name': summary['class_name'],
+                        'owner_id': summary['owner_id']
+                    },
+                    '$min': {'first_seen': summary['first_seen']},
+                    '$max': {'last_seen': summary['last_seen']}
+                },
+                upsert=True
+            ))
+            # Only the latest sighting decides the owner
+            requests.append(UpdateOne(
+                {'tracking_id': tracking_id, 'last_seen': summary['last_seen']},
+                {'$set': {'class_name': summary['class_name'], 'owner_id': summary['owner_id']}}
+            ))
+
+        if requests:
+            db[self.collections['objects']].bulk_write(requests, ordered=True)
+
+        return len(summaries)
+
+    def prune_sightings(self, db, cutoff):
+        # The server expires sightings itself (expireAfterSeconds of the collection)
+        return 0
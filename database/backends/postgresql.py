@@ -0,0 +1,172 @@
+"""
+PostgreSQL backend.
+
+The hot statements run as server-side prepared statements: each is parsed
+and planned once per connection with ``PREPARE`` and afterwards only
+executed. Bulk writes pass one array per column and ``unnest`` them, so the
+same prepared statement serves batches of any size.
+"""
+import json
+import uuid
+
+try:
+    from psycopg2.extras import Json, execute_values
+except ImportError:
+    Json = execute_values = None
+
+from database.backends.sql import SQLBackend, FACE_COLUMNS, OBJECT_COLUMNS, last_per_key, with_id
+from database.db import (
+    ensure_sighting_partitions, drop_sighting_partitions, encodings_packed, ENCODINGS_MIGRATION_HINT
+)
+
+# Rows per statement of execute_values
+PAGE_SIZE = 1000
+
+# Prepared statements by name; $n are the parameters
+STATEMENTS = {
+    'get_face': f"""
+        SELECT {FACE_COLUMNS} FROM faces WHERE id = $1
+    """,
+    'get_object': f"""
+        SELECT {OBJECT_COLUMNS} FROM objects WHERE tracking_id = $1
+    """,
+    'add_association': """
+        INSERT INTO associations (person_id, object_id, distance, timestamp)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (person_id, object_id) DO UPDATE
+        SET distance = EXCLUDED.distance, timestamp = EXCLUDED.timestamp
+        RETURNING id
+    """,
+    'upsert_objects': f"""
+        INSERT INTO objects ({OBJECT_COLUMNS})
+        SELECT id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata::jsonb
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamp[], $6::timestamp[], $7::text[])
+            AS rows (id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata)
+        ON CONFLICT (tracking_id) DO UPDATE
+        SET class_name = EXCLUDED.class_name,
+            owner_id = EXCLUDED.owner_id,
+            last_seen = EXCLUDED.last_seen
+    """,
+    'add_sightings': """
+        INSERT INTO sightings (id, tracking_id, class_name, owner_id, timestamp, bbox)
+        SELECT id, tracking_id, class_name, owner_id, timestamp, bbox::jsonb
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamp[], $6::text[])
+            AS rows (id, tracking_id, class_name, owner_id, timestamp, bbox)
+    """
+}
+
+def execute_prepared(cur, name, params, sql=None):
+    """
+    Execute a prepared statement, preparing it on first use by the connection.
+
+    Prepared statements live as long as the session and survive rollbacks.
+
+    Args:
+        cur: Cursor of a ``database.db.PostgreSQLConnection``
+        name: Statement name
+        params: Parameter values
+        sql: Statement, defaults to STATEMENTS[name]
+    """
+    prepared = cur.connection.prepared
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql or STATEMENTS[name]}")
+        prepared.add(name)
+
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+class PostgreSQLBackend(SQLBackend):
+    """Operations on PostgreSQL tables."""
+
+    def __init__(self):
+        self.encodings_checked = False
+
+    def require_packed_encodings(self, db):
+        """Fail with a clear error while the database still stores JSON encodings."""
+        if self.encodings_checked:
+            return
+
+        if not encodings_packed(db):
+            raise RuntimeError(f"Face encodings are stored in the old JSON format; {ENCODINGS_MIGRATION_HINT}")
+        self.encodings_checked = True
+
+    def add_face(self, db, face):
+        self.require_packed_encodings(db)
+        return super().add_face(db, face)
+
+    def add_faces_bulk(self, db, faces):
+        self.require_packed_encodings(db)
+        super().add_faces_bulk(db, faces)
+
+    def json(self, value):
+        return Json(value)
+
+    def execute_values(self, cur, sql, rows):
+        execute_values(cur, sql, rows, page_size=PAGE_SIZE)
+
+    def get_face(self, db, face_id):
+        with db.cursor() as cur:
+            execute_prepared(cur, 'get_face', (face_id,))
+            return with_id(cur.fetchone())
+
+    def update_object(self, db, tracking_id, update_data):
+        columns, _, values = self.set_clause(update_data)
+
+        # One statement per combination of whitelisted columns
+        name = f"update_object_{'_'.join(columns)}"
+        assignments = ", ".join(f"{column} = ${position}" for position, column in enumerate(columns, 1))
+        sql = f"UPDATE objects SET {assignments} WHERE tracking_id = ${len(columns) + 1}"
+
+        with db.cursor() as cur:
+            execute_prepared(cur, name, values + [tracking_id], sql)
+            success = cur.rowcount > 0
+        db.commit()
+        return success
+
+    def get_object(self, db, tracking_id):
+        with db.cursor() as cur:
+            execute_prepared(cur, 'get_object', (tracking_id,))
+            return with_id(cur.fetchone())
+
+    def add_association(self, db, association_data):
+        with db.cursor() as cur:
+            execute_prepared(cur, 'add_association', (
+                association_data['person_id'],
+                association_data['object_id'],
+                association_data['distance'],
+                association_data['timestamp']
+            ))
+            association_id = cur.fetchone()['id']
+        db.commit()
+        return association_id
+
+    def upsert_objects_bulk(self, db, objects, now):
+        rows = last_per_key(objects, lambda object_data: object_data['tracking_id'])
+        with db.cursor() as cur:
+            execute_prepared(cur, 'upsert_objects', (
+                [object_data.get('_id', str(uuid.uuid4())) for object_data in rows],
+                [object_data['tracking_id'] for object_data in rows],
+                [object_data['class_name'] for object_data in rows],
+                [object_data.get('owner_id') for object_data in rows],
+                [object_data.get('first_seen', now) for object_data in rows],
+                [object_data.get('last_seen', now) for object_data in rows],
+                [json.dumps(object_data.get('metadata', {})) for object_data in rows]
+            ))
+        db.commit()
+
+    def add_sightings_bulk(self, db, sightings):
+        ensure_sighting_partitions(db, {sighting['timestamp'].date() for sighting in sightings})
+
+        with db.cursor() as cur:
+            execute_prepared(cur, 'add_sightings', (
+                [sighting['_id'] for sighting in sightings],
+                [sighting['tracking_id'] for sighting in sightings],
+                [sighting['class_name'] for sighting in sightings],
+                [sighting['owner_id'] for sighting in sightings],
+                [sighting['timestamp'] for sighting in sightings],
+                [json.dumps(sighting['bbox']) for sighting in sightings]
+            ))
+        db.commit()
+
+    def prune_sightings(self, db, cutoff):
+        # Keep the partition holding the cutoff
+        return drop_sighting_partitions(db, cutoff.date())
@@ -0,0 +1,383 @@
+"""
+SQL shared by the PostgreSQL and SQLite backends.
+
+Statements use psycopg2-style ``%s`` placeholders; SQLite connections
+translate them (see ``database.sqlite``).
+"""
+import uuid
+
+from database.backends.base import Backend, UPDATABLE_OBJECT_FIELDS
+
+FACE_COLUMNS = "id, encoding, image_hash, timestamp, metadata"
+OBJECT_COLUMNS = "id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata"
+
+def last_per_key(rows, key):
+    """
+    Keep the last row for each key, in first-seen key order.
+
+    An INSERT ... ON CONFLICT DO UPDATE must not touch the same row twice.
+    """
+    latest = {}
+    for row in rows:
+        latest[key(row)] = row
+    return list(latest.values())
+
+def with_id(row):
+    """Add the MongoDB-like '_id' key to a row."""
+    if row is not None:
+        row['_id'] = row['id']
+    return row
+
+class SQLBackend(Backend):
+    """Operations on SQL tables."""
+
+    def json(self, value):
+        """Prepare a dictionary for a JSON column."""
+        raise NotImplementedError
+
+    def execute_values(self, cur, sql, rows):
+        """Run a statement with a single ``VALUES %s`` for many rows."""
+        raise NotImplementedError
+
+    def set_clause(self, update_data):
+        """
+        Build the SET clause and values of an object update.
+
+        Only whitelisted column names ever reach the SQL.
+
+        Returns:
+            Tuple of (column names, SET clause, values)
+        """
+        columns = [column for column in UPDATABLE_OBJECT_FIELDS if column in update_data]
+        values = [self.json(update_data[column]) if column == 'metadata' else update_data[column]
+                  for column in columns]
+        return columns, ", ".join(f"{column} = %s" for column in columns), values
+
+    def rollback(self, db):
+        db.rollback()
+
+    def add_face(self, db, face):
+        with db.cursor() as cur:
+            cur.execute("""
+                INSERT INTO faces (id, encoding, image_hash, timestamp, metadata)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING id
+            """, (
+                face['_id'],
+                face['encoding'],
+                face['image_hash'],
+                face['timestamp'],
+                self.json(face.get('metadata', {}))
+            ))
+            face_id = cur.fetchone()['id']
+        db.commit()
+        return face_id
+
+    def get_face(self, db, face_id):
+        with db.cursor() as cur:
+            cur.execute(f"SELECT {FACE_COLUMNS} FROM faces WHERE id = %s", (face_id,))
+            return with_id(cur.fetchone())
+
+    def get_face_image_ref(self, db, face_id):
+        with db.cursor() as cur:
+            cur.execute("""
+                SELECT image_hash, encrypted_image
+                FROM faces
+                WHERE id = %s
+            """, (face_id,))
+            return cur.fetchone()
+
+    def get_all_faces(self, db):
+        with db.cursor() as cur:
+            cur.execute(f"SELECT {FACE_COLUMNS} FROM faces")
+            return [with_id(row) for row in cur.fetchall()]
+
+    def get_face_encodings(self, db, since=None):
+        with db.cursor() as cur:
+            if since is not None:
+                cur.execute("""
+                    SELECT id, encoding, timestamp
+                    FROM faces
+                    WHERE timestamp >= %s
+                    ORDER BY timestamp
+                """, (since,))
+            else:
+                cur.execute("""
+                    SELECT id, encoding, timestamp
+                    FROM faces
+                    ORDER BY timestamp
+                """)
+            return [with_id(row) for row in cur.fetchall()]
+
+    def get_faces_page(self, db, limit, after=None):
+        with db.cursor() as cur:
+            if after is not None:
+                cur.execute("""
+                    SELECT id, timestamp, metadata
+                    FROM faces
+                    WHERE (timestamp, id) > (%s, %s)
+                    ORDER BY timestamp, id
+                    LIMIT %s
+                """, (after[0], after[1], limit))
+            else:
+                cur.execute("""
+                    SELECT id, timestamp, metadata
+                    FROM faces
+                    ORDER BY timestamp, id
+                    LIMIT %s
+                """, (limit,))
+            return [with_id(row) for row in cur.fetchall()]
+
+    def add_object(self, db, object_data):
+        with db.cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO objects ({OBJECT_COLUMNS})
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, (
+                object_data['_id'],
+                object_data['tracking_id'],
+                object_data['class_name'],
+                object_data.get('owner_id'),
+                object_data['first_seen'],
+                object_data['last_seen'],
+                self.json(object_data.get('metadata', {}))
+            ))
+            object_id = cur.fetchone()['id']
+        db.commit()
+        return object_id
+
+    def update_object(self, db, tracking_id, update_data):
+        _, set_clause, values = self.set_clause(update_data)
+        with db.cursor() as cur:
+            cur.execute(f"UPDATE objects SET {set_clause} WHERE tracking_id = %s", values + [tracking_id])
+            success = cur.rowcount > 0
+        db.commit()
+        return success
+
+    def get_object(self, db, tracking_id):
+        with db.cursor() as cur:
+            cur.execute(f"SELECT {OBJECT_COLUMNS} FROM objects WHERE tracking_id = %s", (tracking_id,))
+            return with_id(cur.fetchone())
+
+    def find_objects(self, db, limit, class_name=None, owner_id=None, seen_after=None, seen_before=None, after=None):
+        conditions = []
+        values = []
+
+        if class_name is not None:
+            conditions.append("class_name = %s")
+            values.append(class_name)
+        if owner_id is not None:
+            conditions.append("owner_id = %s")
+            values.append(owner_id)
+        if seen_after is not None:
+            conditions.append("last_seen >= %s")
+            values.append(seen_after)
+        if seen_before is not None:
+            conditions.append("last_seen < %s")
+            values.append(seen_before)
+        if after is not None:
+            conditions.append("(last_seen, id) < (%s, %s)")
+            values.extend(after)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        values.append(limit)
+
+        with db.cursor() as cur:
+            cur.execute(f"""
+                SELECT {OBJECT_COLUMNS}
+                FROM objects
+                {where}
+                ORDER BY last_seen DESC, id DESC
+                LIMIT %s
+            """, values)
+            return [with_id(row) for row in cur.fetchall()]
+
+    def get_person_objects(self, db, person_id):
+        with db.cursor() as cur:
+            cur.execute(f"SELECT {OBJECT_COLUMNS} FROM objects WHERE owner_id = %s", (person_id,))
+            return [with_id(row) for row in cur.fetchall()]
+
+    def add_association(self, db, association_data):
+        with db.cursor() as cur:
+            cur.execute("""
+                INSERT INTO associations (person_id, object_id, distance, timestamp)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (person_id, object_id) DO UPDATE
+                SET distance = EXCLUDED.distance, timestamp = EXCLUDED.timestamp
+                RETURNING id
+            """, (
+                association_data['person_id'],
+                association_data['object_id'],
+                association_data['distance'],
+                association_data['timestamp']
+            ))
+            association_id = cur.fetchone()['id']
+        db.commit()
+        return association_id
+
+    def add_faces_bulk(self, db, faces):
+        with db.cursor() as cur:
+            self.execute_values(cur, """
+                INSERT INTO faces (id, encoding, image_hash, timestamp, metadata)
+                VALUES %s
+            """, [(
+                face['_id'],
+                face['encoding'],
+                face['image_hash'],
+                face['timestamp'],
+                self.json(face.get('metadata', {}))
+            ) for face in faces])
+        db.commit()
+
+    def add_objects_bulk(self, db, objects):
+        with db.cursor() as cur:
+            self.execute_values(cur, f"""
+                INSERT INTO objects ({OBJECT_COLUMNS})
+                VALUES %s
+            """, [(
+                object_data['_id'],
+                object_data['tracking_id'],
+                object_data['class_name'],
+                object_data.get('owner_id'),
+                object_data['first_seen'],
+                object_data['last_seen'],
+                self.json(object_data.get('metadata', {}))
+            ) for object_data in objects])
+        db.commit()
+
+    def upsert_rows(self, objects, now):
+        """Parameter tuples of an object upsert, one per tracking ID."""
+        return [(
+            object_data.get('_id', str(uuid.uuid4())),
+            object_data['tracking_id'],
+            object_data['class_name'],
+            object_data.get('owner_id'),
+            object_data.get('first_seen', now),
+            object_data.get('last_seen', now),
+            self.json(object_data.get('metadata', {}))
+        ) for object_data in last_per_key(objects, lambda object_data: object_data['tracking_id'])]
+
+    def upsert_objects_bulk(self, db, objects, now):
+        with db.cursor() as cur:
+            self.execute_values(cur, f"""
+                INSERT INTO objects ({OBJECT_COLUMNS})
+                VALUES %s
+                ON CONFLICT (tracking_id) DO UPDATE
+                SET class_name = EXCLUDED.class_name,
+                    owner_id = EXCLUDED.owner_id,
+                    last_seen = EXCLUDED.last_seen
+            """, self.upsert_rows(objects, now))
+        db.commit()
+
+    def add_associations_bulk(self, db, associations):
+        rows = last_per_key(associations, lambda a: (a['person_id'], a['object_id']))
+        with db.cursor() as cur:
+            self.execute_values(cur, """
+                INSERT INTO associations (person_id, object_id, distance, timestamp)
+                VALUES %s
+                ON CONFLICT (person_id, object_id) DO UPDATE
+                SET distance = EXCLUDED.distance, timestamp = EXCLUDED.timestamp
+            """, [(
+                association_data['person_id'],
+                association_data['object_id'],
+                association_data['distance'],
+                association_data['timestamp']
+            ) for association_data in rows])
+        db.commit()
+
+    def sighting_rows(self, sightings):
+        """Parameter tuples of a sightings insert."""
+        return [(
+            sighting['_id'],
+            sighting['tracking_id'],
+            sighting['class_name'],
+            sighting['owner_id'],
+            sighting['timestamp'],
+            self.json(sighting['bbox'])
+        ) for sighting in sightings]
+
+    def add_sightings_bulk(self, db, sightings):
+        with db.cursor() as cur:
+            self.execute_values(cur, """
+                INSERT INTO sightings (id, tracking_id, class_name, owner_id, timestamp, bbox)
+                VALUES %s
+            """, self.sighting_rows(sightings))
+        db.commit()
+
+    def find_sightings(self, db, tracking_id, limit, since=None, until=None, after=None):
+        conditions = ["tracking_id = %s"]
+        values = [tracking_id]
+
+        if since is not None:
+            conditions.append("timestamp >= %s")
+            values.append(since)
+        if until is not None:
+            conditions.append("timestamp < %s")
+            values.append(until)
+        if after is not None:
+            conditions.append("(timestamp > %s OR (timestamp = %s AND id > %s))")
+            values.extend([after[0], after[0], after[1]])
+
+        values.append(limit)
+
+        with db.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, tracking_id, class_name, owner_id, timestamp, bbox
+                FROM sightings
+                WHERE {' AND '.join(conditions)}
+                ORDER BY timestamp, id
+                LIMIT %s
+            """, values)
+            return [with_id(row) for row in cur.fetchall()]
+
+    def rollup_sightings(self, db, since, until):
+        with db.cursor() as cur:
+            cur.execute("""
+                SELECT tracking_id, class_name, owner_id, first_seen, last_seen
+                FROM (
+                    SELECT tracking_id, class_name, owner_id,
+                           MIN(timestamp) OVER (PARTITION BY tracking_id) AS first_seen,
+                           timestamp AS last_seen,
+                           ROW_NUMBER() OVER (PARTITION BY tracking_id ORDER BY timestamp DESC) AS position
+                    FROM sightings
+                    WHERE timestamp >= %s AND timestamp < %s
+                ) latest
+                WHERE position = 1
+            """, (since, until))
+            summaries = cur.fetchall()
+
+        # Only the latest sighting decides the owner; the CASEs see the row
+        # as it was before the update
+        with db.cursor() as cur:
+            self.execute_values(cur, f"""
+                INSERT INTO objects ({OBJECT_COLUMNS})
+                VALUES %s
+                ON CONFLICT (tracking_id) DO UPDATE
+                SET class_name = CASE WHEN EXCLUDED.last_seen >= objects.last_seen
+                                      THEN EXCLUDED.class_name ELSE objects.class_name END,
+                    owner_id = CASE WHEN EXCLUDED.last_seen >= objects.last_seen
+                                    THEN EXCLUDED.owner_id ELSE objects.owner_id END,
+                    first_seen = CASE WHEN EXCLUDED.first_seen < objects.first_seen
+                                      THEN EXCLUDED.first_seen ELSE objects.first_seen END,
+                    last_seen = CASE WHEN EXCLUDED.last_seen > objects.last_seen
+                                     THEN EXCLUDED.last_seen ELSE objects.last_seen END
+            """, [(
+                str(uuid.uuid4()),
+                summary['tracking_id'],
+                summary['class_name'],
+                summary['owner_id'],
+                summary['first_seen'],
+                summary['last_seen'],
+                self.json({})
+            ) for summary in summaries])
+        db.commit()
+
+        return len(summaries)
+
+    def prune_sightings(self, db, cutoff):
+        with db.cursor() as cur:
+            cur.execute("DELETE FROM sightings WHERE timestamp < %s", (cutoff,))
+            removed = cur.rowcount
+        db.commit()
+        return removed
@@ -0,0 +1,19 @@
+"""
+SQLite backend.
+
+SQLite compiles each statement once per connection and reuses it from the
+connection's statement cache (see ``database.sqlite``), so the shared SQL
+needs no explicit preparation here.
+"""
+import json
+
+from database.backends.sql import SQLBackend
+
+class SQLiteBackend(SQLBackend):
+    """Operations on SQLite tables."""
+
+    def json(self, value):
+        return json.dumps(value)
+
+    def execute_values(self, cur, sql, rows):
+        cur.execute_values(sql, rows)
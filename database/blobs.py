@@ -0,0 +1,173 @@
+"""
+Content-addressed storage of binary blobs (encrypted face images).
+
+Blobs are addressed by the SHA-256 of their bytes, so database rows only
+hold the hash and identical blobs are stored once. The store is selected by
+``BLOBS['backend']``; the local filesystem store shards blobs into nested
+directories by hash prefix to keep directories small.
+"""
+import os
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+
+from app.config import BLOBS
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def blob_key(data):
+    """
+    Compute the content address of a blob.
+
+    Args:
+        data: Blob bytes
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class BlobStore:
+    """Interface of blob stores."""
+
+    def put(self, data):
+        """
+        Store a blob.
+
+        Args:
+            data: Blob bytes
+
+        Returns:
+            Content address of the blob
+        """
+        raise NotImplementedError
+
+    def open(self, key):
+        """
+        Open a blob for streaming reads.
+
+        Args:
+            key: Content address
+
+        Returns:
+            Binary file object
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        raise NotImplementedError
+
+    def read(self, key):
+        """
+        Read a whole blob.
+
+        Args:
+            key: Content address
+
+        Returns:
+            Blob bytes
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        with self.open(key) as f:
+            return f.read()
+
+    def exists(self, key):
+        """Check whether a blob exists."""
+        raise NotImplementedError
+
+class FileSystemBlobStore(BlobStore):
+    """Blob store in a local directory, sharded by hash prefix."""
+
+    def __init__(self, root, shard_depth=2):
+        """
+        Initialize the store.
+
+        Args:
+            root: Root directory
+            shard_depth: Number of two-character directory levels
+        """
+        self.root = root
+        self.shard_depth = shard_depth
+
+    def path(self, key):
+        """
+        Get the file path of a blob.
+
+        Args:
+            key: Content address
+
+        Returns:
+            File path
+
+        Raises:
+            ValueError: If the key is not a content address
+        """
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid blob key: {key}")
+
+        shards = [key[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, key)
+
+    def put(self, data):
+        key = blob_key(data)
+        path = self.path(key)
+
+        # Same content, same key: nothing to write
+        if os.path.exists(path):
+            return key
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return key
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+BACKENDS = {
+    'filesystem': lambda: FileSystemBlobStore(BLOBS['root'], BLOBS['shard_depth'])
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_blob_store():
+    """
+    Get the configured blob store.
+
+    Returns:
+        BlobStore
+    """
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = BLOBS['backend']
+                if backend not in BACKENDS:
+                    raise ValueError(f"Unsupported blob store backend: {backend}")
+                _store = BACKENDS[backend]()
+
+    return _store
@@ -1,141 +1,611 @@
 """
 Database connection setup.
+
+Connections are process-wide: MongoDB uses one shared client, PostgreSQL and
+SQLite a connection pool from which each thread checks out a connection and
+returns it with ``release_database`` (the API does this at the end of every
+request). The schema is set up once per process. After a fork the child
+opens its own connections instead of reusing the parent's.
+
+Only the driver of the configured database has to be installed.
 """
+import os
+import re
+import time
 import logging
-import pymongo
-from pymongo import MongoClient
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import threading
+from datetime import date, datetime, timedelta
+
+try:
+    from pymongo import MongoClient
+except ImportError:
+    MongoClient = None
 
-from app.config import DATABASE
+try:
+    import psycopg2
+    from psycopg2 import errors, extensions, pool
+    from psycopg2.extras import RealDictCursor
+except ImportError:
+    psycopg2 = None
+
+from app.config import DATABASE, SIGHTINGS
+from database import sqlite
 
 logger = logging.getLogger(__name__)
 
-def get_database():
+if psycopg2 is not None:
+    class PostgreSQLConnection(extensions.connection):
+        """PostgreSQL connection that remembers the statements prepared in its session."""
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared = set()
+
+def setup_mongodb_schema(db):
     """
-    Get database connection based on configuration.
+    Create MongoDB collections and indexes.
     
-    Returns:
-        Database connection object
+    Args:
+        db: MongoDB database object
     """
-    db_type = DATABASE['type']
+    # Create collections if they don't exist
+    collections = DATABASE['collections']
+    existing = db.list_collection_names()
+    for key, collection_name in collections.items():
+        if key != 'sightings' and collection_name not in existing:
+            db.create_collection(collection_name)
     
-    if db_type == 'mongodb':
-        return get_mongodb_connection()
-    elif db_type == 'postgresql':
-        return get_postgresql_connection()
-    else:
-        raise ValueError(f"Unsupported database type: {db_type}")
+    # Sightings are a time-series collection: stored in time buckets and
+    # expired by the server once older than the retention period
+    if collections['sightings'] not in existing:
+        db.create_collection(
+            collections['sightings'],
+            timeseries={'timeField': 'timestamp', 'metaField': 'tracking_id', 'granularity': 'seconds'},
+            expireAfterSeconds=SIGHTINGS['retention_days'] * 86400
+        )
+    
+    # Create indexes
+    db[collections['faces']].create_index("timestamp")
+    db[collections['faces']].create_index([("timestamp", 1), ("_id", 1)])
+    db[collections['objects']].create_index("owner_id")
+    db[collections['objects']].create_index("tracking_id")
+    db[collections['objects']].create_index([("last_seen", -1), ("_id", -1)])
+    db[collections['objects']].create_index([("class_name", 1), ("last_seen", -1), ("_id", -1)])
+    db[collections['objects']].create_index([("owner_id", 1), ("last_seen", -1), ("_id", -1)])
+    db[collections['associations']].create_index([("person_id", 1), ("object_id", 1)])
+    db[collections['sightings']].create_index([("tracking_id", 1), ("timestamp", 1)])
+    
+    logger.info("Set up MongoDB collections and indexes")
 
-def get_mongodb_connection():
+def setup_postgresql_schema(conn):
     """
-    Get MongoDB connection.
+    Create PostgreSQL tables and indexes.
     
-    Returns:
-        MongoDB database object
+    Args:
+        conn: PostgreSQL connection object
     """
-    try:
-        # Connect to MongoDB
-        client = MongoClient(DATABASE['connection_string'])
-        db = client[DATABASE['database_name']]
+    # Create tables if they don't exist
+    with conn.cursor() as cur:
+        # Faces table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS faces (
+                id VARCHAR(36) PRIMARY KEY,
+                encoding BYTEA,
+                encrypted_image TEXT,
+                image_hash VARCHAR(64),
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                metadata JSONB
+            )
+        """)
+        
+        # Added after the first release; images moved to the blob store
+        cur.execute("ALTER TABLE faces ADD COLUMN IF NOT EXISTS image_hash VARCHAR(64)")
         
-        # Create collections if they don't exist
-        collections = DATABASE['collections']
-        for collection_name in collections.values():
-            if collection_name not in db.list_collection_names():
-                db.create_collection(collection_name)
+        # Objects table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                id VARCHAR(36) PRIMARY KEY,
+                tracking_id VARCHAR(36) UNIQUE,
+                class_name VARCHAR(50),
+                owner_id VARCHAR(36) REFERENCES faces(id),
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                metadata JSONB
+            )
+        """)
+        
+        # Associations table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS associations (
+                id SERIAL PRIMARY KEY,
+                person_id VARCHAR(36) REFERENCES faces(id),
+                object_id VARCHAR(36) REFERENCES objects(id),
+                distance FLOAT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(person_id, object_id)
+            )
+        """)
         
         # Create indexes
-        db[collections['faces']].create_index("timestamp")
-        db[collections['objects']].create_index("owner_id")
-        db[collections['objects']].create_index("tracking_id")
-        db[collections['associations']].create_index([("person_id", 1), ("object_id", 1)])
-        
-        logger.info(f"Connected to MongoDB: {DATABASE['database_name']}")
-        return db
-    except Exception as e:
-        logger.error(f"Error connecting to MongoDB: {e}")
-        raise
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_faces_timestamp ON faces(timestamp)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_faces_timestamp_id ON faces(timestamp, id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_owner ON objects(owner_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_tracking ON objects(tracking_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_last_seen ON objects(last_seen DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_class_last_seen ON objects(class_name, last_seen DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_owner_last_seen ON objects(owner_id, last_seen DESC, id DESC)")
+        
+        # Sightings table: append-only, one partition per day so that
+        # time-range queries only scan the days they cover and expired days
+        # are dropped as a whole
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sightings (
+                id VARCHAR(36),
+                tracking_id VARCHAR(36) NOT NULL,
+                class_name VARCHAR(50),
+                owner_id VARCHAR(36),
+                timestamp TIMESTAMP NOT NULL,
+                bbox JSONB
+            ) PARTITION BY RANGE (timestamp)
+        """)
+        
+        # Sightings logged before they had IDs keep a NULL one
+        cur.execute("ALTER TABLE sightings ADD COLUMN IF NOT EXISTS id VARCHAR(36)")
+        cur.execute("DROP INDEX IF EXISTS idx_sightings_tracking_timestamp")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sightings_tracking_timestamp_id ON sightings(tracking_id, timestamp, id)")
+        
+        # Rows arrive in time order, so a tiny BRIN index covers range scans
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sightings_timestamp ON sightings USING BRIN (timestamp)")
+        
+        conn.commit()
+    
+    today = date.today()
+    ensure_sighting_partitions(conn, [today, today + timedelta(days=1)])
+    
+    if not encodings_packed(conn):
+        logger.error(f"Face encodings are stored in the old JSON format; {ENCODINGS_MIGRATION_HINT}")
+    
+    logger.info("Set up PostgreSQL tables and indexes")
+
+ENCODINGS_MIGRATION_HINT = "run `python -m database.migrations encodings` before enrolling faces"
+
+def encodings_packed(conn):
+    """
+    Check whether the PostgreSQL faces table stores packed encodings.
+    
+    Databases created before encodings were packed keep a JSONB column
+    until the encodings migration converts it.
+    
+    Args:
+        conn: PostgreSQL connection object
+        
+    Returns:
+        True if the encoding column is BYTEA (or does not exist yet)
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'faces' AND column_name = 'encoding'
+        """)
+        column = cur.fetchone()
+    
+    return column is None or column['data_type'] == 'bytea'
+
+SIGHTING_PARTITION_PATTERN = re.compile(r'^sightings_(\d{8})$')
+
+# Days whose sightings partition is known to exist
+_sighting_partitions = set()
 
-def get_postgresql_connection():
+def sighting_partition(day):
     """
-    Get PostgreSQL connection.
+    Get the name of the PostgreSQL sightings partition of a day.
     
+    Args:
+        day: Date
+        
     Returns:
-        PostgreSQL connection object
+        Table name
     """
-    try:
-        # Parse connection string
-        conn_parts = DATABASE['connection_string'].split('/')
-        db_name = DATABASE['database_name']
-        
-        # Connect to PostgreSQL
-        conn = psycopg2.connect(
-            DATABASE['connection_string'],
-            cursor_factory=RealDictCursor
-        )
+    return f"sightings_{day:%Y%m%d}"
+
+def ensure_sighting_partitions(conn, days):
+    """
+    Create missing daily partitions of the PostgreSQL sightings table.
+    
+    Args:
+        conn: PostgreSQL connection object
+        days: Dates that need a partition
+    """
+    for day in sorted(set(days) - _sighting_partitions):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {sighting_partition(day)}
+                    PARTITION OF sightings
+                    FOR VALUES FROM (%s) TO (%s)
+                """, (day, day + timedelta(days=1)))
+            conn.commit()
+        except (errors.DuplicateTable, errors.UniqueViolation):
+            # Another process created it at the same time
+            conn.rollback()
         
-        # Create tables if they don't exist
+        _sighting_partitions.add(day)
+
+def drop_sighting_partitions(conn, before):
+    """
+    Drop the PostgreSQL sightings partitions of days before a date.
+    
+    Args:
+        conn: PostgreSQL connection object
+        before: First day to keep
+        
+    Returns:
+        Number of dropped partitions
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT child.relname AS name
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            WHERE parent.relname = 'sightings'
+        """)
+        partitions = [row['name'] for row in cur.fetchall()]
+    
+    dropped = 0
+    try:
         with conn.cursor() as cur:
-            # Faces table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS faces (
-                    id VARCHAR(36) PRIMARY KEY,
-                    encoding JSONB,
-                    encrypted_image TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    metadata JSONB
-                )
-            """)
+            for name in partitions:
+                match = SIGHTING_PARTITION_PATTERN.match(name)
+                if not match:
+                    continue
+                
+                day = datetime.strptime(match.group(1), '%Y%m%d').date()
+                if day < before:
+                    cur.execute(f"DROP TABLE IF EXISTS {name}")
+                    _sighting_partitions.discard(day)
+                    dropped += 1
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return dropped
+
+class ConnectionManager:
+    """Process-wide database connections."""
+    
+    def __init__(self):
+        """Initialize the manager without connecting."""
+        self.lock = threading.Lock()
+        self.pid = None
+        self.schema_ready = False
+        
+        self.mongo_client = None
+        self.mongo_db = None
+        
+        self.pg_pool = None
+        self.pg_slots = None
+        self.last_used = {}
+        self.local = threading.local()
+        
+        self.sqlite_idle = []
+        
+        # Connections inherited from the parent process. They are kept alive
+        # because closing them (or letting them be garbage collected) would
+        # end the parent's sessions on the shared sockets.
+        self.abandoned = []
+    
+    def _check_fork(self):
+        """Drop connections inherited through a fork."""
+        if self.pid == os.getpid():
+            return
+        
+        with self.lock:
+            if self.pid == os.getpid():
+                return
             
-            # Objects table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS objects (
-                    id VARCHAR(36) PRIMARY KEY,
-                    tracking_id VARCHAR(36) UNIQUE,
-                    class_name VARCHAR(50),
-                    owner_id VARCHAR(36) REFERENCES faces(id),
-                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    metadata JSONB
-                )
-            """)
+            if self.pid is not None:
+                # Closing an inherited SQLite connection would also drop the
+                # parent's file locks
+                self.abandoned.append((self.mongo_client, self.pg_pool, self.sqlite_idle))
+                logger.info(f"Process {os.getpid()} forked, opening new database connections")
             
-            # Associations table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS associations (
-                    id SERIAL PRIMARY KEY,
-                    person_id VARCHAR(36) REFERENCES faces(id),
-                    object_id VARCHAR(36) REFERENCES objects(id),
-                    distance FLOAT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(person_id, object_id)
-                )
-            """)
+            self.mongo_client = None
+            self.mongo_db = None
+            self.pg_pool = None
+            self.pg_slots = None
+            self.last_used = {}
+            self.local = threading.local()
+            self.sqlite_idle = []
+            self.pid = os.getpid()
+    
+    def mongodb(self):
+        """
+        Get the shared MongoDB database.
+        
+        Returns:
+            MongoDB database object
+        """
+        self._check_fork()
+        
+        if self.mongo_db is None:
+            with self.lock:
+                if self.mongo_db is None:
+                    self.mongo_db = self._connect_mongodb()
+        
+        return self.mongo_db
+    
+    def _connect_mongodb(self):
+        """Create the MongoDB client and set up the schema once."""
+        if MongoClient is None:
+            raise ImportError("pymongo is required for DB_TYPE=mongodb")
+        
+        try:
+            # The client is thread-safe and pools its own sockets
+            self.mongo_client = MongoClient(
+                DATABASE['connection_string'],
+                maxPoolSize=DATABASE['pool_max']
+            )
+            db = self.mongo_client[DATABASE['database_name']]
             
-            # Create indexes
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_faces_timestamp ON faces(timestamp)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_owner ON objects(owner_id)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_tracking ON objects(tracking_id)")
+            if not self.schema_ready:
+                setup_mongodb_schema(db)
+                self.schema_ready = True
             
-            conn.commit()
+            logger.info(f"Connected to MongoDB: {DATABASE['database_name']}")
+            return db
+        except Exception as e:
+            logger.error(f"Error connecting to MongoDB: {e}")
+            raise
+    
+    def _postgresql_pool(self):
+        """Get the PostgreSQL pool, creating it and the schema on first use."""
+        self._check_fork()
+        
+        if psycopg2 is None:
+            raise ImportError("psycopg2 is required for DB_TYPE=postgresql")
+        
+        if self.pg_pool is None:
+            with self.lock:
+                if self.pg_pool is None:
+                    try:
+                        connection_pool = pool.ThreadedConnectionPool(
+                            DATABASE['pool_min'],
+                            DATABASE['pool_max'],
+                            DATABASE['connection_string'],
+                            connection_factory=PostgreSQLConnection,
+                            cursor_factory=RealDictCursor
+                        )
+                        
+                        if not self.schema_ready:
+                            conn = connection_pool.getconn()
+                            try:
+                                setup_postgresql_schema(conn)
+                            finally:
+                                connection_pool.putconn(conn)
+                            self.schema_ready = True
+                        
+                        self.pg_slots = threading.BoundedSemaphore(DATABASE['pool_max'])
+                        self.pg_pool = connection_pool
+                        logger.info(f"Connected to PostgreSQL: {DATABASE['database_name']}")
+                    except Exception as e:
+                        logger.error(f"Error connecting to PostgreSQL: {e}")
+                        raise
+        
+        return self.pg_pool
+    
+    def _is_healthy(self, conn):
+        """Check a pooled connection before handing it out."""
+        if conn.closed:
+            return False
+        
+        # Only connections that sat idle for a while get a round trip
+        idle = time.monotonic() - self.last_used.get(id(conn), 0)
+        if idle < DATABASE['health_check_interval']:
+            return True
+        
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding broken PostgreSQL connection: {e}")
+            return False
+    
+    def checkout_postgresql(self):
+        """
+        Check out the calling thread's PostgreSQL connection.
         
-        logger.info(f"Connected to PostgreSQL: {db_name}")
+        Repeated calls from the same thread return the same connection until
+        it is released.
+        
+        Returns:
+            PostgreSQL connection object
+        """
+        connection_pool = self._postgresql_pool()
+        
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and not conn.closed:
+            return conn
+        
+        if not self.pg_slots.acquire(timeout=DATABASE['pool_timeout']):
+            raise pool.PoolError(f"No database connection available within {DATABASE['pool_timeout']}s")
+        
+        try:
+            while True:
+                conn = connection_pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                self.last_used.pop(id(conn), None)
+                connection_pool.putconn(conn, close=True)
+        except Exception:
+            self.pg_slots.release()
+            raise
+        
+        self.local.conn = conn
         return conn
-    except Exception as e:
-        logger.error(f"Error connecting to PostgreSQL: {e}")
-        raise
+    
+    def checkout_sqlite(self):
+        """
+        Check out the calling thread's SQLite connection.
+        
+        Repeated calls from the same thread return the same connection until
+        it is released. Idle connections are reused so their compiled
+        statements are too.
+        
+        Returns:
+            SQLiteConnection
+        """
+        self._check_fork()
+        
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and not conn.closed:
+            return conn
+        
+        with self.lock:
+            conn = self.sqlite_idle.pop() if self.sqlite_idle else None
+        
+        if conn is None:
+            try:
+                conn = sqlite.connect()
+                
+                if not self.schema_ready:
+                    with self.lock:
+                        if not self.schema_ready:
+                            sqlite.setup_sqlite_schema(conn)
+                            self.schema_ready = True
+                    logger.info(f"Connected to SQLite: {DATABASE['sqlite_path']}")
+            except Exception as e:
+                logger.error(f"Error connecting to SQLite: {e}")
+                raise
+        
+        self.local.conn = conn
+        return conn
+    
+    def release(self):
+        """Return the calling thread's PostgreSQL or SQLite connection to the pool."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return
+        
+        self.local.conn = None
+        
+        # Connections from before a fork belong to the parent
+        if self.pid != os.getpid():
+            return
+        
+        if isinstance(conn, sqlite.SQLiteConnection):
+            self._release_sqlite(conn)
+            return
+        
+        if self.pg_pool is None:
+            return
+        
+        broken = conn.closed
+        if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            # Do not hand out a connection with a half-finished transaction
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        
+        if broken:
+            self.last_used.pop(id(conn), None)
+        else:
+            self.last_used[id(conn)] = time.monotonic()
+        
+        self.pg_pool.putconn(conn, close=broken)
+        self.pg_slots.release()
+    
+    def _release_sqlite(self, conn):
+        """Put a SQLite connection back on the idle list, or close it if the list is full."""
+        if conn.closed:
+            return
+        
+        try:
+            # Do not hold the write lock for the next user
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding broken SQLite connection: {e}")
+            conn.close()
+            return
+        
+        with self.lock:
+            if len(self.sqlite_idle) < DATABASE['pool_max']:
+                self.sqlite_idle.append(conn)
+                return
+        
+        conn.close()
+    
+    def close(self):
+        """Close all connections of this process."""
+        self._check_fork()
+        
+        with self.lock:
+            if self.mongo_client is not None:
+                self.mongo_client.close()
+                self.mongo_client = None
+                self.mongo_db = None
+            
+            if self.pg_pool is not None:
+                self.pg_pool.closeall()
+                self.pg_pool = None
+                self.pg_slots = None
+                self.last_used = {}
+                self.local = threading.local()
+            
+            if self.sqlite_idle:
+                for conn in self.sqlite_idle:
+                    conn.close()
+                self.sqlite_idle = []
+                self.local = threading.local()
+
+# Connections of this process
+connections = ConnectionManager()
+
+def get_database():
+    """
+    Get database connection based on configuration.
+    
+    For PostgreSQL and SQLite the connection is checked out of the pool for
+    the calling thread; call ``release_database`` when done with it.
+    
+    Returns:
+        Database connection object
+    """
+    db_type = DATABASE['type']
+    
+    if db_type == 'mongodb':
+        return connections.mongodb()
+    elif db_type == 'postgresql':
+        return connections.checkout_postgresql()
+    elif db_type == 'sqlite':
+        return connections.checkout_sqlite()
+    else:
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+def release_database(exception=None):
+    """
+    Return the calling thread's connection to the pool.
+    
+    Args:
+        exception: Unused, lets this be registered as a Flask teardown handler
+    """
+    if DATABASE['type'] in ('postgresql', 'sqlite'):
+        connections.release()
 
 def close_connection(db):
     """
-    Close database connection.
+    Return a database connection obtained from ``get_database``.
     
     Args:
         db: Database connection object
     """
-    if DATABASE['type'] == 'mongodb':
-        # MongoDB connections are managed by the client
-        pass
-    elif DATABASE['type'] == 'postgresql':
-        db.close()
-        logger.info("Closed PostgreSQL connection")
\ No newline at end of file
+    release_database()
+
+def close_all_connections():
+    """Close all connections of this process."""
+    connections.close()
@@ -0,0 +1,53 @@
+"""
+Compact storage format of face encodings.
+
+Encodings are stored as a one-byte format version followed by the packed
+little-endian float32 values (BSON binary on MongoDB, bytea on PostgreSQL).
+Rows written before this format hold a JSON list of floats; they are still
+read, and ``python -m database.migrations encodings`` converts them.
+"""
+import numpy as np
+
+# Format version 1: little-endian float32 values
+ENCODING_VERSION = 1
+DTYPE = np.dtype('<f4')
+
+def pack_encoding(encoding):
+    """
+    Pack a face encoding for storage.
+    
+    Args:
+        encoding: Face encoding (list or array of floats)
+        
+    Returns:
+        Packed bytes
+    """
+    values = np.asarray(encoding, dtype=DTYPE)
+    return bytes([ENCODING_VERSION]) + values.tobytes()
+
+def unpack_encoding(value):
+    """
+    Read a stored face encoding.
+    
+    Packed encodings are returned as a read-only view of the stored bytes,
+    without copying or parsing.
+    
+    Args:
+        value: Packed bytes, or a legacy list of floats
+        
+    Returns:
+        float32 array, or None if there is no encoding
+        
+    Raises:
+        ValueError: If the packed format version is unknown
+    """
+    if value is None:
+        return None
+    
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value, dtype=np.float32)
+    
+    if value[0] != ENCODING_VERSION:
+        raise ValueError(f"Unknown face encoding format version {value[0]}")
+    
+    return np.frombuffer(value, dtype=DTYPE, offset=1)
@@ -0,0 +1,221 @@
+"""
+Data migrations for existing databases.
+
+Usage:
+    python -m database.migrations encodings
+    python -m database.migrations images
+"""
+import sys
+import base64
+import argparse
+import logging
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    psycopg2 = execute_values = None
+
+try:
+    from pymongo import UpdateOne
+except ImportError:
+    UpdateOne = None
+
+from app import create_app
+from app.config import DATABASE
+from database.db import get_database, release_database, encodings_packed
+from database.encoding import pack_encoding
+from database.blobs import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+def migrate_encodings(db, batch_size=1000):
+    """
+    Convert face encodings stored as JSON lists to the packed format.
+
+    Safe to run again; already converted rows are left alone.
+
+    Args:
+        db: Database connection
+        batch_size: Number of faces converted per write
+
+    Returns:
+        Number of faces converted
+    """
+    if DATABASE['type'] == 'mongodb':
+        # MongoDB
+        collection = db[DATABASE['collections']['faces']]
+        cursor = collection.find({'encoding': {'$type': 'array'}}, {'encoding': 1})
+
+        converted = 0
+        batch = []
+        for face in cursor:
+            batch.append(UpdateOne({'_id': face['_id']}, {'$set': {'encoding': pack_encoding(face['encoding'])}}))
+            if len(batch) == batch_size:
+                collection.bulk_write(batch, ordered=False)
+                converted += len(batch)
+                batch = []
+
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            converted += len(batch)
+
+        logger.info(f"Converted {converted} face encodings")
+        return converted
+
+    if DATABASE['type'] == 'sqlite':
+        # SQLite databases were created after encodings were packed
+        logger.info("Face encodings are already packed")
+        return 0
+
+    # PostgreSQL: fill a new bytea column, then swap it in
+    if encodings_packed(db):
+        logger.info("Face encodings are already packed")
+        return 0
+
+    try:
+        with db.cursor() as cur:
+            cur.execute("ALTER TABLE faces ADD COLUMN IF NOT EXISTS encoding_packed BYTEA")
+
+        converted = 0
+        with db.cursor(name='legacy_encodings') as reader:
+            reader.itersize = batch_size
+            reader.execute("SELECT id, encoding FROM faces WHERE encoding IS NOT NULL")
+
+            while True:
+                rows = reader.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                with db.cursor() as cur:
+                    execute_values(cur, """
+                        UPDATE faces SET encoding_packed = packed.encoding
+                        FROM (VALUES %s) AS packed (id, encoding)
+                        WHERE faces.id = packed.id
+                    """, [(row['id'], psycopg2.Binary(pack_encoding(row['encoding']))) for row in rows])
+                converted += len(rows)
+
+        with db.cursor() as cur:
+            cur.execute("ALTER TABLE faces DROP COLUMN encoding")
+            cur.execute("ALTER TABLE faces RENAME COLUMN encoding_packed TO encoding")
+
+        # All or nothing
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"Converted {converted} face encodings")
+    return converted
+
+def migrate_images(db, batch_size=1000):
+    """
+    Move encrypted face images stored in face rows into the blob store.
+
+    Each batch is committed on its own, so an interrupted run can simply be
+    started again.
+
+    Args:
+        db: Database connection
+        batch_size: Number of faces moved per write
+
+    Returns:
+        Number of faces moved
+    """
+    store = get_blob_store()
+    moved = 0
+
+    if DATABASE['type'] == 'mongodb':
+        # MongoDB
+        collection = db[DATABASE['collections']['faces']]
+        cursor = collection.find({'encrypted_image': {'$ne': None}}, {'encrypted_image': 1})
+
+        batch = []
+        for face in cursor:
+            image_hash = store.put(base64.b64decode(face['encrypted_image']))
+            batch.append(UpdateOne(
+                {'_id': face['_id']},
+                {'$set': {'image_hash': image_hash}, '$unset': {'encrypted_image': ''}}
+            ))
+            if len(batch) == batch_size:
+                collection.bulk_write(batch, ordered=False)
+                moved += len(batch)
+                batch = []
+
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            moved += len(batch)
+
+        logger.info(f"Moved {moved} face images to the blob store")
+        return moved
+
+    if DATABASE['type'] == 'sqlite':
+        # SQLite databases were created after images moved to the blob store
+        logger.info("Face images are already in the blob store")
+        return 0
+
+    # PostgreSQL: batches by primary key, so no cursor has to outlive a commit
+    last_id = ''
+    while True:
+        with db.cursor() as cur:
+            cur.execute("""
+                SELECT id, encrypted_image FROM faces
+                WHERE encrypted_image IS NOT NULL AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, batch_size))
+            rows = cur.fetchall()
+
+        if not rows:
+            break
+
+        try:
+            with db.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE faces SET image_hash = moved.image_hash, encrypted_image = NULL
+                    FROM (VALUES %s) AS moved (id, image_hash)
+                    WHERE faces.id = moved.id
+                """, [(row['id'], store.put(base64.b64decode(row['encrypted_image']))) for row in rows])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        moved += len(rows)
+        last_id = rows[-1]['id']
+
+    logger.info(f"Moved {moved} face images to the blob store")
+    return moved
+
+MIGRATIONS = {
+    'encodings': migrate_encodings,
+    'images': migrate_images
+}
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Migrate data of an existing database')
+
+    parser.add_argument('migration', choices=sorted(MIGRATIONS),
+                        help='Migration to run')
+
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Number of rows converted per write')
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function."""
+    create_app()
+    args = parse_args(argv)
+
+    db = get_database()
+    try:
+        count = MIGRATIONS[args.migration](db, args.batch_size)
+    finally:
+        release_database()
+
+    print(f"Migrated {count} rows")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -10,24 +10,27 @@ class Face:
     def __init__(self, 
                  id: str,
                  encoding: List[float],
-                 encrypted_image: str,
+                 encrypted_image: Optional[str] = None,
                  timestamp: Optional[datetime] = None,
-                 metadata: Optional[Dict[str, Any]] = None):
+                 metadata: Optional[Dict[str, Any]] = None,
+                 image_hash: Optional[str] = None):
         """
         Initialize a Face object.
         
         Args:
             id: Unique identifier
             encoding: Face encoding vector
-            encrypted_image: Encrypted face image data
+            encrypted_image: Encrypted face image data (legacy rows only)
             timestamp: Time when the face was detected
             metadata: Additional metadata
+            image_hash: Blob store address of the encrypted face image
         """
         self.id = id
         self.encoding = encoding
         self.encrypted_image = encrypted_image
         self.timestamp = timestamp or datetime.now()
         self.metadata = metadata or {}
+        self.image_hash = image_hash
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for database storage."""
@@ -36,7 +39,8 @@ class Face:
             'encoding': self.encoding,
             'encrypted_image': self.encrypted_image,
             'timestamp': self.timestamp,
-            'metadata': self.metadata
+            'metadata': self.metadata,
+            'image_hash': self.image_hash
         }
     
     @classmethod
@@ -47,7 +51,8 @@ class Face:
             encoding=data.get('encoding'),
             encrypted_image=data.get('encrypted_image'),
             timestamp=data.get('timestamp'),
-            metadata=data.get('metadata', {})
+            metadata=data.get('metadata', {}),
+            image_hash=data.get('image_hash')
         )
 
 
@@ -1,16 +1,39 @@
 """
 Database operations for faces and objects.
+
+The operations fill in defaults, pack encodings and handle errors the same
+way for every database; the database work itself is done by the backend of
+the configured database (see ``database.backends``).
 """
+import base64
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import uuid
 
-from app.config import DATABASE
+from database.backends import get_backend, UPDATABLE_OBJECT_FIELDS
+from database.encoding import pack_encoding, unpack_encoding
+from database.blobs import get_blob_store
 from database.models import Face, Object, Association
 
 logger = logging.getLogger(__name__)
 
+def _store_face_image(face_data):
+    """
+    Move a face's encrypted image into the blob store.
+    
+    Args:
+        face_data: Face data dictionary with 'encrypted_image' (base64) or 'image_hash'
+        
+    Returns:
+        Content hash of the stored image
+    """
+    if face_data.get('image_hash'):
+        return face_data['image_hash']
+    
+    # Store the Fernet token itself, not another base64 layer around it
+    return get_blob_store().put(base64.b64decode(face_data['encrypted_image']))
+
 def add_face(db, face_data):
     """
     Add a face to the database.
@@ -28,37 +51,20 @@ def add_face(db, face_data):
             face_data['_id'] = str(uuid.uuid4())
         
         # Ensure timestamp is present
-        if 'timestamp' not in face_data:
+        if face_data.get('timestamp') is None:
             face_data['timestamp'] = datetime.now()
         
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['faces']]
-            result = collection.insert_one(face_data)
-            face_id = face_data['_id']
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO faces (id, encoding, encrypted_image, timestamp, metadata)
-                    VALUES (%s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    face_data['_id'],
-                    face_data['encoding'],
-                    face_data['encrypted_image'],
-                    face_data['timestamp'],
-                    face_data.get('metadata', {})
-                ))
-                face_id = cur.fetchone()['id']
-                db.commit()
+        # The row only references the image by its content hash
+        face_data['image_hash'] = _store_face_image(face_data)
+        
+        # Store the encoding packed rather than as a list of floats
+        face_id = get_backend().add_face(db, dict(face_data, encoding=pack_encoding(face_data['encoding'])))
         
         logger.info(f"Added face {face_id} to database")
         return face_id
     except Exception as e:
         logger.error(f"Error adding face to database: {e}")
-        if DATABASE['type'] == 'postgresql':
-            db.rollback()
+        get_backend().rollback(db)
         raise
 
 def get_face(db, face_id):
@@ -73,30 +79,43 @@ def get_face(db, face_id):
         Face data dictionary or None if not found
     """
     try:
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['faces']]
-            return collection.find_one({"_id": face_id})
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    SELECT id, encoding, encrypted_image, timestamp, metadata
-                    FROM faces
-                    WHERE id = %s
-                """, (face_id,))
-                result = cur.fetchone()
-                
-                if result:
-                    # Convert to MongoDB-like format
-                    result['_id'] = result['id']
-                    return result
-                
-                return None
+        result = get_backend().get_face(db, face_id)
+        
+        if result:
+            result['encoding'] = unpack_encoding(result.get('encoding'))
+        
+        return result
     except Exception as e:
         logger.error(f"Error getting face {face_id}: {e}")
         return None
 
+def get_face_image_ref(db, face_id):
+    """
+    Get the reference to a face's encrypted image.
+    
+    Args:
+        db: Database connection
+        face_id: Face ID
+        
+    Returns:
+        Dictionary with 'image_hash' (blob store content hash) or, for rows
+        not yet migrated to the blob store, 'encrypted_image' (base64);
+        None if the face does not exist
+    """
+    try:
+        result = get_backend().get_face_image_ref(db, face_id)
+        
+        if result is None:
+            return None
+        
+        return {
+            'image_hash': result.get('image_hash'),
+            'encrypted_image': result.get('encrypted_image')
+        }
+    except Exception as e:
+        logger.error(f"Error getting image of face {face_id}: {e}")
+        return None
+
 def get_all_faces(db):
     """
     Get all faces.
@@ -108,28 +127,60 @@ def get_all_faces(db):
         List of face data dictionaries
     """
     try:
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['faces']]
-            return list(collection.find())
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    SELECT id, encoding, encrypted_image, timestamp, metadata
-                    FROM faces
-                """)
-                results = cur.fetchall()
-                
-                # Convert to MongoDB-like format
-                for result in results:
-                    result['_id'] = result['id']
-                
-                return results
+        results = get_backend().get_all_faces(db)
+        
+        for result in results:
+            result['encoding'] = unpack_encoding(result.get('encoding'))
+        
+        return results
     except Exception as e:
         logger.error(f"Error getting all faces: {e}")
         return []
 
+def get_face_encodings(db, since=None):
+    """
+    Get the encodings of faces, without their images.
+    
+    Args:
+        db: Database connection
+        since: Only faces enrolled at or after this time
+        
+    Returns:
+        List of dictionaries with '_id', 'encoding' (float32 array) and
+        'timestamp', oldest first
+    """
+    try:
+        results = get_backend().get_face_encodings(db, since)
+        
+        for result in results:
+            result['encoding'] = unpack_encoding(result.get('encoding'))
+        
+        return results
+    except Exception as e:
+        logger.error(f"Error getting face encodings: {e}")
+        return []
+
+def get_faces_page(db, limit, after=None):
+    """
+    Get a page of faces ordered by timestamp and ID.
+    
+    Only the fields needed for listing are fetched; encodings and images
+    stay in the database.
+    
+    Args:
+        db: Database connection
+        limit: Maximum number of faces
+        after: Optional (timestamp, face_id) of the last face of the previous page
+        
+    Returns:
+        List of face data dictionaries with _id, timestamp and metadata
+    """
+    try:
+        return get_backend().get_faces_page(db, limit, after)
+    except Exception as e:
+        logger.error(f"Error getting faces page: {e}")
+        raise
+
 def add_object(db, object_data):
     """
     Add an object to the database.
@@ -153,36 +204,13 @@ def add_object(db, object_data):
         if 'last_seen' not in object_data:
             object_data['last_seen'] = datetime.now()
         
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['objects']]
-            result = collection.insert_one(object_data)
-            object_id = object_data['_id']
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO objects (id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    object_data['_id'],
-                    object_data['tracking_id'],
-                    object_data['class_name'],
-                    object_data.get('owner_id'),
-                    object_data['first_seen'],
-                    object_data['last_seen'],
-                    object_data.get('metadata', {})
-                ))
-                object_id = cur.fetchone()['id']
-                db.commit()
+        object_id = get_backend().add_object(db, object_data)
         
         logger.info(f"Added object {object_id} to database")
         return object_id
     except Exception as e:
         logger.error(f"Error adding object to database: {e}")
-        if DATABASE['type'] == 'postgresql':
-            db.rollback()
+        get_backend().rollback(db)
         raise
 
 def update_object(db, tracking_id, update_data):
@@ -192,31 +220,23 @@ def update_object(db, tracking_id, update_data):
     Args:
         db: Database connection
         tracking_id: Object tracking ID
-        update_data: Dictionary of fields to update
+        update_data: Dictionary of fields to update, out of UPDATABLE_OBJECT_FIELDS
         
     Returns:
         True if successful, False otherwise
+        
+    Raises:
+        ValueError: If a field may not be updated
     """
+    unknown = set(update_data) - set(UPDATABLE_OBJECT_FIELDS)
+    if unknown:
+        raise ValueError(f"Object fields cannot be updated: {', '.join(sorted(unknown))}")
+    
+    if not update_data:
+        return False
+    
     try:
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['objects']]
-            result = collection.update_one({"tracking_id": tracking_id}, {"$set": update_data})
-            success = result.modified_count > 0
-        else:
-            # PostgreSQL
-            set_clause = ", ".join([f"{key} = %s" for key in update_data.keys()])
-            values = list(update_data.values())
-            values.append(tracking_id)
-            
-            with db.cursor() as cur:
-                cur.execute(f"""
-                    UPDATE objects
-                    SET {set_clause}
-                    WHERE tracking_id = %s
-                """, values)
-                success = cur.rowcount > 0
-                db.commit()
+        success = get_backend().update_object(db, tracking_id, update_data)
         
         if success:
             logger.info(f"Updated object {tracking_id}")
@@ -226,8 +246,7 @@ def update_object(db, tracking_id, update_data):
         return success
     except Exception as e:
         logger.error(f"Error updating object {tracking_id}: {e}")
-        if DATABASE['type'] == 'postgresql':
-            db.rollback()
+        get_backend().rollback(db)
         return False
 
 def get_object(db, tracking_id):
@@ -242,30 +261,34 @@ def get_object(db, tracking_id):
         Object data dictionary or None if not found
     """
     try:
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['objects']]
-            return collection.find_one({"tracking_id": tracking_id})
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata
-                    FROM objects
-                    WHERE tracking_id = %s
-                """, (tracking_id,))
-                result = cur.fetchone()
-                
-                if result:
-                    # Convert to MongoDB-like format
-                    result['_id'] = result['id']
-                    return result
-                
-                return None
+        return get_backend().get_object(db, tracking_id)
     except Exception as e:
         logger.error(f"Error getting object {tracking_id}: {e}")
         return None
 
+def find_objects(db, limit, class_name=None, owner_id=None, seen_after=None, seen_before=None, after=None):
+    """
+    Get a page of objects matching filters, most recently seen first.
+    
+    Args:
+        db: Database connection
+        limit: Maximum number of objects
+        class_name: Only objects of this class
+        owner_id: Only objects owned by this person
+        seen_after: Only objects last seen at or after this time
+        seen_before: Only objects last seen before this time
+        after: Optional (last_seen, object_id) of the last object of the previous page
+        
+    Returns:
+        List of object data dictionaries
+    """
+    try:
+        return get_backend().find_objects(db, limit, class_name=class_name, owner_id=owner_id,
+                                          seen_after=seen_after, seen_before=seen_before, after=after)
+    except Exception as e:
+        logger.error(f"Error finding objects: {e}")
+        raise
+
 def get_person_objects(db, person_id):
     """
     Get all objects belonging to a person.
@@ -278,25 +301,7 @@ def get_person_objects(db, person_id):
         List of object data dictionaries
     """
     try:
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['objects']]
-            return list(collection.find({"owner_id": person_id}))
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tracking_id, class_name, owner_id, first_seen, last_seen, metadata
-                    FROM objects
-                    WHERE owner_id = %s
-                """, (person_id,))
-                results = cur.fetchall()
-                
-                # Convert to MongoDB-like format
-                for result in results:
-                    result['_id'] = result['id']
-                
-                return results
+        return get_backend().get_person_objects(db, person_id)
     except Exception as e:
         logger.error(f"Error getting objects for person {person_id}: {e}")
         return []
@@ -317,33 +322,231 @@ def add_association(db, association_data):
         if 'timestamp' not in association_data:
             association_data['timestamp'] = datetime.now()
         
-        if DATABASE['type'] == 'mongodb':
-            # MongoDB
-            collection = db[DATABASE['collections']['associations']]
-            result = collection.insert_one(association_data)
-            association_id = result.inserted_id
-        else:
-            # PostgreSQL
-            with db.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO associations (person_id, object_id, distance, timestamp)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (person_id, object_id) DO UPDATE
-                    SET distance = EXCLUDED.distance, timestamp = EXCLUDED.timestamp
-                    RETURNING id
-                """, (
-                    association_data['person_id'],
-                    association_data['object_id'],
-                    association_data['distance'],
-                    association_data['timestamp']
-                ))
-                association_id = cur.fetchone()['id']
-                db.commit()
+        association_id = get_backend().add_association(db, association_data)
         
         logger.info(f"Added association to database")
         return association_id
     except Exception as e:
         logger.error(f"Error adding association to database: {e}")
-        if DATABASE['type'] == 'postgresql':
-            db.rollback()
-        raise
\ No newline at end of file
+        get_backend().rollback(db)
+        raise
+
+def add_faces_bulk(db, faces):
+    """
+    Add many faces in one round trip and transaction.
+    
+    Args:
+        db: Database connection
+        faces: List of face data dictionaries
+        
+    Returns:
+        List of face IDs
+    """
+    if not faces:
+        return []
+    
+    try:
+        now = datetime.now()
+        for face_data in faces:
+            face_data.setdefault('_id', str(uuid.uuid4()))
+            if face_data.get('timestamp') is None:
+                face_data['timestamp'] = now
+            face_data['image_hash'] = _store_face_image(face_data)
+        
+        get_backend().add_faces_bulk(db, [dict(face_data, encoding=pack_encoding(face_data['encoding']))
+                                          for face_data in faces])
+        
+        logger.info(f"Added {len(faces)} faces to database")
+        return [face_data['_id'] for face_data in faces]
+    except Exception as e:
+        logger.error(f"Error adding faces to database: {e}")
+        get_backend().rollback(db)
+        raise
+
+def add_objects_bulk(db, objects):
+    """
+    Add many objects in one round trip and transaction.
+    
+    Args:
+        db: Database connection
+        objects: List of object data dictionaries
+        
+    Returns:
+        List of object IDs
+    """
+    if not objects:
+        return []
+    
+    try:
+        now = datetime.now()
+        for object_data in objects:
+            object_data.setdefault('_id', str(uuid.uuid4()))
+            object_data.setdefault('first_seen', now)
+            object_data.setdefault('last_seen', now)
+        
+        get_backend().add_objects_bulk(db, objects)
+        
+        logger.info(f"Added {len(objects)} objects to database")
+        return [object_data['_id'] for object_data in objects]
+    except Exception as e:
+        logger.error(f"Error adding objects to database: {e}")
+        get_backend().rollback(db)
+        raise
+
+def upsert_objects_bulk(db, objects):
+    """
+    Insert or update many objects by tracking ID in one round trip and transaction.
+    
+    Existing objects get the new class name, owner and last-seen time; their
+    ID and first-seen time are kept.
+    
+    Args:
+        db: Database connection
+        objects: List of object data dictionaries with 'tracking_id' and 'class_name'
+        
+    Returns:
+        Number of objects written
+    """
+    if not objects:
+        return 0
+    
+    try:
+        get_backend().upsert_objects_bulk(db, objects, datetime.now())
+        
+        logger.info(f"Upserted {len(objects)} objects")
+        return len(objects)
+    except Exception as e:
+        logger.error(f"Error upserting objects: {e}")
+        get_backend().rollback(db)
+        raise
+
+def add_associations_bulk(db, associations):
+    """
+    Add many object-person associations in one round trip and transaction.
+    
+    Args:
+        db: Database connection
+        associations: List of association data dictionaries
+        
+    Returns:
+        Number of associations written
+    """
+    if not associations:
+        return 0
+    
+    try:
+        now = datetime.now()
+        for association_data in associations:
+            association_data.setdefault('timestamp', now)
+        
+        get_backend().add_associations_bulk(db, associations)
+        
+        logger.info(f"Added {len(associations)} associations to database")
+        return len(associations)
+    except Exception as e:
+        logger.error(f"Error adding associations to database: {e}")
+        get_backend().rollback(db)
+        raise
+
+def add_sightings_bulk(db, sightings):
+    """
+    Append sightings of objects to the sightings log in one round trip and transaction.
+    
+    Args:
+        db: Database connection
+        sightings: List of dictionaries with 'tracking_id', 'class_name',
+            'owner_id', 'timestamp' and 'bbox'
+        
+    Returns:
+        Number of sightings written
+    """
+    if not sightings:
+        return 0
+    
+    try:
+        # IDs break ties between sightings of the same time when paging
+        for sighting in sightings:
+            sighting.setdefault('_id', str(uuid.uuid4()))
+        
+        get_backend().add_sightings_bulk(db, sightings)
+        
+        logger.debug(f"Added {len(sightings)} sightings to database")
+        return len(sightings)
+    except Exception as e:
+        logger.error(f"Error adding sightings to database: {e}")
+        get_backend().rollback(db)
+        raise
+
+def find_sightings(db, tracking_id, limit, since=None, until=None, after=None):
+    """
+    Get a page of an object's sightings, oldest first.
+    
+    Args:
+        db: Database connection
+        tracking_id: Object tracking ID
+        limit: Maximum number of sightings
+        since: Only sightings at or after this time
+        until: Only sightings before this time
+        after: Optional (timestamp, _id) of the last sighting of the previous page
+        
+    Returns:
+        List of sighting dictionaries
+    """
+    try:
+        return get_backend().find_sightings(db, tracking_id, limit, since=since, until=until, after=after)
+    except Exception as e:
+        logger.error(f"Error finding sightings of object {tracking_id}: {e}")
+        raise
+
+def rollup_sightings(db, since, until):
+    """
+    Fold sightings of a time range into the objects summary.
+    
+    Objects get the earliest first-seen and latest last-seen time, and the
+    owner and class of their latest sighting. Merging is idempotent, so
+    ranges may overlap and any process may roll up any range.
+    
+    Args:
+        db: Database connection
+        since: Start of the range
+        until: End of the range (exclusive)
+        
+    Returns:
+        Number of objects updated
+    """
+    try:
+        count = get_backend().rollup_sightings(db, since, until)
+        
+        logger.debug(f"Rolled up sightings of {count} objects")
+        return count
+    except Exception as e:
+        logger.error(f"Error rolling up sightings: {e}")
+        get_backend().rollback(db)
+        raise
+
+def prune_sightings(db, retention_days):
+    """
+    Remove sightings older than the retention period.
+    
+    PostgreSQL drops whole daily partitions and SQLite deletes by time range.
+    MongoDB expires sightings itself (the collection's expireAfterSeconds).
+    
+    Args:
+        db: Database connection
+        retention_days: Number of days of sightings to keep
+        
+    Returns:
+        Number of dropped partitions (PostgreSQL) or deleted sightings (SQLite)
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    
+    try:
+        removed = get_backend().prune_sightings(db, cutoff)
+        if removed:
+            logger.info(f"Removed {removed} expired sightings partitions or rows")
+        
+        return removed
+    except Exception as e:
+        logger.error(f"Error pruning sightings: {e}")
+        get_backend().rollback(db)
+        raise
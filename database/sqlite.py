@@ -0,0 +1,231 @@
+"""
+Embedded SQLite backend for single-node deployments.
+
+``SQLiteConnection`` wraps a ``sqlite3`` connection in the small part of the
+psycopg2 interface the database operations use (``%s`` placeholders,
+dictionary rows, cursors as context managers and ``execute_values``), so the
+SQL code paths serve both PostgreSQL and SQLite.
+
+Connections run in WAL mode, so readers never block the writer. Statements
+are compiled once per connection and reused from its statement cache, and
+bulk writes run as one prepared statement inside one transaction.
+"""
+import json
+import logging
+import sqlite3
+import functools
+from datetime import datetime
+
+from app.config import DATABASE
+
+logger = logging.getLogger(__name__)
+
+# Statements compiled and kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Fixed-width ISO timestamps compare correctly as text
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' ', 'microseconds'))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('JSON', json.loads)
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def translate(sql):
+    """
+    Convert psycopg2 placeholders to SQLite ones.
+
+    Args:
+        sql: SQL with %s placeholders
+
+    Returns:
+        SQL with ? placeholders
+    """
+    return sql.replace('%s', '?')
+
+def _dict_row(cursor, row):
+    """Return rows as dictionaries, like psycopg2's RealDictCursor."""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """Cursor accepting psycopg2-style SQL."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cursor.close()
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(translate(sql), params)
+        return self
+
+    def execute_values(self, sql, rows):
+        """
+        Run a statement with a single ``VALUES %s`` for many rows.
+
+        The statement is prepared once and executed for each row.
+
+        Args:
+            sql: SQL with one %s standing for the rows
+            rows: List of parameter tuples of equal length
+        """
+        if not rows:
+            return
+
+        values = f"({', '.join('?' * len(rows[0]))})"
+        self.cursor.executemany(sql.replace('%s', values), rows)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+class SQLiteConnection:
+    """SQLite connection with the interface of a psycopg2 connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor())
+
+    @property
+    def in_transaction(self):
+        return self.conn.in_transaction
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+        self.closed = True
+
+def connect(path=None):
+    """
+    Open a SQLite connection with tuned pragmas.
+
+    Args:
+        path: Database file, defaults to DATABASE['sqlite_path']
+
+    Returns:
+        SQLiteConnection
+    """
+    conn = sqlite3.connect(
+        path or DATABASE['sqlite_path'],
+        timeout=DATABASE['sqlite_busy_timeout'],
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        # Writers take the write lock up front, so they wait for each other
+        # instead of failing when a read transaction cannot be upgraded
+        isolation_level='IMMEDIATE',
+        # Connections are pooled and used by one thread at a time
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = _dict_row
+
+    conn.execute("PRAGMA journal_mode = WAL")
+    # With WAL, NORMAL only risks the last commits on power loss, never corruption
+    conn.execute(f"PRAGMA synchronous = {DATABASE['sqlite_synchronous']}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA cache_size = -{DATABASE['sqlite_cache_mb'] * 1024}")
+    conn.execute(f"PRAGMA mmap_size = {DATABASE['sqlite_mmap_mb'] * 1024 * 1024}")
+
+    return SQLiteConnection(conn)
+
+def setup_sqlite_schema(conn):
+    """
+    Create SQLite tables and indexes.
+
+    Same tables, columns and indexes as the PostgreSQL schema, with SQLite
+    column types and an unpartitioned sightings table.
+
+    Args:
+        conn: SQLiteConnection
+    """
+    with conn.cursor() as cur:
+        # Faces table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS faces (
+                id TEXT PRIMARY KEY,
+                encoding BLOB,
+                encrypted_image TEXT,
+                image_hash TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                metadata JSON
+            )
+        """)
+
+        # Objects table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                id TEXT PRIMARY KEY,
+                tracking_id TEXT UNIQUE,
+                class_name TEXT,
+                owner_id TEXT REFERENCES faces(id),
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                metadata JSON
+            )
+        """)
+
+        # Associations table
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS associations (
+                id INTEGER PRIMARY KEY,
+                person_id TEXT REFERENCES faces(id),
+                object_id TEXT REFERENCES objects(id),
+                distance REAL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(person_id, object_id)
+            )
+        """)
+
+        # Create indexes
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_faces_timestamp ON faces(timestamp)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_faces_timestamp_id ON faces(timestamp, id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_owner ON objects(owner_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_tracking ON objects(tracking_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_last_seen ON objects(last_seen DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_class_last_seen ON objects(class_name, last_seen DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_objects_owner_last_seen ON objects(owner_id, last_seen DESC, id DESC)")
+
+        # Sightings table: append-only; SQLite has no partitions, expired
+        # sightings are deleted by timestamp range instead
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sightings (
+                id TEXT,
+                tracking_id TEXT NOT NULL,
+                class_name TEXT,
+                owner_id TEXT,
+                timestamp TIMESTAMP NOT NULL,
+                bbox JSON
+            )
+        """)
+
+        # Sightings logged before they had IDs keep a NULL one
+        cur.execute("SELECT name FROM pragma_table_info('sightings')")
+        if 'id' not in {row['name'] for row in cur.fetchall()}:
+            cur.execute("ALTER TABLE sightings ADD COLUMN id TEXT")
+
+        cur.execute("DROP INDEX IF EXISTS idx_sightings_tracking_timestamp")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sightings_tracking_timestamp_id ON sightings(tracking_id, timestamp, id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sightings_timestamp ON sightings(timestamp)")
+
+    conn.commit()
+
+    logger.info("Set up SQLite tables and indexes")
@@ -2,14 +2,15 @@
 Face detection and recognition using YOLO and face_recognition.
 """
 import cv2
-import numpy as np
 import face_recognition
 import uuid
 import logging
 from ultralytics import YOLO
 
+from app import metrics
 from encryption.encrypt import encrypt_face_data
 from detection.utils import filter_detections
+from detection.gallery import FaceGallery
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ class FaceDetector:
         self.model = YOLO(model_path)
         self.confidence_threshold = confidence_threshold
         self.face_recognition_tolerance = face_recognition_tolerance
-        self.known_faces = {}  # face_id -> face_encoding
+        self.gallery = FaceGallery()
         logger.info("Face detector initialized")
     
     def load_known_faces(self, faces_data):
@@ -38,11 +39,9 @@ class FaceDetector:
         Args:
             faces_data: List of face data dictionaries from database
         """
-        for face in faces_data:
-            if 'encoding' in face and face['encoding'] is not None:
-                self.known_faces[face['_id']] = np.array(face['encoding'])
+        self.gallery.add_many(faces_data)
         
-        logger.info(f"Loaded {len(self.known_faces)} known faces")
+        logger.info(f"Loaded {len(self.gallery)} known faces")
     
     def detect(self, frame):
         """
@@ -55,7 +54,8 @@ class FaceDetector:
             List of face detections with bounding boxes, IDs, and confidence
         """
         # Run YOLO detection
-        results = self.model(frame)
+        with metrics.timer('yolo_inference'):
+            results = self.model(frame)
         
         # Filter for person class
         detections = []
@@ -89,17 +89,20 @@ class FaceDetector:
             rgb_img = cv2.cvtColor(person_img, cv2.COLOR_BGR2RGB)
             
             # Detect faces in the person region
-            face_locations = face_recognition.face_locations(rgb_img)
+            with metrics.timer('face_location'):
+                face_locations = face_recognition.face_locations(rgb_img)
             
             if face_locations:
                 # Get face encodings
-                face_encodings = face_recognition.face_encodings(rgb_img, face_locations)
+                with metrics.timer('face_encoding'):
+                    face_encodings = face_recognition.face_encodings(rgb_img, face_locations)
                 
                 if face_encodings:
                     face_encoding = face_encodings[0]
                     
                     # Try to recognize the face
-                    face_id = self._recognize_face(face_encoding)
+                    with metrics.timer('gallery_match'):
+                        face_id = self._recognize_face(face_encoding)
                     
                     # Add face ID to detection
                     detection['face_id'] = face_id
@@ -128,31 +131,7 @@ class FaceDetector:
         Returns:
             face_id if match found, None otherwise
         """
-        if not self.known_faces:
-            return None
-        
-        # Compare face with known faces
-        matches = face_recognition.compare_faces(
-            list(self.known_faces.values()), 
-            face_encoding, 
-            tolerance=self.face_recognition_tolerance
-        )
-        
-        # If no match found
-        if not any(matches):
-            return None
-        
-        # Find the best match
-        face_distances = face_recognition.face_distance(
-            list(self.known_faces.values()), 
-            face_encoding
-        )
-        best_match_index = np.argmin(face_distances)
-        
-        if matches[best_match_index]:
-            return list(self.known_faces.keys())[best_match_index]
-        
-        return None
+        return self.gallery.match(face_encoding, self.face_recognition_tolerance)
     
     def prepare_face_data(self, frame, detection):
         """
@@ -0,0 +1,165 @@
+"""
+In-memory gallery of known face encodings.
+"""
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FaceGallery:
+    """Known face encodings stored as one matrix for vectorized matching."""
+
+    def __init__(self, dimensions=128, initial_capacity=1024):
+        """
+        Initialize an empty gallery.
+
+        Args:
+            dimensions: Length of a face encoding
+            initial_capacity: Number of rows allocated up front
+        """
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+
+        self.ids = []
+        self.index = {}  # face_id -> row
+        self.matrix = np.empty((initial_capacity, dimensions), dtype=np.float32)
+        self.squared_norms = np.empty(initial_capacity, dtype=np.float32)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, face_id):
+        return face_id in self.index
+
+    def add(self, face_id, encoding):
+        """
+        Add a face, or replace its encoding if it is already known.
+
+        Args:
+            face_id: Face ID
+            encoding: Face encoding
+        """
+        encoding = np.asarray(encoding, dtype=np.float32)
+
+        with self.lock:
+            row = self.index.get(face_id)
+
+            if row is None:
+                if self.count == len(self.matrix):
+                    self._grow()
+
+                row = self.count
+                self.ids.append(face_id)
+                self.index[face_id] = row
+
+            self.matrix[row] = encoding
+            self.squared_norms[row] = encoding @ encoding
+
+            # Publish the row only once it is written
+            if row == self.count:
+                self.count += 1
+
+    def add_many(self, faces):
+        """
+        Add faces from database records.
+
+        Args:
+            faces: Iterable of face data dictionaries with '_id' and 'encoding'
+
+        Returns:
+            Number of faces added or updated
+        """
+        added = 0
+        for face in faces:
+            if face.get('encoding') is not None:
+                self.add(face['_id'], face['encoding'])
+                added += 1
+        return added
+
+    def _grow(self):
+        """Double the allocated rows. Called with the lock held."""
+        capacity = max(1, 2 * len(self.matrix))
+
+        matrix = np.empty((capacity, self.dimensions), dtype=np.float32)
+        matrix[:self.count] = self.matrix[:self.count]
+        squared_norms = np.empty(capacity, dtype=np.float32)
+        squared_norms[:self.count] = self.squared_norms[:self.count]
+
+        # Readers holding the old arrays keep a consistent view
+        self.matrix = matrix
+        self.squared_norms = squared_norms
+
+    def distances(self, encoding):
+        """
+        Compute the Euclidean distance from an encoding to every known face.
+
+        Args:
+            encoding: Face encoding
+
+        Returns:
+            Tuple of (face IDs, distances)
+        """
+        with self.lock:
+            count = self.count
+            ids = self.ids
+            matrix = self.matrix[:count]
+            squared_norms = self.squared_norms[:count]
+
+        if count == 0:
+            return [], np.empty(0, dtype=np.float32)
+
+        query = np.asarray(encoding, dtype=np.float32)
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, one matrix-vector product for all faces
+        squared = squared_norms + query @ query - 2 * (matrix @ query)
+        np.maximum(squared, 0, out=squared)
+
+        return ids, np.sqrt(squared)
+
+    def search(self, encoding, k=5, max_distance=None):
+        """
+        Find the nearest known faces.
+
+        Args:
+            encoding: Face encoding
+            k: Maximum number of results
+            max_distance: Only return faces within this distance
+
+        Returns:
+            List of (face_id, distance) tuples, nearest first
+        """
+        ids, distances = self.distances(encoding)
+        if len(distances) == 0 or k <= 0:
+            return []
+
+        k = min(k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        results = [(ids[i], float(distances[i])) for i in nearest]
+
+        if max_distance is not None:
+            results = [(face_id, distance) for face_id, distance in results if distance <= max_distance]
+
+        return results
+
+    def match(self, encoding, tolerance):
+        """
+        Find the nearest known face within a tolerance.
+
+        Args:
+            encoding: Face encoding
+            tolerance: Maximum distance of a match
+
+        Returns:
+            face_id if match found, None otherwise
+        """
+        ids, distances = self.distances(encoding)
+        if len(distances) == 0:
+            return None
+
+        best = int(np.argmin(distances))
+        return ids[best] if distances[best] <= tolerance else None
@@ -7,7 +7,8 @@ import uuid
 import logging
 from ultralytics import YOLO
 
-from detection.utils import filter_detections
+from app import metrics
+from detection.utils import filter_detections, calculate_iou
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +49,8 @@ class ObjectDetector:
             List of object detections with bounding boxes, tracking IDs, and confidence
         """
         # Run YOLO detection
-        results = self.model(frame)
+        with metrics.timer('yolo_inference'):
+            results = self.model(frame)
         
         # Filter for target classes
         detections = []
@@ -69,7 +71,8 @@ class ObjectDetector:
                     })
         
         # Track objects
-        tracked_detections = self._track_objects(detections)
+        with metrics.timer('tracking'):
+            tracked_detections = self._track_objects(detections)
         
         return tracked_detections
     
@@ -156,23 +159,4 @@ class ObjectDetector:
         Returns:
             IoU value
         """
-        # Calculate intersection
-        x1 = max(bbox1[0], bbox2[0])
-        y1 = max(bbox1[1], bbox2[1])
-        x2 = min(bbox1[2], bbox2[2])
-        y2 = min(bbox1[3], bbox2[3])
-        
-        if x2 < x1 or y2 < y1:
-            return 0.0
-            
-        intersection = (x2 - x1) * (y2 - y1)
-        
-        # Calculate areas
-        area1 = (bbox1[2] - bbox1[0]) * (bbox1[3] - bbox1[1])
-        area2 = (bbox2[2] - bbox2[0]) * (bbox2[3] - bbox2[1])
-        
-        # Calculate IoU
-        union = area1 + area2 - intersection
-        iou = intersection / union if union > 0 else 0
-        
-        return iou
\ No newline at end of file
+        return calculate_iou(bbox1, bbox2)
@@ -31,6 +31,38 @@ def filter_detections(detections, confidence_threshold=0.5, classes=None):
     
     return filtered
 
+def calculate_iou(bbox1, bbox2):
+    """
+    Calculate Intersection over Union (IoU) between two bounding boxes.
+    
+    Args:
+        bbox1: First bounding box (x1, y1, x2, y2)
+        bbox2: Second bounding box (x1, y1, x2, y2)
+        
+    Returns:
+        IoU value
+    """
+    # Calculate intersection
+    x1 = max(bbox1[0], bbox2[0])
+    y1 = max(bbox1[1], bbox2[1])
+    x2 = min(bbox1[2], bbox2[2])
+    y2 = min(bbox1[3], bbox2[3])
+    
+    if x2 < x1 or y2 < y1:
+        return 0.0
+        
+    intersection = (x2 - x1) * (y2 - y1)
+    
+    # Calculate areas
+    area1 = (bbox1[2] - bbox1[0]) * (bbox1[3] - bbox1[1])
+    area2 = (bbox2[2] - bbox2[0]) * (bbox2[3] - bbox2[1])
+    
+    # Calculate IoU
+    union = area1 + area2 - intersection
+    iou = intersection / union if union > 0 else 0
+    
+    return iou
+
 def draw_boxes(frame, face_detections, object_detections):
     """
     Draw bounding boxes for faces and objects on the frame.
@@ -14,6 +14,35 @@ logger = logging.getLogger(__name__)
 # Initialize decryption
 fernet = Fernet(ENCRYPTION_KEY)
 
+def decrypt_face_token(token):
+    """
+    Decrypt a Fernet token holding a face image, without decoding the image.
+    
+    Args:
+        token: Fernet token bytes, as kept in the blob store
+        
+    Returns:
+        Decrypted JPEG bytes
+    """
+    try:
+        return fernet.decrypt(token)
+    except Exception as e:
+        logger.error(f"Error decrypting face data: {e}")
+        raise
+
+def decrypt_face_bytes(encrypted_data):
+    """
+    Decrypt face image data without decoding the image.
+    
+    Args:
+        encrypted_data: Base64 encoded encrypted data
+        
+    Returns:
+        Decrypted JPEG bytes
+    """
+    # Decode from base64
+    return decrypt_face_token(base64.b64decode(encrypted_data))
+
 def decrypt_face_data(encrypted_data):
     """
     Decrypt face image data.
@@ -25,11 +54,7 @@ def decrypt_face_data(encrypted_data):
         Decrypted face image
     """
     try:
-        # Decode from base64
-        encrypted_bytes = base64.b64decode(encrypted_data)
-        
-        # Decrypt the data
-        decrypted_bytes = fernet.decrypt(encrypted_bytes)
+        decrypted_bytes = decrypt_face_bytes(encrypted_data)
         
         # Convert back to image
         nparr = np.frombuffer(decrypted_bytes, np.uint8)
@@ -2,18 +2,31 @@
 Application entry point.
 """
 import os
+import threading
 from flask import Flask, render_template
 import logging
 
 from app import create_app
 from app.config import API
-from api.routes import api
+from api.routes import api, init_detectors, warm_up_detectors, detectors_ready
+from database.db import release_database
 
 # Initialize logging
 logger = create_app()
 
-def create_flask_app():
-    """Create and configure Flask application."""
+def create_flask_app(preload_models=None, warm_up_in_background=True):
+    """
+    Create and configure Flask application.
+    
+    Args:
+        preload_models: Load and warm up the detectors now instead of on the
+            first request (defaults to config)
+        warm_up_in_background: Run warm-up inference in a background thread
+            so the server can start answering /api/ready right away
+    
+    Returns:
+        Flask application
+    """
     # Create Flask app
     app = Flask(__name__, 
                 static_folder='static',
@@ -26,6 +39,24 @@ def create_flask_app():
     # Register blueprints
     app.register_blueprint(api, url_prefix='/api')
     
+    # Return pooled database connections at the end of each request
+    app.teardown_appcontext(release_database)
+    
+    # Load models once, before any request arrives
+    if preload_models is None:
+        preload_models = API['preload_models']
+    
+    if preload_models:
+        init_detectors()
+        
+        if warm_up_in_background:
+            threading.Thread(target=warm_up_detectors, name='warm-up', daemon=True).start()
+        else:
+            warm_up_detectors()
+    else:
+        # Detectors are created lazily by the first request, nothing to wait for
+        detectors_ready.set()
+    
     # Root route
     @app.route('/')
     def index():
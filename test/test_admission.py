@@ -0,0 +1,41 @@
+import unittest
+import threading
+from api.admission import AdmissionController, Overloaded
+
+class TestAdmissionController(unittest.TestCase):
+    def test_rejects_when_queue_is_full(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, timeout=1)
+        with controller.admit():
+            with self.assertRaises(Overloaded) as context:
+                with controller.admit():
+                    pass
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test_waiting_request_is_admitted_when_a_slot_frees_up(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, timeout=5)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold_slot():
+            with controller.admit():
+                entered.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold_slot)
+        thread.start()
+        entered.wait(5)
+        threading.Timer(0.05, release.set).start()
+
+        with controller.admit() as queue_wait:
+            self.assertGreater(queue_wait, 0)
+        thread.join()
+
+    def test_times_out_waiting_for_a_slot(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, timeout=0.05)
+        with controller.admit():
+            with self.assertRaises(Overloaded):
+                with controller.admit():
+                    pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.config import DATABASE
+from database import operations, sqlite
+from database.backends import MongoDBBackend, SQLiteBackend
+from benchmarks.fakedb import FakeDatabase, fake_requests
+
+class BackendTests:
+    """Tests every backend has to pass; subclasses set up the database."""
+
+    def associations(self):
+        raise NotImplementedError
+
+    def test_repeated_association_batch_is_upserted(self):
+        operations.add_objects_bulk(self.db, [{'_id': 'o1', 'tracking_id': 't1', 'class_name': 'backpack'}])
+
+        batch = [{'person_id': 'alice', 'object_id': 'o1', 'distance': 1.0}]
+        operations.add_associations_bulk(self.db, [dict(a) for a in batch])
+        operations.add_associations_bulk(self.db, [dict(a, distance=2.0) for a in batch])
+        operations.add_association(self.db, {'person_id': 'alice', 'object_id': 'o1', 'distance': 3.0})
+
+        associations = self.associations()
+        self.assertEqual(len(associations), 1)
+        self.assertEqual(associations[0]['distance'], 3.0)
+
+class TestSQLiteBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        patches = [
+            mock.patch.dict(DATABASE, {'type': 'sqlite'}),
+            mock.patch('database.backends._backend', SQLiteBackend())
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.db = sqlite.connect(os.path.join(self.tmp.name, 'test.db'))
+        self.addCleanup(self.db.close)
+        sqlite.setup_sqlite_schema(self.db)
+
+        with self.db.cursor() as cur:
+            cur.execute("INSERT INTO faces (id) VALUES ('alice')")
+        self.db.commit()
+
+    def associations(self):
+        with self.db.cursor() as cur:
+            cur.execute("SELECT person_id, object_id, distance FROM associations")
+            return cur.fetchall()
+
+class TestMongoDBBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.dict(DATABASE, {'type': 'mongodb'}),
+            mock.patch('database.backends._backend', MongoDBBackend()),
+            fake_requests()
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.db = FakeDatabase()
+
+    def associations(self):
+        return list(self.db[DATABASE['collections']['associations']].find())
+
+if __name__ == "__main__":
+    unittest.main()
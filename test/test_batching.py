@@ -0,0 +1,39 @@
+import unittest
+import threading
+from api.batching import InferenceDispatcher
+
+class TestInferenceDispatcher(unittest.TestCase):
+    def test_concurrent_requests_are_batched_in_order(self):
+        batches = []
+
+        def infer_batch(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        dispatcher = InferenceDispatcher(infer_batch, max_batch_size=4, max_wait_ms=50)
+        results = {}
+        barrier = threading.Barrier(4)
+
+        def request(value):
+            barrier.wait()
+            results[value] = dispatcher.submit(value).result(timeout=5)
+
+        threads = [threading.Thread(target=request, args=(value,)) for value in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {0: 0, 1: 2, 2: 4, 3: 6})
+        self.assertLess(len(batches), 4)
+
+    def test_errors_are_propagated(self):
+        def infer_batch(items):
+            raise RuntimeError("model failed")
+
+        dispatcher = InferenceDispatcher(infer_batch, max_batch_size=2, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit(1).result(timeout=5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+from database.blobs import FileSystemBlobStore, blob_key
+
+class TestFileSystemBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FileSystemBlobStore(self.tmp.name, shard_depth=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        key = self.store.put(b'encrypted face')
+
+        self.assertEqual(key, blob_key(b'encrypted face'))
+        self.assertTrue(self.store.exists(key))
+        self.assertEqual(self.store.read(key), b'encrypted face')
+
+    def test_blobs_are_sharded_by_hash_prefix(self):
+        key = self.store.put(b'encrypted face')
+
+        self.assertEqual(self.store.path(key), os.path.join(self.tmp.name, key[:2], key[2:4], key))
+
+    def test_identical_blobs_are_stored_once(self):
+        first = self.store.put(b'same bytes')
+        second = self.store.put(b'same bytes')
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(os.path.dirname(self.store.path(first))), [first])
+
+    def test_invalid_keys_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.path('../../etc/passwd')
+        with self.assertRaises(FileNotFoundError):
+            self.store.read('0' * 64)
+
+if __name__ == "__main__":
+    unittest.main()
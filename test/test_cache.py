@@ -0,0 +1,43 @@
+import unittest
+from unittest import mock
+from api.cache import ByteLRUCache
+
+class TestByteLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = ByteLRUCache(max_bytes=10)
+        cache.put('a', b'aaaa', 'tag-a')
+        cache.put('b', b'bbbb')
+        self.assertEqual(cache.get('a'), (b'aaaa', 'tag-a'))
+
+        cache.put('c', b'cccc')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.size, 10)
+
+    def test_oversized_values_are_not_cached(self):
+        cache = ByteLRUCache(max_bytes=4)
+        cache.put('a', b'too large')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_replacing_a_key_updates_the_size(self):
+        cache = ByteLRUCache(max_bytes=10)
+        cache.put('a', b'aaaa')
+        cache.put('a', b'aa')
+        self.assertEqual(cache.size, 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ByteLRUCache(max_bytes=10, ttl=60)
+        with mock.patch('api.cache.time.monotonic', return_value=100.0):
+            cache.put('a', b'aaaa')
+        with mock.patch('api.cache.time.monotonic', return_value=159.0):
+            self.assertIsNotNone(cache.get('a'))
+        with mock.patch('api.cache.time.monotonic', return_value=161.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+import numpy as np
+from database.encoding import pack_encoding, unpack_encoding
+
+class TestEncodingStorage(unittest.TestCase):
+    def test_round_trip(self):
+        encoding = np.random.default_rng(0).normal(0, 0.1, 128)
+        packed = pack_encoding(encoding.tolist())
+
+        self.assertEqual(len(packed), 1 + 128 * 4)
+        np.testing.assert_allclose(unpack_encoding(packed), encoding, rtol=1e-6)
+        np.testing.assert_allclose(unpack_encoding(memoryview(packed)), encoding, rtol=1e-6)
+
+    def test_legacy_lists_are_read(self):
+        self.assertEqual(unpack_encoding([0.5, 0.25]).dtype, np.float32)
+        self.assertIsNone(unpack_encoding(None))
+
+    def test_unknown_version_is_rejected(self):
+        with self.assertRaises(ValueError):
+            unpack_encoding(b'\x09' + bytes(8))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from app.events import EventBus
+
+class TestEventBus(unittest.TestCase):
+    def test_subscriber_receives_matching_events(self):
+        bus = EventBus()
+        subscription = bus.subscribe(types=['ownership'])
+        bus.publish('detections', {'frame': 1})
+        bus.publish('ownership', {'tracking_id': 'a'})
+
+        events = subscription.get(timeout=1)
+
+        self.assertEqual([event['type'] for event in events], ['ownership'])
+
+    def test_slow_subscriber_drops_oldest_events(self):
+        bus = EventBus()
+        subscription = bus.subscribe(buffer_size=2)
+        for frame in range(5):
+            bus.publish('detections', {'frame': frame})
+
+        events = subscription.get(timeout=1)
+
+        self.assertEqual(events[0], {'type': 'dropped', 'time': events[0]['time'], 'data': {'count': 3}})
+        self.assertEqual([event['data']['frame'] for event in events[1:]], [3, 4])
+
+    def test_closed_subscription_stops_receiving(self):
+        bus = EventBus()
+        subscription = bus.subscribe()
+        subscription.close()
+        bus.publish('detections', {'frame': 1})
+        self.assertFalse(bus.has_subscribers())
+        self.assertEqual(subscription.get(timeout=0), [])
+
+if __name__ == "__main__":
+    unittest.main()
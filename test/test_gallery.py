@@ -0,0 +1,32 @@
+import unittest
+import numpy as np
+from detection.gallery import FaceGallery
+
+class TestFaceGallery(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.encodings = rng.normal(0, 0.1, (50, 128))
+        self.gallery = FaceGallery(initial_capacity=4)
+        for i, encoding in enumerate(self.encodings):
+            self.gallery.add(f"face-{i}", encoding)
+
+    def test_search_matches_brute_force(self):
+        query = self.encodings[7] + 0.01
+        expected = np.argsort(np.linalg.norm(self.encodings - query, axis=1))[:5]
+
+        results = self.gallery.search(query, k=5)
+
+        self.assertEqual([face_id for face_id, _ in results], [f"face-{i}" for i in expected])
+        self.assertAlmostEqual(results[0][1], np.linalg.norm(self.encodings[7] - query), places=4)
+
+    def test_match_respects_tolerance(self):
+        self.assertEqual(self.gallery.match(self.encodings[3], tolerance=0.1), "face-3")
+        self.assertIsNone(self.gallery.match(np.full(128, 5.0), tolerance=0.6))
+
+    def test_adding_a_known_face_replaces_its_encoding(self):
+        self.gallery.add("face-0", np.zeros(128))
+        self.assertEqual(len(self.gallery), 50)
+        self.assertEqual(self.gallery.match(np.zeros(128), tolerance=0.01), "face-0")
+
+if __name__ == "__main__":
+    unittest.main()
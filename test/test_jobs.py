@@ -0,0 +1,54 @@
+import unittest
+import time
+import tempfile
+from unittest import mock
+from app import jobs
+from app.jobs import JobManager, JobQueueFull
+
+def write_video(path):
+    with open(path, 'wb') as f:
+        f.write(b'video')
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def wait_for(self, manager, job_id):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            job = manager.get(job_id)
+            if job['state'] in jobs.FINISHED_STATES:
+                return job
+            time.sleep(0.01)
+        self.fail("Job did not finish")
+
+    def test_job_runs_and_reports_result(self):
+        def process_video(source, progress=None, **kwargs):
+            progress(10, 10, 1.0)
+            return {'frames': 10, 'seconds': 1.0, 'fps': 10.0, 'error': None}
+
+        manager = JobManager(self.tmp.name, workers=1, max_pending=2)
+        with mock.patch.object(jobs, 'process_video', process_video):
+            job = manager.submit(write_video)
+            self.assertEqual(job['state'], 'queued')
+            job = self.wait_for(manager, job['id'])
+
+        self.assertEqual(job['state'], 'completed')
+        self.assertEqual(job['result']['frames'], 10)
+        self.assertEqual(job['progress'], 1.0)
+
+    def test_full_queue_is_rejected(self):
+        manager = JobManager(self.tmp.name, workers=1, max_pending=1)
+        manager._ensure_started()
+        manager.pending = 1
+        with self.assertRaises(JobQueueFull):
+            manager.submit(write_video)
+
+    def test_invalid_job_id(self):
+        manager = JobManager(self.tmp.name)
+        with self.assertRaises(ValueError):
+            manager.get('../etc')
+
+if __name__ == "__main__":
+    unittest.main()
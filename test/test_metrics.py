@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+from app import metrics
+from app.config import METRICS
+
+# Records a pipeline stage in another process and exports it
+PIPELINE = """
+from app import metrics
+with metrics.timer('decode', camera='cam2'):
+    pass
+metrics.inc_counter('sightings_dropped_total', 3, camera='cam2')
+metrics.export()
+"""
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        METRICS['enabled'] = True
+        metrics.reset()
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        patch = mock.patch.dict(METRICS, {'dir': self.tmp.name})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def run_pipeline(self):
+        env = dict(os.environ, METRICS_DIR=self.tmp.name, METRICS_ENABLED='true')
+        subprocess.run([sys.executable, '-c', PIPELINE], env=env, check=True)
+
+    def test_histogram_quantiles(self):
+        histogram = metrics.RollingHistogram(100)
+        for value in range(1, 101):
+            histogram.observe(value / 1000)
+        values, count, total = histogram.summary()
+        self.assertEqual(count, 100)
+        self.assertAlmostEqual(values[0.5], 0.05)
+        self.assertAlmostEqual(values[0.99], 0.099)
+
+    def test_render_prometheus(self):
+        with metrics.timer('decode', camera='cam1'):
+            pass
+        text = metrics.render_prometheus()
+        self.assertIn('pipeline_stage_latency_seconds{camera="cam1",stage="decode",quantile="0.95"}', text)
+        self.assertIn('pipeline_stage_latency_seconds_count{camera="cam1",stage="decode"} 1', text)
+
+    def test_scrape_includes_other_processes(self):
+        self.run_pipeline()
+
+        with metrics.timer('decode', camera='cam2'):
+            pass
+        text = metrics.render_prometheus()
+
+        # Both processes' samples are counted in one series
+        self.assertIn('pipeline_stage_latency_seconds_count{camera="cam2",stage="decode"} 2', text)
+        self.assertIn('sightings_dropped_total{camera="cam2"} 3', text)
+
+    def test_snapshots_of_exited_processes_are_dropped(self):
+        self.run_pipeline()
+        for name in os.listdir(self.tmp.name):
+            os.utime(os.path.join(self.tmp.name, name), (0, 0))
+
+        self.assertNotIn('cam2', metrics.render_prometheus())
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_disabled_timer_records_nothing(self):
+        METRICS['enabled'] = False
+        try:
+            with metrics.timer('decode', camera='cam1'):
+                pass
+        finally:
+            METRICS['enabled'] = True
+        self.assertNotIn('cam1', metrics.render_prometheus())
+
+if __name__ == "__main__":
+    unittest.main()
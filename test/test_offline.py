@@ -0,0 +1,113 @@
+import unittest
+import os
+import json
+import time
+import tempfile
+import multiprocessing
+from unittest import mock
+import cv2
+from app import metrics, tracing
+from app.offline import plan_chunks, stitch_chunks, process_video_chunked
+
+FRAMES = 40
+
+class FakeCapture:
+    """Video of FRAMES blank frames."""
+
+    def __init__(self, source):
+        self.position = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_COUNT: FRAMES, cv2.CAP_PROP_FPS: 10}.get(prop, 0)
+
+    def set(self, prop, value):
+        self.position = int(value)
+
+    def read(self):
+        if self.position >= FRAMES:
+            return False, None
+        self.position += 1
+        return True, None
+
+    def release(self):
+        pass
+
+class FakeDetector:
+    """Detector that finds nothing, slowly enough for every worker to get chunks."""
+
+    tracked_objects = {}
+
+    def load_known_faces(self, faces):
+        pass
+
+    def detect(self, frame):
+        with metrics.timer('yolo_inference'):
+            time.sleep(0.005)
+        return []
+
+class TestOfflineChunks(unittest.TestCase):
+    def test_plan_chunks(self):
+        chunks = plan_chunks(250, 100, 10)
+        self.assertEqual([(c['start'], c['end'], c['read_start']) for c in chunks],
+                         [(0, 100, 0), (100, 200, 90), (200, 250, 190)])
+
+    def test_stitch_chunks_maps_track_ids(self):
+        bbox = [10.0, 10.0, 50.0, 50.0]
+        first = {'chunk': {'start': 0}, 'frames': [
+            {'frame': i, 'faces': [], 'objects': [{'tracking_id': 'a', 'class_name': 'backpack', 'bbox': bbox}]}
+            for i in range(4)
+        ]}
+        second = {'chunk': {'start': 4}, 'frames': [
+            {'frame': i, 'faces': [], 'objects': [{'tracking_id': 'b', 'class_name': 'backpack', 'bbox': bbox}]}
+            for i in range(2, 6)
+        ]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i, checkpoint in enumerate([first, second]):
+                path = os.path.join(tmp, f"chunk_{i}.json")
+                with open(path, 'w') as f:
+                    json.dump(checkpoint, f)
+                paths.append(path)
+
+            records = list(stitch_chunks(paths, 0.5))
+
+        self.assertEqual([r['frame'] for r in records], list(range(6)))
+        self.assertTrue(all(r['objects'][0]['tracking_id'] == 'a' for r in records))
+
+@unittest.skipUnless(multiprocessing.get_start_method() == 'fork', "workers must inherit the patches")
+class TestOfflineTracing(unittest.TestCase):
+    def test_chunked_run_traces_every_worker(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'video.mp4')
+            open(source, 'wb').close()
+            trace_path = os.path.join(tmp, 'trace.json')
+
+            with mock.patch('app.offline.cv2.VideoCapture', FakeCapture), \
+                    mock.patch('app.offline.create_detectors', lambda: (FakeDetector(), FakeDetector())), \
+                    mock.patch('app.offline.get_database'), \
+                    mock.patch('app.offline.get_all_faces', return_value=[]), \
+                    mock.patch('app.offline.SightingRecorder'):
+                tracing.start_tracing(trace_path, 1.0)
+                try:
+                    self.assertTrue(process_video_chunked(source, workers=2, chunk_frames=5, overlap=0))
+                finally:
+                    tracing.stop_tracing()
+
+            with open(trace_path) as f:
+                events = json.load(f)
+            leftovers = [name for name in os.listdir(tmp) if tracing.WORKER_SUFFIX in name]
+
+        frames = [event for event in events if event['name'] == 'frame']
+        stages = [event for event in events if event['name'] == 'yolo_inference']
+
+        self.assertEqual(sorted({event['args']['frame'] for event in frames}), list(range(FRAMES)))
+        self.assertGreater(len({event['pid'] for event in frames}), 1)
+        self.assertNotIn(os.getpid(), {event['pid'] for event in stages})
+        self.assertEqual(leftovers, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app.config import DATABASE, SIGHTINGS
+from app.sightings import SightingRecorder
+from database import operations, sqlite
+from database.backends import SQLiteBackend
+
+def backpack(tracking_id):
+    return {'tracking_id': tracking_id, 'class_name': 'backpack', 'bbox': [0, 0, 10, 10]}
+
+class TestSightings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        patches = [
+            mock.patch.dict(DATABASE, {'type': 'sqlite'}),
+            mock.patch('database.backends._backend', SQLiteBackend()),
+            mock.patch.dict(SIGHTINGS, {'min_interval': 60, 'flush_interval': 60, 'rollup_interval': 60})
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.db = sqlite.connect(os.path.join(self.tmp.name, 'test.db'))
+        self.addCleanup(self.db.close)
+        sqlite.setup_sqlite_schema(self.db)
+
+        # Faces the sightings refer to as owners
+        with self.db.cursor() as cur:
+            cur.execute("INSERT INTO faces (id) VALUES ('alice'), ('bob')")
+        self.db.commit()
+
+    def test_recorder_samples_and_rolls_up(self):
+        recorder = SightingRecorder(self.db)
+
+        self.assertIsNone(recorder.record(backpack('t1'), 'alice'))
+        self.assertEqual(recorder.record(backpack('t1'), 'alice'), 'alice')
+        self.assertEqual(recorder.record(backpack('t1'), 'bob'), 'alice')
+        recorder.close()
+
+        # The repeated sighting with the same owner was not recorded
+        self.assertEqual(len(operations.find_sightings(self.db, 't1', 10)), 2)
+
+        obj = operations.get_object(self.db, 't1')
+        self.assertEqual(obj['owner_id'], 'bob')
+        self.assertLessEqual(obj['first_seen'], obj['last_seen'])
+
+    def test_recorder_uses_frame_time(self):
+        recorded_at = datetime(2024, 5, 1, 12, 0)
+        recorder = SightingRecorder(self.db)
+
+        recorder.record(backpack('t1'), 'alice', recorded_at)
+        recorder.record(backpack('t1'), 'alice', recorded_at + timedelta(seconds=30))
+        recorder.record(backpack('t1'), 'alice', recorded_at + timedelta(seconds=90))
+        recorder.close()
+
+        # Sampling follows the video, not the speed of the replay
+        sightings = operations.find_sightings(self.db, 't1', 10)
+        self.assertEqual([s['timestamp'] for s in sightings], [recorded_at, recorded_at + timedelta(seconds=90)])
+
+        obj = operations.get_object(self.db, 't1')
+        self.assertEqual(obj['first_seen'], recorded_at)
+        self.assertEqual(obj['last_seen'], recorded_at + timedelta(seconds=90))
+
+    def test_rollup_is_idempotent_and_keeps_latest_owner(self):
+        now = datetime.now()
+        operations.add_sightings_bulk(self.db, [
+            {'tracking_id': 't1', 'class_name': 'backpack', 'owner_id': 'alice',
+             'timestamp': now - timedelta(minutes=2), 'bbox': [0, 0, 1, 1]},
+            {'tracking_id': 't1', 'class_name': 'backpack', 'owner_id': 'bob',
+             'timestamp': now - timedelta(minutes=1), 'bbox': [0, 0, 1, 1]}
+        ])
+
+        operations.rollup_sightings(self.db, now - timedelta(hours=1), now)
+        operations.rollup_sightings(self.db, now - timedelta(hours=1), now)
+
+        # An older range must not take the owner back
+        operations.rollup_sightings(self.db, now - timedelta(hours=1), now - timedelta(seconds=90))
+
+        obj = operations.get_object(self.db, 't1')
+        self.assertEqual(obj['owner_id'], 'bob')
+        self.assertEqual(obj['first_seen'], now - timedelta(minutes=2))
+        self.assertEqual(obj['last_seen'], now - timedelta(minutes=1))
+
+    def test_prune_and_time_range(self):
+        now = datetime.now()
+        operations.add_sightings_bulk(self.db, [
+            {'tracking_id': 't1', 'class_name': 'backpack', 'owner_id': 'alice',
+             'timestamp': now - timedelta(days=days), 'bbox': [0, 0, 1, 1]}
+            for days in (40, 2, 1)
+        ])
+
+        self.assertEqual(operations.prune_sightings(self.db, 30), 1)
+
+        page = operations.find_sightings(self.db, 't1', 10, since=now - timedelta(days=3))
+        self.assertEqual(len(page), 2)
+        after = (page[0]['timestamp'], page[0]['_id'])
+        self.assertEqual(operations.find_sightings(self.db, 't1', 10, after=after), page[1:])
+        self.assertEqual(page[0]['bbox'], [0, 0, 1, 1])
+
+    def test_pages_split_sightings_of_the_same_time(self):
+        now = datetime.now()
+        operations.add_sightings_bulk(self.db, [
+            {'tracking_id': 't1', 'class_name': 'backpack', 'owner_id': 'alice',
+             'timestamp': now + timedelta(seconds=seconds), 'bbox': [0, 0, 1, 1]}
+            for seconds in (0, 1, 1, 1, 2)
+        ])
+
+        pages = [operations.find_sightings(self.db, 't1', 2)]
+        while pages[-1]:
+            last = pages[-1][-1]
+            pages.append(operations.find_sightings(self.db, 't1', 2, after=(last['timestamp'], last['_id'])))
+
+        sightings = [sighting for page in pages for sighting in page]
+        self.assertEqual(len({sighting['_id'] for sighting in sightings}), 5)
+        self.assertEqual([sighting['timestamp'] for sighting in sightings],
+                         [now + timedelta(seconds=seconds) for seconds in (0, 1, 1, 1, 2)])
+
+if __name__ == "__main__":
+    unittest.main()
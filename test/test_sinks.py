@@ -0,0 +1,42 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+from app.sinks import JsonlSink, NpzChunkSink
+
+FACES = [{'bbox': (1.0, 2.0, 3.0, 4.0), 'class_name': 'person', 'confidence': 0.9, 'face_id': 'face-1'}]
+OBJECTS = [{'bbox': (5.0, 6.0, 7.0, 8.0), 'class_name': 'backpack', 'confidence': 0.8, 'tracking_id': 'track-1'}]
+
+class TestSinks(unittest.TestCase):
+    def test_jsonl_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'detections.jsonl')
+            sink = JsonlSink(path)
+            sink.write(0, 0.0, FACES, OBJECTS)
+            sink.write(1, 0.04, [], [])
+            sink.close()
+
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['persons'][0]['face_id'], 'face-1')
+        self.assertEqual(records[0]['objects'][0]['tracking_id'], 'track-1')
+
+    def test_npz_sink_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = NpzChunkSink(tmp, chunk_rows=3)
+            for frame_index in range(2):
+                sink.write(frame_index, frame_index / 25, FACES, OBJECTS)
+            sink.close()
+
+            chunks = sorted(os.listdir(tmp))
+            self.assertEqual(chunks, ['chunk_00000.npz', 'chunk_00001.npz'])
+
+            first = np.load(os.path.join(tmp, chunks[0]))
+            self.assertEqual(len(first['frame']), 3)
+            self.assertEqual(first['track_ids'][first['track'][1]], 'track-1')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import base64
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app.config import DATABASE, BLOBS
+from database import operations, sqlite
+from database.backends import SQLiteBackend
+
+class TestSQLiteOperations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        patches = [
+            mock.patch.dict(DATABASE, {'type': 'sqlite'}),
+            mock.patch('database.backends._backend', SQLiteBackend()),
+            mock.patch.dict(BLOBS, {'root': os.path.join(self.tmp.name, 'blobs')}),
+            mock.patch('database.blobs._store', None)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.db = sqlite.connect(os.path.join(self.tmp.name, 'test.db'))
+        self.addCleanup(self.db.close)
+        sqlite.setup_sqlite_schema(self.db)
+
+    def add_face(self):
+        return operations.add_face(self.db, {
+            'encoding': [0.25] * 128,
+            'encrypted_image': base64.b64encode(b'token').decode(),
+            'metadata': {'source': 'test'}
+        })
+
+    def test_face_round_trip(self):
+        face_id = self.add_face()
+        face = operations.get_face(self.db, face_id)
+
+        self.assertEqual(face['_id'], face_id)
+        self.assertEqual(face['metadata'], {'source': 'test'})
+        self.assertIsInstance(face['timestamp'], datetime)
+        self.assertAlmostEqual(float(face['encoding'][0]), 0.25)
+        self.assertIsNotNone(operations.get_face_image_ref(self.db, face_id)['image_hash'])
+
+    def test_objects_upsert_and_pages(self):
+        now = datetime.now()
+        operations.upsert_objects_bulk(self.db, [
+            {'tracking_id': f"t{i}", 'class_name': 'backpack', 'last_seen': now + timedelta(seconds=i)}
+            for i in range(5)
+        ])
+        operations.upsert_objects_bulk(self.db, [{'tracking_id': 't0', 'class_name': 'laptop', 'last_seen': now}])
+
+        first = operations.find_objects(self.db, 3)
+        rest = operations.find_objects(self.db, 3, after=(first[-1]['last_seen'], first[-1]['_id']))
+
+        self.assertEqual([o['tracking_id'] for o in first + rest], ['t4', 't3', 't2', 't1', 't0'])
+        self.assertEqual(operations.get_object(self.db, 't0')['class_name'], 'laptop')
+
+    def test_owner_update_and_association(self):
+        face_id = self.add_face()
+        object_id = operations.add_object(self.db, {'tracking_id': 't1', 'class_name': 'backpack'})
+
+        self.assertTrue(operations.update_object(self.db, 't1', {'owner_id': face_id}))
+        operations.add_association(self.db, {'person_id': face_id, 'object_id': object_id, 'distance': 1.0})
+        operations.add_association(self.db, {'person_id': face_id, 'object_id': object_id, 'distance': 2.0})
+
+        self.assertEqual(len(operations.get_person_objects(self.db, face_id)), 1)
+        with self.db.cursor() as cur:
+            cur.execute("SELECT distance FROM associations")
+            self.assertEqual(cur.fetchall(), [{'distance': 2.0}])
+
+    def test_update_rejects_unknown_fields(self):
+        operations.add_object(self.db, {'tracking_id': 't1', 'class_name': 'backpack', 'metadata': {}})
+
+        with self.assertRaises(ValueError):
+            operations.update_object(self.db, 't1', {'class_name = NULL; --': 'x'})
+        self.assertTrue(operations.update_object(self.db, 't1', {'metadata': {'color': 'red'}}))
+        self.assertEqual(operations.get_object(self.db, 't1')['metadata'], {'color': 'red'})
+
+if __name__ == "__main__":
+    unittest.main()